@@ -0,0 +1,45 @@
+import numpy as np
+
+# ---------------------------------------------------
+# REDUÇÃO DE SÉRIES TEMPORAIS PARA GRÁFICOS
+# ---------------------------------------------------
+# O navegador não precisa de mais pontos do que pixels. Estas funções
+# devolvem os ÍNDICES dos pontos a manter (em ordem), preservando picos,
+# para que o gráfico receba alguns milhares de pontos em vez da série toda.
+
+# ~2 pontos por pixel (um mínimo e um máximo por coluna de pixels); a
+# largura padrão é a de um gráfico em largura cheia no layout "wide"
+PONTOS_POR_PIXEL = 2
+LARGURA_GRAFICO_PX = 1000
+
+
+def pontos_para_largura(largura_px):
+    """Pontos a desenhar num gráfico de `largura_px` pixels."""
+    return max(PONTOS_POR_PIXEL * int(largura_px), 2)
+
+
+def indices_minmax(y, n_buckets):
+    """
+    Para cada um dos `n_buckets` blocos consecutivos de pontos mantém
+    o mínimo e o máximo, além do primeiro e do último ponto da série.
+    Picos e vales são preservados exatamente.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * n_buckets + 2:
+        return np.arange(n)
+
+    # Blocos de k pontos viram linhas de uma matriz; argmin/argmax por linha
+    k = -(-n // n_buckets)
+    pad = k * n_buckets - n
+    blocos_max = np.concatenate((y, np.full(pad, -np.inf))).reshape(n_buckets, k)
+    blocos_min = np.concatenate((y, np.full(pad, np.inf))).reshape(n_buckets, k)
+    base = np.arange(n_buckets) * k
+    idx = np.concatenate(([0, n - 1], base + blocos_min.argmin(axis=1), base + blocos_max.argmax(axis=1)))
+    idx = idx[idx < n]
+    return np.unique(idx)
+
+
+def reduzir_serie(y, largura_px=LARGURA_GRAFICO_PX):
+    """Índices a manter para desenhar `y` num gráfico de `largura_px` pixels (picos preservados)."""
+    return indices_minmax(y, max(pontos_para_largura(largura_px) // 2, 1))
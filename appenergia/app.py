@@ -1,8 +1,31 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+import io
+import os
+import threading
+
+import armazem
+import cache_disco
+import campus
+import fonte_dados
+import imputacao
+import incremental
+import metricas
+import nucleo
+from amostragem import LARGURA_GRAFICO_PX, pontos_para_largura, reduzir_serie
+from cubo import tabela as cubo_tabela, valor as cubo_valor
+from demanda import MULTIPLICADOR_ULTRAPASSAGEM, TOLERANCIA_ULTRAPASSAGEM, analisar_demanda, ler_medicao
+from formatacao import formatar_br, formatar_tabela_br
+from monte_carlo import CATEGORIAS_NO_TETO, DISTRIBUICOES_PADRAO, resumir, simular_incerteza
+from motor_consumo import calcular_consumo, preparar_consumo
+from ocupacao import resumo_diario
+from roi import candidatos_retrofit, otimizar_orcamento
+from simulacao import perfil_ocupacao_semanal, simular_ano
+import varredura
 
 # ---------------------------------------------------
 # CONFIGURAÇÃO INICIAL
@@ -16,178 +39,331 @@ Painel completo para **dimensionamento de demanda**, **consumo**,
 """)
 
 # ---------------------------------------------------
-# FUNÇÃO DE FORMATAÇÃO PT-BR
+# TABELAS PT-BR (FORMATAÇÃO VETORIZADA E PAGINAÇÃO)
 # ---------------------------------------------------
-def formatar_br(valor, prefixo="", sufixo="", decimais=2):
-    """
-    Formata números float para string no padrão brasileiro:
-    1.234,56 (milhar com ponto, decimal com vírgula)
-    """
-    try:
-        if pd.isna(valor):
-            return "-"
-        
-        # Formata primeiro com padrão US (vírgula=milhar, ponto=decimal)
-        formato = f"{{:,.{decimais}f}}"
-        texto = formato.format(valor)
-        
-        # Troca os caracteres
-        texto = texto.replace(",", "X").replace(".", ",").replace("X", ".")
-        
-        return f"{prefixo}{texto}{sufixo}"
-    except Exception:
-        return str(valor)
+# Números já chegam ao st.dataframe como texto pt-BR, formatados por coluna
+# (formatacao.formatar_tabela_br) e só na página visível: o custo de
+# renderização acompanha as linhas exibidas, não o tamanho da tabela.
+LINHAS_POR_PAGINA = 50
+
+def mostrar_tabela(df, formatos=None, chave=None, linhas_por_pagina=LINHAS_POR_PAGINA, **kwargs):
+    """st.dataframe com números pt-BR; tabelas maiores que uma página ganham paginação."""
+    if len(df) > linhas_por_pagina:
+        paginas = -(-len(df) // linhas_por_pagina)
+        # A página guardada pode não existir mais (ex.: outra sala, com menos itens)
+        if chave and st.session_state.setdefault(chave, 1) > paginas:
+            st.session_state[chave] = 1
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas,
+                                 **({} if chave else dict(value=1)), key=chave)
+        inicio = (pagina - 1) * linhas_por_pagina
+        st.caption(f"Linhas {formatar_br(inicio + 1, decimais=0)}–"
+                   f"{formatar_br(min(inicio + linhas_por_pagina, len(df)), decimais=0)} "
+                   f"de {formatar_br(len(df), decimais=0)}")
+        df = df.iloc[inicio:inicio + linhas_por_pagina]
+    with metricas.etapa("tabela"):
+        st.dataframe(formatar_tabela_br(df, formatos), **kwargs)
+
+def grafico(fig, **kwargs):
+    """st.plotly_chart medido (a serialização da figura acontece aqui)."""
+    with metricas.etapa("grafico"):
+        st.plotly_chart(fig, **kwargs)
 
 # ---------------------------------------------------
-# 1. CARREGAMENTO DOS DADOS
+# 1. CARREGAMENTO DOS DADOS (PIPELINE EM ETAPAS CACHEADAS)
 # ---------------------------------------------------
-DATA_URL_INVENTARIO = "https://raw.githubusercontent.com/Web3economyst/UFRGS_Energy/refs/heads/main/Planilha%20Unificada(Equipamentos%20Consumo).csv"
-DATA_URL_OCUPACAO = "https://github.com/Web3economyst/UFRGS_Energy/raw/main/Hor%C3%A1rios.xlsx"
+# Cada etapa é cacheada e depende apenas das entradas que usa de fato:
+#   ingestão bruta -> inventário limpo -> colunas estáticas derivadas
+#   -> consumo (horas/dias/sazonalidade/salas 24h) -> agregados (+ tarifas)
+# Assim, mudar uma tarifa não recalcula o consumo, e mudar horas não refaz
+# a categorização. Todas as etapas recebem `fontes` (caminho + versão de
+# cada arquivo), de modo que editar a planilha invalida a cadeia inteira.
+# Os arquivos locais têm preferência sobre o GitHub (ver fonte_dados.py).
+# cache_etapa é o st.cache_data com a contagem de acertos/falhas e o tempo
+# de cada chamada (ver metricas.py; sem custo quando a coleta está desligada).
+# st.cache_data devolve uma cópia a cada chamada; os dados estáticos (inventário
+# e ocupação) usam recurso_etapa (st.cache_resource): um único objeto por
+# processo, aberto do armazém Arrow compartilhado entre processos (armazem.py).
+cache_etapa = metricas.em_cache(st.cache_data(show_spinner=False))
+recurso_etapa = metricas.em_cache(st.cache_resource(show_spinner=False))
+
+def etapa_persistente(func):
+    """
+    cache_etapa com o cache de resultados em disco por baixo (cache_disco.py):
+    sobrevive a reinícios e é compartilhado entre os processos do servidor.
+    """
+    return cache_etapa(metricas.em_cache(cache_disco.persistente, nome=f"disco:{func.__name__}")(func))
 
-@st.cache_data
-# ---------------------------------------------------
-# 1. CARREGAMENTO DOS DADOS (COM IMPUTAÇÃO INTELIGENTE)
-# ---------------------------------------------------
-@st.cache_data
-def load_data():
+def versao_caminho(caminho):
+    """(caminho, versão) de um arquivo qualquer; (None, None) se não houver."""
     try:
-        # Leitura com tratamento de encoding
-        df_inv = pd.read_csv(DATA_URL_INVENTARIO, encoding='utf-8', on_bad_lines='skip')
-        df_inv.columns = df_inv.columns.str.strip()
+        return caminho, fonte_dados.versao_arquivo(caminho)
+    except (TypeError, OSError):
+        return None, None
 
-        # 1. Tratamento de Quantidade (Igual ao Relatório: Vazio = 0)
-        df_inv['Quant'] = pd.to_numeric(df_inv['Quant'], errors='coerce').fillna(0)
-        
-        # 2. Tratamento Numérico da Potência
-        df_inv['num_potencia'] = pd.to_numeric(df_inv['num_potencia'], errors='coerce').fillna(0)
-        
-        # 3. Tratamento de Textos
-        df_inv['des_nome_generico_equipamento'] = df_inv['des_nome_generico_equipamento'].astype(str).str.strip().str.upper()
-        df_inv['des_categoria'] = df_inv['des_categoria'].astype(str).str.strip()
-        
-        # Lógica de Salas e Setores
-        if 'num_andar' in df_inv.columns:
-            df_inv['num_andar'] = df_inv['num_andar'].astype(str).str.replace(r'\.0$', '', regex=True).replace(['nan','NaN',''], 'Não Identificado')
-        else:
-            df_inv['num_andar'] = 'Não Identificado'
+def versoes_fontes():
+    """
+    (caminho, versão) do inventário e da ocupação; só faz os.stat, roda a
+    cada rerun. Fontes sem cópia local são baixadas juntas.
+    """
+    caminhos = fonte_dados.resolver_fontes(('inventario', 'ocupacao'))
+    return versao_caminho(caminhos['inventario']), versao_caminho(caminhos['ocupacao'])
 
-        if 'Id_sala' in df_inv.columns:
-            df_inv['Id_sala'] = df_inv['Id_sala'].astype(str).replace(['nan','NaN',''], 'Não Identificado')
-        else:
-            df_inv['Id_sala'] = 'Não Identificado'
-            
-        if 'Setor' in df_inv.columns:
-            df_inv['Setor'] = df_inv['Setor'].astype(str).str.strip().replace(['nan','NaN',''], 'Não Identificado')
-        else:
-            df_inv['Setor'] = 'Não Identificado'
+@cache_etapa
+def ler_inventario(caminho, versao):
+    """Etapa 1a — ingestão bruta do CSV de inventário (cache Parquet em disco)."""
+    return fonte_dados.ler_com_cache(caminho, 'inventario', nucleo.ler_inventario_csv)
 
-        # --- A MÁGICA DA IMPUTAÇÃO (Igual ao Relatório) ---
-        def estimar_potencia_real(row):
-            p = row['num_potencia']
-            u = str(row['des_potencia']).upper()
-            nome = row['des_nome_generico_equipamento'] # Já está em Upper
-            
-            # Se potência for 0 ou inválida, imputa média de mercado
-            if p <= 0:
-                if 'AR CONDICIONADO' in nome: return 1400.0 
-                if 'COMPUTADOR' in nome: return 200.0
-                if 'CHALEIRA' in nome: return 1200.0
-                if 'CAFETEIRA' in nome: return 800.0
-                if 'GELADEIRA' in nome: return 150.0
-                if 'LÂMPADA' in nome: return 32.0
-                return 0.0 # Se não souber o que é, mantém 0
-            
-            # Conversão de Unidades
-            if 'BTU' in u: return (p * 0.293) / 3.0
-            if 'CV' in u or 'HP' in u: return p * 735.5
-            if 'KW' in u: return p * 1000.0
-            
-            return p
-
-        df_inv['Potencia_Real_W'] = df_inv.apply(estimar_potencia_real, axis=1)
-        df_inv['Potencia_Total_Item_W'] = df_inv['Potencia_Real_W'] * df_inv['Quant']
-
-        # OCUPAÇÃO (Mantido igual)
-        try:
-            xls = pd.ExcelFile(DATA_URL_OCUPACAO)
-            nome_aba_dados = None
-            for aba in xls.sheet_names:
-                df_temp = pd.read_excel(xls, sheet_name=aba, nrows=5)
-                cols = [str(x).strip() for x in df_temp.columns]
-                if 'DataHora' in cols and 'EntradaSaida' in cols:
-                    nome_aba_dados = aba
-                    break
-            if nome_aba_dados is None: nome_aba_dados = xls.sheet_names[0]
-
-            df_oc = pd.read_excel(xls, sheet_name=nome_aba_dados)
-            df_oc.columns = df_oc.columns.astype(str).str.strip()
-            df_oc = df_oc.dropna(subset=['DataHora'])
-            df_oc['DataHora'] = pd.to_datetime(df_oc['DataHora'], errors='coerce')
-            df_oc = df_oc.sort_values('DataHora')
-            df_oc['Variacao'] = df_oc['EntradaSaida'].astype(str).str.upper().str[0].map({'E':1,'S':-1}).fillna(0)
-            df_oc['Data_Dia'] = df_oc['DataHora'].dt.date
-            
-            def ajustar_dia(grupo):
-                grupo = grupo.sort_values('DataHora')
-                grupo['Ocupacao_Dia'] = grupo['Variacao'].cumsum()
-                m = grupo['Ocupacao_Dia'].min()
-                if m < 0: grupo['Ocupacao_Dia'] += abs(m)
-                return grupo
-            
-            df_oc = df_oc.groupby('Data_Dia', group_keys=False).apply(ajustar_dia)
-            df_oc['Ocupacao_Acumulada'] = df_oc['Ocupacao_Dia']
+@recurso_etapa
+def ler_ocupacao(caminho, versao):
+    """
+    Etapa 1b — ingestão da planilha de catracas e reconstrução da ocupação,
+    somente leitura e compartilhada (armazém Arrow). A leitura já foi
+    disparada em segundo plano no início da execução (ver seção 1); aqui só
+    se espera por ela.
+    """
+    return armazem.compartilhar(
+        'ocupacao', (caminho, versao),
+        lambda: fonte_dados.resultado(('ocupacao', caminho, versao), nucleo.carregar_ocupacao, caminho)
+    )
 
-        except Exception:
-            df_oc = pd.DataFrame()
+@cache_etapa
+def etapa_resumo_ocupacao(fontes):
+    """Etapa 1c — pico, entradas e saídas por dia (pré-calculados)."""
+    caminho_oc, versao_oc = fontes[1]
+    return resumo_diario(ler_ocupacao(caminho_oc, versao_oc))
 
-        return df_inv, df_oc
+@cache_etapa
+def etapa_serie_ocupacao(fontes, inicio=None, fim=None, largura_px=LARGURA_GRAFICO_PX):
+    """
+    Etapa 1d — série de ocupação reduzida para o gráfico (picos preservados),
+    com ~2 pontos por pixel de `largura_px`. Com uma janela [inicio, fim] os
+    pontos são redistribuídos só nela, ou seja, ao aproximar a janela a
+    resolução aumenta.
+    Retorna (série reduzida, nº de eventos na janela).
+    """
+    caminho_oc, versao_oc = fontes[1]
+    df_oc = ler_ocupacao(caminho_oc, versao_oc)[['DataHora', 'Ocupacao_Acumulada']]
+    if inicio is not None:
+        df_oc = df_oc[df_oc['DataHora'] >= pd.Timestamp(inicio)]
+    if fim is not None:
+        df_oc = df_oc[df_oc['DataHora'] < pd.Timestamp(fim) + pd.Timedelta(days=1)]
+    idx = reduzir_serie(df_oc['Ocupacao_Acumulada'].to_numpy(), largura_px)
+    return df_oc.iloc[idx], len(df_oc)
+
+@metricas.medido("load_data")
+def load_data(fontes):
+    """
+    Etapa 2 — inventário limpo, com imputação de potência e colunas
+    estáticas derivadas (categoria, potência instalada, demanda, filtro de
+    aparelhos). Depois da primeira carga, só as linhas inseridas ou
+    alteradas no CSV são reprocessadas (ver incremental.py). A ocupação não
+    entra aqui: as abas de inventário não esperam pela planilha de catracas.
+    Sem cache próprio: o resultado vai para o armazém (ver preparar_dados).
+    """
+    try:
+        caminho_inv, versao_inv = fontes[0]
+        if caminho_inv is None:
+            raise FileNotFoundError("inventário sem cópia local e GitHub inacessível")
+        df_inv, _ = incremental.atualizar_inventario(caminho_inv, versao_inv, ler_inventario(caminho_inv, versao_inv))
+        return df_inv
 
     except Exception as e:
         st.error(f"Erro no carregamento: {e}")
-        return pd.DataFrame(), pd.DataFrame()
-
-        # OCUPAÇÃO
-        try:
-            xls = pd.ExcelFile(DATA_URL_OCUPACAO)
-            nome_aba_dados = None
-            for aba in xls.sheet_names:
-                df_temp = pd.read_excel(xls, sheet_name=aba, nrows=5)
-                cols = [str(x).strip() for x in df_temp.columns]
-                if 'DataHora' in cols and 'EntradaSaida' in cols:
-                    nome_aba_dados = aba
-                    break
-            if nome_aba_dados is None:
-                nome_aba_dados = xls.sheet_names[0]
-
-            df_oc = pd.read_excel(xls, sheet_name=nome_aba_dados)
-            df_oc.columns = df_oc.columns.astype(str).str.strip()
-            df_oc = df_oc.dropna(subset=['DataHora'])
-            df_oc['DataHora'] = pd.to_datetime(df_oc['DataHora'], errors='coerce')
-            df_oc = df_oc.sort_values('DataHora')
-
-            df_oc['Variacao'] = df_oc['EntradaSaida'].astype(str).str.upper().str[0].map({'E':1,'S':-1}).fillna(0)
-            df_oc['Data_Dia'] = df_oc['DataHora'].dt.date
-
-            def ajustar_dia(grupo):
-                grupo = grupo.sort_values('DataHora')
-                grupo['Ocupacao_Dia'] = grupo['Variacao'].cumsum()
-                m = grupo['Ocupacao_Dia'].min()
-                if m < 0: grupo['Ocupacao_Dia'] += abs(m)
-                return grupo
-
-            df_oc = df_oc.groupby('Data_Dia', group_keys=False).apply(ajustar_dia)
-            df_oc['Ocupacao_Acumulada'] = df_oc['Ocupacao_Dia']
-
-        except Exception:
-            df_oc = pd.DataFrame()
-
-        return df_inv, df_oc
+        return pd.DataFrame()
 
-    except Exception as e:
-        st.error(f"Erro no carregamento: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+@recurso_etapa
+def preparar_dados(fontes):
+    """
+    Etapa 3 — inventário preparado (somente leitura, compartilhado pelo
+    armazém Arrow) e kernel de consumo. Não depende de nenhum parâmetro do
+    sidebar.
+    """
+    df_inv = armazem.compartilhar('inventario', fontes[0], lambda: load_data(fontes))
+    if df_inv.empty:
+        return df_inv, None
+    return df_inv, preparar_consumo(df_inv)
+
+@cache_etapa
+def etapa_consumo(fontes, horas_ar, horas_luz, horas_pc, horas_eletro, horas_outros,
+                  dias_mes, fator_sazonal_clima, salas_24h):
+    """Etapa 4a — consumo mensal por item; chaveada só pelo perfil de uso."""
+    kernel = preparar_dados(fontes)[1]
+    return calcular_consumo(
+        kernel, horas_ar, horas_luz, horas_pc, horas_eletro, horas_outros,
+        dias_mes, fator_sazonal_clima, salas_24h
+    )
 
-df_raw, df_ocupacao = load_data()
+@etapa_persistente
+def etapa_agregados(fontes, params_uso, tarifa_media, tarifa_kw_demanda):
+    """
+    Etapa 4b — totais e agrupamentos que alimentam as abas. Depende do
+    perfil de uso (via etapa_consumo) e das tarifas. Quando o CSV muda, o
+    cubo da versão anterior recebe só o delta das linhas alteradas.
+    """
+    df, _ = preparar_dados(fontes)
+    consumo = etapa_consumo(fontes, **params_uso)
+    (caminho_inv, versao_inv), _ = fontes
+    cubo = incremental.cubo_incremental(
+        caminho_inv, versao_inv, df, (tuple(params_uso.items()), tarifa_media, tarifa_kw_demanda),
+        consumo, tarifa_media, tarifa_kw_demanda
+    )
+    return nucleo.calcular_agregados(df, consumo, tarifa_media, tarifa_kw_demanda, cubo=cubo)
+
+@etapa_persistente
+def etapa_simulacao(fontes, params_uso):
+    """
+    Etapa 4c — simulação horária do ano (8760 h): agenda das horas do
+    sidebar modulada pelo perfil semanal de ocupação das catracas.
+    """
+    _, kernel = preparar_dados(fontes)
+    df_oc = ler_ocupacao(*fontes[1])
+    ano = df_oc['DataHora'].max().year if not df_oc.empty else None
+    return simular_ano(kernel, **params_uso, perfil_ocupacao=perfil_ocupacao_semanal(df_oc), ano=ano)
+
+@etapa_persistente
+def etapa_demanda_simulada(fontes, params_uso, tarifa_kw_demanda):
+    """
+    Etapa 4d — demanda de 15 min e contratada a partir da simulação horária
+    (a contratada recomendada não passa da potência instalada).
+    """
+    sim = etapa_simulacao(fontes, params_uso)
+    instalada_kw = preparar_dados(fontes)[1]['potencia_w'].sum() / 1000
+    return analisar_demanda(pd.Series(sim['total_kw'], index=sim['horas']), tarifa_kw_demanda, instalada_kw)
+
+@cache_etapa
+def etapa_demanda_medida(conteudo, tarifa_kw_demanda, instalada_kw):
+    """Demanda de 15 min e contratada a partir de um CSV de medição enviado."""
+    return analisar_demanda(ler_medicao(io.BytesIO(conteudo)), tarifa_kw_demanda, instalada_kw)
+
+@cache_etapa
+def etapa_candidatos_retrofit(fontes, horas_luz, horas_ar, horas_pc, dias_mes, tarifa, custo_led, custo_ar, custo_pc):
+    """Etapa 4e — candidatos de troca (sala × equipamento) com custo e economia unitários."""
+    df, _ = preparar_dados(fontes)
+    return candidatos_retrofit(df, horas_luz, horas_ar, horas_pc, dias_mes, tarifa, custo_led, custo_ar, custo_pc)
+
+@etapa_persistente
+def etapa_retrofit(fontes, horas_luz, horas_ar, horas_pc, dias_mes, tarifa,
+                   custo_led, custo_ar, custo_pc, investimento, payback_maximo):
+    """Etapa 4f — alocação ótima do orçamento entre os candidatos."""
+    cand = etapa_candidatos_retrofit(fontes, horas_luz, horas_ar, horas_pc, dias_mes, tarifa, custo_led, custo_ar, custo_pc)
+    return otimizar_orcamento(cand, investimento, payback_maximo)
+
+@etapa_persistente
+def etapa_monte_carlo(fontes, params_uso, tarifa_media, custo_fixo, roi, n_amostras, distribuicoes):
+    """
+    Etapa 4g — Monte Carlo sobre potências imputadas, horas e fatores de
+    uso. Devolve os arrays por cenário (kWh, R$, payback).
+    """
+    df, kernel = preparar_dados(fontes)
+    imputada = (df['num_potencia'] <= 0) & (df['Potencia_Real_W'] > 0)
+    return simular_incerteza(
+        kernel, imputada.to_numpy(), df['Potencia_Real_W'].to_numpy(), **params_uso,
+        tarifa=tarifa_media, custo_fixo=custo_fixo, roi=dict(roi),
+        n_amostras=n_amostras, distribuicoes=dict(distribuicoes)
+    )
+
+@cache_etapa
+def etapa_coeficientes(fontes, fator_sazonal_clima, salas_24h):
+    """Etapa 4h — coeficientes lineares de consumo para a varredura de cenários."""
+    kernel = preparar_dados(fontes)[1]
+    return varredura.coeficientes_consumo(kernel, fator_sazonal_clima, salas_24h)
+
+@cache_etapa
+def etapa_estatisticas(fontes):
+    """
+    Etapa 3b — estatísticas estáticas do inventário usadas pelas abas
+    (listas para selectbox, quantidades e potências médias por categoria).
+    """
+    df, _ = preparar_dados(fontes)
+    est = {
+        'lista_salas': sorted(df['Id_sala'].unique().astype(str)),
+        'lista_setores': sorted(df['Setor'].unique()),
+        'lista_andares': sorted(df['num_andar'].unique()),
+        'media_aparelhos_setor': df.groupby('Setor', observed=True)['Quant'].sum().mean(),
+        'media_aparelhos_andar': df.groupby('num_andar', observed=True)['Quant'].sum().mean(),
+        'quant_categoria': df.groupby('Categoria_Macro', observed=True)['Quant'].sum().to_dict(),
+        'media_w_categoria': df.groupby('Categoria_Macro', observed=True)['Potencia_Real_W'].mean().to_dict(),
+        # Linhas de cada sala (posições em df), para listar os itens sem filtrar o inventário
+        'linhas_sala': df.groupby('Id_sala', observed=True).indices,
+    }
+    return est
+
+# ---------------------------------------------------
+# CENÁRIOS PADRÃO E PRÉ-AQUECIMENTO DO CACHE EM DISCO
+# ---------------------------------------------------
+# Valores iniciais do sidebar e do ROI. Os cenários mais pedidos (Baseline e
+# Inverno com as tarifas sugeridas, o perfil de 11,5 h e o orçamento padrão)
+# são calculados em segundo plano quando um processo carrega uma versão dos
+# dados; com o cache em disco, só o primeiro processo calcula de fato.
+# Estação: (fator de climatização, tarifa ponta sugerida, tarifa fora ponta sugerida)
+SAZONALIDADE = {
+    "Baseline (Relatório)": (1.00, 2.90, 0.70),
+    "Inverno (Baixo Consumo)": (0.60, 2.90, 0.70),
+}
+PADRAO_USO = dict(horas_ar=11.5, horas_luz=11.5, horas_pc=11.5, horas_eletro=1.0, horas_outros=11.5, dias_mes=22)
+TARIFA_DEMANDA_PADRAO = 40.0
+ROI_PADRAO = dict(investimento=50000.0, custo_led=25.0, custo_ar=3500.0, custo_pc=2800.0)
+
+@st.cache_resource(show_spinner=False)
+def aquecer_cenarios(fontes):
+    """Dispara (uma vez por processo e versão dos dados) o cálculo dos cenários padrão."""
+    def aquecer():
+        for fator, ponta, fora in SAZONALIDADE.values():
+            params = dict(PADRAO_USO, fator_sazonal_clima=fator, salas_24h=())
+            tarifa = nucleo.tarifa_media(ponta, fora, nucleo.PESO_PONTA)
+            tarefas = [
+                lambda: etapa_agregados(fontes, params, tarifa, TARIFA_DEMANDA_PADRAO),
+                lambda: etapa_retrofit(
+                    fontes, params['horas_luz'], params['horas_ar'], params['horas_pc'], params['dias_mes'], tarifa,
+                    ROI_PADRAO['custo_led'], ROI_PADRAO['custo_ar'], ROI_PADRAO['custo_pc'],
+                    ROI_PADRAO['investimento'], None
+                ),
+                lambda: etapa_demanda_simulada(fontes, params, TARIFA_DEMANDA_PADRAO),
+            ]
+            for tarefa in tarefas:
+                try:
+                    tarefa()
+                except Exception:
+                    pass  # Melhor esforço: a sessão calcula o que faltar
+    linha = threading.Thread(target=aquecer, name="aquecer-cenarios", daemon=True)
+    add_script_run_ctx(linha, get_script_run_ctx())
+    linha.start()
+    return linha
+
+# ---------------------------------------------------
+# MODO CAMPUS (ENERGIA_CAMPUS = diretório ou manifesto de prédios)
+# ---------------------------------------------------
+@cache_etapa
+def etapa_ingestao_campus(predios, versao_regras):
+    """
+    Ingestão paralela e particionada dos prédios (partições reaproveitadas).
+    `versao_regras` só entra na chave: regras novas reingerem os prédios.
+    """
+    return campus.ingerir_campus([dict(p) for p in predios])
+
+@etapa_persistente
+def etapa_parciais_predio(particao, versoes, versao_regras, params_uso, tarifa_media, tarifa_kw_demanda):
+    """Agregados parciais (aditivos) de um prédio para os parâmetros atuais."""
+    df, _, kernel = campus.ler_particao({'particao': particao})
+    return campus.agregados_parciais(df, kernel, tarifa_media, tarifa_kw_demanda, **params_uso)
+
+origem_campus = os.environ.get(campus.CAMPUS_ENV)
+predios_campus = campus.descobrir_predios(origem_campus) if origem_campus else []
+if predios_campus:
+    with st.sidebar:
+        st.header("🏛️ Campus")
+        predio_sel = st.selectbox("Prédio (abas de detalhe):", [p['predio'] for p in predios_campus])
+    registro_sel = next(p for p in predios_campus if p['predio'] == predio_sel)
+    fontes = (versao_caminho(registro_sel['inventario']), versao_caminho(registro_sel['ocupacao']))
+else:
+    fontes = versoes_fontes()
+# A planilha de catracas é lida numa thread à parte enquanto o inventário
+# é carregado e as abas que só dependem dele são desenhadas
+if fontes[1][0] is not None and not armazem.disponivel('ocupacao', fontes[1]):
+    fonte_dados.em_segundo_plano(('ocupacao', *fontes[1]), nucleo.carregar_ocupacao, fontes[1][0])
+df_raw, _ = preparar_dados(fontes)
+if not df_raw.empty and cache_disco.ativo():
+    aquecer_cenarios(fontes)
 
 # ---------------------------------------------------
 # 2. SIDEBAR — PARÂMETROS E SAZONALIDADE (CALIBRADO PARA RELATÓRIO)
@@ -197,19 +373,12 @@ if not df_raw.empty:
         st.header("⚙️ Parâmetros do Modelo")
 
         st.subheader("🌦️ Estação / Sazonalidade")
-        periodo = st.radio("Selecione:", ["Baseline (Relatório)", "Inverno (Baixo Consumo)"])
+        periodo = st.radio("Selecione:", list(SAZONALIDADE))
 
         # AJUSTE DE CONSUMO:
-        # Para bater com o relatório (77k kWh), o fator deve ser 1.0 (sem acréscimo de verão)
-        # pois o inventário já considera a potência nominal.
-        if "Baseline" in periodo:
-            fator_sazonal_clima = 1.00 
-            sugestao_ponta = 2.90
-            sugestao_fora = 0.70
-        else:
-            fator_sazonal_clima = 0.60
-            sugestao_ponta = 2.90
-            sugestao_fora = 0.70
+        # Para bater com o relatório (77k kWh), o fator deve ser 1.0 no Baseline (sem
+        # acréscimo de verão) pois o inventário já considera a potência nominal.
+        fator_sazonal_clima, sugestao_ponta, sugestao_fora = SAZONALIDADE[periodo]
 
         # TARIFAS
         st.subheader("💰 Tarifas (R$/kWh)")
@@ -219,129 +388,127 @@ if not df_raw.empty:
         with c_tar2:
             tarifa_fora_ponta = st.number_input("Fora Ponta", value=sugestao_fora, format="%.2f")
         
-        peso_ponta = 0.054 
-        peso_fora = 1 - peso_ponta
-        
-        tarifa_media_calculada = (tarifa_ponta * peso_ponta) + (tarifa_fora_ponta * peso_fora)
+        peso_ponta = nucleo.PESO_PONTA
+        tarifa_media_calculada = nucleo.tarifa_media(tarifa_ponta, tarifa_fora_ponta, peso_ponta)
         
         st.caption(f"Tarifa Média (Calibrada): **{formatar_br(tarifa_media_calculada, prefixo='R$ ')}/kWh**")
         
-        tarifa_kw_demanda = st.number_input("Tarifa Demanda (R$/kW)", value=40.0)
+        tarifa_kw_demanda = st.number_input("Tarifa Demanda (R$/kW)", value=TARIFA_DEMANDA_PADRAO)
 
         st.divider()
         st.subheader("🕒 Perfil de Uso (Padrão 11.5h)")
         
-        lista_salas = sorted(df_raw['Id_sala'].unique().astype(str))
+        lista_salas = etapa_estatisticas(fontes)['lista_salas']
         salas_24h = st.multiselect("Salas 24h (Servidores/Geladeiras):", lista_salas)
 
         with st.expander("Ajustar Horas de Uso", expanded=True):
             # PADRÕES EXATOS DO RELATÓRIO
-            horas_ar = st.slider("Ar Condicionado", 0.0, 24.0, 11.5, step=0.5)
-            horas_luz = st.slider("Iluminação", 0.0, 24.0, 11.5, step=0.5)
-            horas_pc = st.slider("Informática", 0.0, 24.0, 11.5, step=0.5)
-            horas_eletro = st.slider("Eletrodomésticos", 0.0, 24.0, 1.0, step=0.5)
-            horas_outros = st.slider("Outros", 0.0, 24.0, 11.5, step=0.5)
-            dias_mes = st.number_input("Dias no mês", value=22)
+            horas_ar = st.slider("Ar Condicionado", 0.0, 24.0, PADRAO_USO['horas_ar'], step=0.5)
+            horas_luz = st.slider("Iluminação", 0.0, 24.0, PADRAO_USO['horas_luz'], step=0.5)
+            horas_pc = st.slider("Informática", 0.0, 24.0, PADRAO_USO['horas_pc'], step=0.5)
+            horas_eletro = st.slider("Eletrodomésticos", 0.0, 24.0, PADRAO_USO['horas_eletro'], step=0.5)
+            horas_outros = st.slider("Outros", 0.0, 24.0, PADRAO_USO['horas_outros'], step=0.5)
+            dias_mes = st.number_input("Dias no mês", value=PADRAO_USO['dias_mes'])
+
+        st.divider()
+        # Os arquivos locais são usados por padrão; o GitHub só é consultado aqui
+        if st.button("🔄 Revalidar dados no GitHub"):
+            try:
+                atualizadas = fonte_dados.revalidar_fontes()
+            except Exception as e:
+                st.warning(f"Não foi possível revalidar: {e}")
+            else:
+                if atualizadas:
+                    st.rerun()
+                st.info("Os dados locais já estão atualizados.")
 
    # ---------------------------------------------------
     # 3. CÁLCULOS TÉCNICOS
     # ---------------------------------------------------
-
-    def agrupar(cat):
-        c = str(cat).upper().strip()
-        if "CLIM" in c or "AR" in c: return "Climatização"
-        if "ILUM" in c or "LÂMP" in c: return "Iluminação"
-        if "COMP" in c or "MONIT" in c or "INFORM" in c: return "Informática"
-        if "ELETRO" in c or "DOMÉSTICO" in c or "COPA" in c or "COZINHA" in c: return "Eletrodomésticos"
-        if "ELEV" in c: return "Elevadores"
-        if "BOMB" in c: return "Bombas"
-        return "Outros"
-
-    df_raw['Categoria_Macro'] = df_raw['des_categoria'].apply(agrupar)
-
-    def consumo(row):
-        cat = row['Categoria_Macro']
-        nome = str(row['des_nome_generico_equipamento']).upper()
-        
-        # Lógica de Salas e Equipamentos 24h
-        is_24h = False
-        if str(row['Id_sala']) in salas_24h:
-            is_24h = True
-        if 'GELADEIRA' in nome or 'FREEZER' in nome or 'SERVIDOR' in nome or 'RACK' in nome or 'NOBREAK' in nome:
-            is_24h = True
-
-        if is_24h:
-            h = 24.0
-            dias = 30
-            if 'GELADEIRA' in nome or 'FREEZER' in nome:
-                fator_uso = 0.40
-            else:
-                fator_uso = 1.00
-        else:
-            dias = dias_mes
-            if cat == "Climatização": 
-                h = horas_ar
-                fator_uso = 0.60 
-            elif cat == "Iluminação": 
-                h = horas_luz
-                fator_uso = 1.00
-            elif cat == "Informática": 
-                h = horas_pc
-                fator_uso = 0.80
-            elif cat == "Eletrodomésticos": 
-                h = horas_eletro
-                fator_uso = 1.00
-            else: 
-                h = horas_outros
-                # AJUSTE AQUI: No relatório, itens gerais foram somados 100%
-                # Alterado de 0.50 para 1.00 para bater os 77.022 kWh
-                fator_uso = 1.00 
-
-        cons = (row['Potencia_Total_Item_W'] * h * dias * fator_uso) / 1000
-        
-        # Multiplicador sazonal (Default 1.0 na Baseline)
-        if cat == 'Climatização' and fator_sazonal_clima > 1.0:
-             return cons * fator_sazonal_clima
-        return cons
-
-    df_raw['Consumo_Mensal_kWh'] = df_raw.apply(consumo, axis=1)
-    df_raw['Custo_Consumo_R$'] = df_raw['Consumo_Mensal_kWh'] * tarifa_media_calculada
-    
-    # Demanda
-    fatores_demanda = {
-        'Climatização': 0.85, 'Iluminação': 1.00, 'Informática': 0.70,
-        'Eletrodomésticos': 0.50, 'Elevadores': 0.30, 'Bombas': 0.70, 'Outros': 0.50
-    }
-
-    df_raw['Potencia_Instalada_kW'] = df_raw['Potencia_Total_Item_W'] / 1000
-    df_raw['Demanda_Estimada_kW'] = df_raw.apply(
-        lambda x: x['Potencia_Instalada_kW'] * fatores_demanda.get(x['Categoria_Macro'], 0.5),
-        axis=1
+    # Só as etapas cujas entradas mudaram são recalculadas (ver seção 1)
+    params_uso = dict(
+        horas_ar=horas_ar, horas_luz=horas_luz, horas_pc=horas_pc,
+        horas_eletro=horas_eletro, horas_outros=horas_outros,
+        dias_mes=dias_mes, fator_sazonal_clima=fator_sazonal_clima,
+        salas_24h=tuple(sorted(salas_24h))
     )
+    estatisticas = etapa_estatisticas(fontes)
+    resultados = etapa_agregados(fontes, params_uso, tarifa_media_calculada, tarifa_kw_demanda)
+
+    # df_raw é compartilhado entre as sessões (somente leitura): o que depende
+    # dos parâmetros fica em vetores desta sessão
+    consumo_kwh = etapa_consumo(fontes, **params_uso)
 
     # Totais
-    total_instalado_kw = df_raw['Potencia_Instalada_kW'].sum()
-    total_demanda_pico_kw = df_raw['Demanda_Estimada_kW'].sum()
-    consumo_total_kwh = df_raw['Consumo_Mensal_kWh'].sum()
+    total_instalado_kw = resultados['total_instalado_kw']
+    total_demanda_pico_kw = resultados['total_demanda_pico_kw']
+    consumo_total_kwh = resultados['consumo_total_kwh']
 
-    custo_demanda_fixo = total_demanda_pico_kw * tarifa_kw_demanda
-    custo_total_consumo = df_raw['Custo_Consumo_R$'].sum()
+    custo_demanda_fixo = resultados['custo_demanda_fixo']
+    custo_total_consumo = resultados['custo_total_consumo']
 
     # ---------------------------------------------------
     # 4. TABS DE VISUALIZAÇÃO
     # ---------------------------------------------------
-    tab1, tab2, tab_eff, tab3, tab4 = st.tabs([
+    # Só a aba aberta é calculada: as abas guardam a seleção (key) e a troca
+    # de aba refaz a execução, desenhando apenas a que tem .open. Cada aba é
+    # um fragmento, e cada grupo de drill-down é um fragmento dentro dela, de
+    # modo que mexer num controle refaz só o próprio grupo. Como o Streamlit
+    # descarta o estado de widgets que não são desenhados, os controles das
+    # abas usam chaves fixas em ESTADO_ABAS, regravadas a cada execução
+    # completa (None: só preserva o valor, sem padrão).
+    ESTADO_ABAS = {
+        # Viabilidade / ROI (lidos também pela aba de cenários, via plano_retrofit)
+        'roi_investimento': ROI_PADRAO['investimento'], 'roi_custo_led': ROI_PADRAO['custo_led'],
+        'roi_custo_ar': ROI_PADRAO['custo_ar'], 'roi_custo_pc': ROI_PADRAO['custo_pc'],
+        'roi_limitar_payback': False, 'roi_payback_maximo': 36,
+        'mc_cenarios': 2000, 'mc_faixa_pot': 40, 'mc_faixa_horas': 2.0, 'mc_faixa_fator': 25,
+        # Dimensionamento
+        'oc_largura_px': LARGURA_GRAFICO_PX,
+        # Cenários
+        'cen_variacao': 20, 'metrica_tornado': None, 'cen_eixo_x': varredura.PARAMETROS[2],
+        'cen_eixo_y': varredura.PARAMETROS[1], 'metrica_mapa': None, 'cen_pontos_mapa': 25,
+        'cen_params_grade': ['tarifa_fora_ponta', 'horas_ar', 'horas_luz', 'dias_mes'], 'cen_pontos_grade': 7,
+        # Detalhe e campus
+        'sel_setor_drill': None, 'sel_sala': None, 'sel_andar': None,
+        'campus_nivel': None, 'campus_separar': False,
+    }
+    for chave, padrao in ESTADO_ABAS.items():
+        if chave in st.session_state:
+            st.session_state[chave] = st.session_state[chave]
+        elif padrao is not None:
+            st.session_state[chave] = padrao
+    # Páginas das tabelas (mostrar_tabela) também sobrevivem à troca de aba
+    for chave in [k for k in st.session_state if str(k).startswith('pagina_')]:
+        st.session_state[chave] = st.session_state[chave]
+
+    def plano_retrofit():
+        """Plano de trocas da aba de ROI, com os parâmetros guardados no session_state."""
+        e = st.session_state
+        payback_maximo = e['roi_payback_maximo'] if e['roi_limitar_payback'] else None
+        return etapa_retrofit(
+            fontes, horas_luz, horas_ar, horas_pc, dias_mes, tarifa_media_calculada,
+            e['roi_custo_led'], e['roi_custo_ar'], e['roi_custo_pc'], e['roi_investimento'], payback_maximo
+        )
+
+    nomes_abas = [
         "📉 Dimensionamento (kW)",
         "⚡ Consumo (kWh)",
         "💡 Eficiência",
         "💰 Viabilidade / ROI",
+        "🧪 Cenários",
         "🏫 Detalhe por Andar / Sala"
-    ])
+    ]
+    if predios_campus:
+        nomes_abas.append("🏛️ Campus")
+    abas = st.tabs(nomes_abas, key="aba_ativa", on_change="rerun")
 
     # ---------------------------------------------------
     # TAB 1 — DIMENSIONAMENTO (BLOCO 1)
     # ---------------------------------------------------
-    with tab1:
+    @st.fragment
+    @metricas.medido("aba:dimensionamento")
+    def aba_dimensionamento():
         st.subheader("📉 Dimensionamento de Demanda (kW)")
         st.caption(f"Estação atual: **{periodo}** (Clima: {fator_sazonal_clima}x)")
 
@@ -350,22 +517,15 @@ if not df_raw.empty:
         k2.metric("Pico Estimado (Demanda)", formatar_br(total_demanda_pico_kw, sufixo=" kW", decimais=1))
         k3.metric("Custo Fixo Demanda", formatar_br(custo_demanda_fixo, prefixo="R$ "))
         
-        if not df_ocupacao.empty:
-            pico = df_ocupacao['Ocupacao_Acumulada'].max()
-            pico = 0 if pd.isna(pico) else pico
-            k4.metric("Pico de Ocupação", f"{int(pico)} pessoas")
-        else:
-            k4.metric("Pico de Ocupação", "N/A")
+        # Os blocos que dependem da ocupação ficam reservados e só são
+        # preenchidos no fim da aba, quando a planilha chega
+        vaga_pico = k4.empty()
+        vaga_pico.metric("Pico de Ocupação", "…")
 
         st.divider()
 
-        if not df_ocupacao.empty:
-            st.markdown("### 👥 Ocupação — Fluxo ao longo do tempo")
-            fig_oc = px.line(df_ocupacao, x="DataHora", y="Ocupacao_Acumulada",
-                             title="Fluxo de Pessoas (Acumulado Diário)")
-            fig_oc.update_layout(separators=",.") # Ajuste BR para eixos
-            st.plotly_chart(fig_oc, use_container_width=True)
-            st.divider()
+        vaga_fluxo = st.empty()
+        vaga_fluxo.info("⏳ Carregando dados de ocupação...")
 
         c_gauge, c_info = st.columns([1, 1.3])
         with c_gauge:
@@ -380,38 +540,37 @@ if not df_raw.empty:
                 }
             ))
             fig_gauge.update_layout(separators=",.") # Ponto como milhar, virgula decimal
-            st.plotly_chart(fig_gauge, use_container_width=True)
+            grafico(fig_gauge, width="stretch")
 
             kVA = total_demanda_pico_kw / 0.92
             st.info(f"⚙️ Transformador recomendado: **{formatar_br(kVA, decimais=0)} kVA** (FP = 0.92)")
 
         with c_info:
             st.markdown("### Tabela de Demanda por Categoria")
-            dft = df_raw.groupby('Categoria_Macro')[['Potencia_Instalada_kW', 'Demanda_Estimada_kW']].sum().reset_index()
-            dft['Fator'] = dft['Categoria_Macro'].map(fatores_demanda)
-            dft['Custo Demanda (R$)'] = dft['Demanda_Estimada_kW'] * tarifa_kw_demanda
+            dft = resultados['demanda_categoria']
 
             # Aplicação de estilo BR na tabela
-            st.dataframe(
-                dft.sort_values('Demanda_Estimada_kW', ascending=False).style.format({
-                    'Potencia_Instalada_kW': lambda x: formatar_br(x, decimais=1),
-                    'Demanda_Estimada_kW': lambda x: formatar_br(x, decimais=1),
-                    'Fator': lambda x: formatar_br(x, decimais=2),
-                    'Custo Demanda (R$)': lambda x: formatar_br(x, prefixo="R$ ")
-                }),
-                use_container_width=True, hide_index=True
+            mostrar_tabela(
+                dft.sort_values('Demanda_Estimada_kW', ascending=False), {
+                    'Potencia_Instalada_kW': dict(decimais=1),
+                    'Demanda_Estimada_kW': dict(decimais=1),
+                    'Fator': dict(decimais=2),
+                    'Custo Demanda (R$)': dict(prefixo="R$ ")
+                },
+                width="stretch", hide_index=True
             )
 
         st.divider()
 
         st.markdown("### 🔍 Consumo Real (kWh) vs Capacidade (kW)")
 
-        potencia_media_kw = consumo_total_kwh / 720  
+        eficiencia = nucleo.indicadores_eficiencia(consumo_total_kwh, total_demanda_pico_kw, total_instalado_kw)
+        potencia_media_kw = eficiencia['potencia_media_kw']
 
         p1, p2, p3 = st.columns(3)
         p1.metric("Potência Média Real", formatar_br(potencia_media_kw, sufixo=" kW", decimais=1))
-        p2.metric("Uso vs Pico", formatar_br((potencia_media_kw/total_demanda_pico_kw)*100, sufixo="%"))
-        p3.metric("Uso vs Instalada", formatar_br((potencia_media_kw/total_instalado_kw)*100, sufixo="%"))
+        p2.metric("Uso vs Pico", formatar_br(eficiencia['uso_vs_pico_pct'], sufixo="%"))
+        p3.metric("Uso vs Instalada", formatar_br(eficiencia['uso_vs_instalada_pct'], sufixo="%"))
 
         if potencia_media_kw < 0.7 * total_demanda_pico_kw:
             st.success("Uso real **bem abaixo do pico**.")
@@ -420,10 +579,152 @@ if not df_raw.empty:
         else:
             st.warning("⚠️ Uso real **acima do pico** — revise a demanda.")
 
+        st.divider()
+
+        vaga_simulacao = st.empty()
+        vaga_simulacao.info("⏳ A simulação horária aguarda os dados de ocupação...")
+
+        # Só agora se espera pela ocupação (lida em segundo plano desde o início
+        # da execução) e as vagas reservadas acima são preenchidas
+        with metricas.etapa("aba:dimensionamento:ocupacao"):
+            df_ocupacao = ler_ocupacao(*fontes[1])
+            if not df_ocupacao.empty:
+                resumo_ocupacao = etapa_resumo_ocupacao(fontes)
+                pico = resumo_ocupacao['Pico_Ocupacao'].max()
+                pico = 0 if pd.isna(pico) else pico
+                vaga_pico.metric("Pico de Ocupação", f"{int(pico)} pessoas")
+            else:
+                vaga_pico.metric("Pico de Ocupação", "N/A")
+
+            if not df_ocupacao.empty:
+                with vaga_fluxo.container():
+                    st.markdown("### 👥 Ocupação — Fluxo ao longo do tempo")
+
+                    # Fragmento: mover a janela refaz só o gráfico de fluxo
+                    @st.fragment
+                    def fluxo_ocupacao():
+
+                        # Janela do gráfico: ao estreitar, a série é reamostrada em resolução maior
+                        dias_oc = resumo_ocupacao['Data_Dia']
+                        janela = (None, None)
+                        if dias_oc.nunique() > 1:
+                            janela = st.slider(
+                                "Janela do gráfico", min_value=dias_oc.min(), max_value=dias_oc.max(),
+                                value=(dias_oc.min(), dias_oc.max()), format="DD/MM/YYYY"
+                            )
+                        # O Streamlit não informa a largura da tela: o usuário escolhe a
+                        # resolução pela largura do gráfico (2 pontos por pixel)
+                        largura_px = st.select_slider(
+                            "Resolução (largura do gráfico, px)", options=[600, 1000, 1600, 2400, 3200],
+                            key="oc_largura_px"
+                        )
+                        serie_oc, n_eventos = etapa_serie_ocupacao(fontes, *janela, largura_px)
+
+                        # WebGL quando a janela é densa (muitos eventos)
+                        Traco = go.Scattergl if n_eventos > pontos_para_largura(largura_px) else go.Scatter
+                        fig_oc = go.Figure(Traco(x=serie_oc['DataHora'], y=serie_oc['Ocupacao_Acumulada'], mode='lines'))
+                        fig_oc.update_layout(
+                            title="Fluxo de Pessoas (Acumulado Diário)",
+                            xaxis_title="DataHora", yaxis_title="Ocupacao_Acumulada",
+                            separators=",." # Ajuste BR para eixos
+                        )
+                        grafico(fig_oc, width="stretch")
+                        st.caption(f"{formatar_br(len(serie_oc), decimais=0)} de {formatar_br(n_eventos, decimais=0)} eventos exibidos (picos preservados).")
+
+                        with st.expander("📅 Resumo diário (pico, entradas e saídas)"):
+                            st.dataframe(
+                                resumo_ocupacao.rename(columns={
+                                    'Data_Dia': 'Dia', 'Pico_Ocupacao': 'Pico (pessoas)', 'Saidas': 'Saídas'
+                                }),
+                                width="stretch", hide_index=True
+                            )
+
+                    fluxo_ocupacao()
+                    st.divider()
+            else:
+                vaga_fluxo.empty()
+
+            with vaga_simulacao.container():
+                st.markdown("### 📈 Perfil Horário Simulado (8760 h)")
+                sim = etapa_simulacao(fontes, params_uso)
+                fator_carga = (sim['energia_anual_kwh'] / len(sim['total_kw'])) / sim['pico_coincidente_kw'] if sim['pico_coincidente_kw'] > 0 else 0
+
+                s1, s2, s3 = st.columns(3)
+                s1.metric("Pico Coincidente (Simulado)", formatar_br(sim['pico_coincidente_kw'], sufixo=" kW", decimais=1))
+                s2.metric("Fator de Carga", formatar_br(fator_carga * 100, sufixo="%"))
+                s3.metric("Energia Anual (Simulada)", formatar_br(sim['energia_anual_kwh'], sufixo=" kWh", decimais=0))
+                st.caption(f"Pico em {sim['hora_pico']:%d/%m/%Y %H:%M}. Agenda pelas horas do sidebar, modulada pelo perfil de ocupação das catracas.")
+
+                c_ldc, c_mes = st.columns(2)
+                with c_ldc:
+                    fig_ldc = px.line(
+                        x=np.arange(1, len(sim['curva_duracao_kw']) + 1), y=sim['curva_duracao_kw'],
+                        labels={'x': 'Horas no ano', 'y': 'kW'}, title="Curva de Duração de Carga"
+                    )
+                    fig_ldc.update_layout(separators=",.")
+                    grafico(fig_ldc, width="stretch")
+                with c_mes:
+                    df_mes = sim['mensal_kwh'].reset_index().melt(id_vars='Mes', var_name='Grupo', value_name='kWh')
+                    fig_mes = px.bar(df_mes, x='Mes', y='kWh', color='Grupo', title="Consumo Mensal Simulado (kWh)")
+                    fig_mes.update_layout(separators=",.")
+                    grafico(fig_mes, width="stretch")
+
+                st.divider()
+
+                st.markdown("### ⏱️ Demanda Integrada (15 min) e Demanda Contratada")
+                with st.expander("Usar medição real (CSV com data/hora e kW)"):
+                    arquivo_medicao = st.file_uploader("Arquivo de medição", type=["csv"])
+
+                dem = None
+                if arquivo_medicao is not None:
+                    try:
+                        dem = etapa_demanda_medida(arquivo_medicao.getvalue(), tarifa_kw_demanda, total_instalado_kw)
+                        origem_dem = "medição enviada"
+                    except Exception as e:
+                        st.warning(f"Não foi possível ler a medição: {e}")
+                if dem is None:
+                    dem = etapa_demanda_simulada(fontes, params_uso, tarifa_kw_demanda)
+                    origem_dem = "simulação horária"
+
+                d1, d2, d3, d4 = st.columns(4)
+                d1.metric("Máxima 15 min", formatar_br(dem['maxima_kw'], sufixo=" kW", decimais=1))
+                d2.metric("P95 (15 min)", formatar_br(dem['percentis'][95], sufixo=" kW", decimais=1))
+                d3.metric("Contratada Recomendada", formatar_br(dem['contratada_kw'], sufixo=" kW", decimais=0))
+                d4.metric("Custo Anual de Demanda", formatar_br(dem['custo_anual'], prefixo="R$ "))
+                st.caption(
+                    f"Fonte: {origem_dem}. Custo = maior entre contratada e medida × tarifa, mais "
+                    f"{formatar_br(MULTIPLICADOR_ULTRAPASSAGEM, decimais=0)}× o excedente acima de "
+                    f"{formatar_br(TOLERANCIA_ULTRAPASSAGEM * 100, decimais=0)}% de tolerância."
+                )
+                if dem['acima_instalada']:
+                    st.warning(
+                        f"⚠️ O menor custo pediria contratar acima da potência instalada "
+                        f"({formatar_br(total_instalado_kw, sufixo=' kW', decimais=1)}); a recomendação foi "
+                        f"limitada a ela. Revise a {origem_dem} ou o inventário."
+                    )
+
+                c_curva, c_max = st.columns([1.6, 1])
+                with c_curva:
+                    fig_curva = px.line(dem['curva_custo'], x='Demanda_Contratada_kW', y='Custo_Anual_R$',
+                                        title="Custo Anual × Demanda Contratada")
+                    fig_curva.add_vline(x=dem['contratada_kw'], line_dash="dash", line_color="red")
+                    fig_curva.update_layout(separators=",.")
+                    grafico(fig_curva, width="stretch")
+                with c_max:
+                    mostrar_tabela(
+                        dem['mensal'].reset_index().astype({'Mes': str}), {
+                            'Demanda_Maxima_kW': dict(decimais=1),
+                            'Demanda_Media_kW': dict(decimais=1)
+                        },
+                        width="stretch", hide_index=True
+                    )
+
     # ---------------------------------------------------
     # TAB 2 — CONSUMO
     # ---------------------------------------------------
-    with tab2:
+    @st.fragment
+    @metricas.medido("aba:consumo")
+    def aba_consumo():
         st.subheader("⚡ Consumo Mensal (kWh)")
 
         fatura_total = custo_demanda_fixo + custo_total_consumo
@@ -436,7 +737,7 @@ if not df_raw.empty:
         st.divider()
 
         # Gráfico Consumo
-        df_cons_cat = df_raw.groupby('Categoria_Macro')['Consumo_Mensal_kWh'].sum().reset_index()
+        df_cons_cat = resultados['consumo_categoria'][['Categoria_Macro', 'Consumo_Mensal_kWh']]
         fig_bar = px.bar(
             df_cons_cat,
             x='Categoria_Macro', y='Consumo_Mensal_kWh',
@@ -447,13 +748,15 @@ if not df_raw.empty:
         fig_bar.update_layout(separators=",.")
         fig_bar.update_traces(texttemplate='%{y:,.0f} kWh', textposition='outside')
         
-        st.plotly_chart(fig_bar, use_container_width=True)
+        grafico(fig_bar, width="stretch")
 
 
     # ---------------------------------------------------
     # TAB 3 — 💡 EFICIÊNCIA
     # ---------------------------------------------------
-    with tab_eff:
+    @st.fragment
+    @metricas.medido("aba:eficiencia")
+    def aba_eficiencia():
         st.subheader("💡 Eficiência Energética — Potencial de Redução (%) e Economia")
 
         st.markdown("""
@@ -466,8 +769,8 @@ if not df_raw.empty:
             "Eletrodomésticos": 0.20, "Elevadores": 0.05, "Bombas": 0.15, "Outros": 0.10
         }
 
-        resumo = df_raw.groupby("Categoria_Macro")["Consumo_Mensal_kWh"].sum().reset_index()
-        resumo["Reducao_%"] = resumo["Categoria_Macro"].map(eficiencia_params)
+        resumo = resultados['consumo_categoria'][["Categoria_Macro", "Consumo_Mensal_kWh"]].copy()
+        resumo["Reducao_%"] = resumo["Categoria_Macro"].map(eficiencia_params).astype(float)
         resumo["Economia_kWh"] = resumo["Consumo_Mensal_kWh"] * resumo["Reducao_%"]
         resumo["Economia_R$"] = resumo["Economia_kWh"] * tarifa_media_calculada
 
@@ -481,14 +784,14 @@ if not df_raw.empty:
         st.divider()
 
         st.markdown("###  Economia por Categoria")
-        st.dataframe(
-            resumo.sort_values("Economia_R$", ascending=False).style.format({
-                "Consumo_Mensal_kWh": lambda x: formatar_br(x, decimais=0),
-                "Reducao_%": "{:.0%}",
-                "Economia_kWh": lambda x: formatar_br(x, decimais=0),
-                "Economia_R$": lambda x: formatar_br(x, prefixo="R$ ")
-            }),
-            use_container_width=True,
+        mostrar_tabela(
+            resumo.sort_values("Economia_R$", ascending=False).assign(**{"Reducao_%": resumo["Reducao_%"] * 100}), {
+                "Consumo_Mensal_kWh": dict(decimais=0),
+                "Reducao_%": dict(sufixo="%", decimais=0),
+                "Economia_kWh": dict(decimais=0),
+                "Economia_R$": dict(prefixo="R$ ")
+            },
+            width="stretch",
             hide_index=True
         )
 
@@ -520,7 +823,7 @@ if not df_raw.empty:
             fig_econ.update_layout(separators=",.", showlegend=False) 
             # Ajuste para formatar o R$ nas barras
             fig_econ.update_traces(texttemplate='R$ %{y:,.2f}', textposition='outside')
-            st.plotly_chart(fig_econ, use_container_width=True)
+            grafico(fig_econ, width="stretch")
 
         with col_p:
             fig_pie_e = px.pie(
@@ -534,12 +837,14 @@ if not df_raw.empty:
             )
             fig_pie_e.update_layout(separators=",.")
             fig_pie_e.update_traces(textinfo='percent+label')
-            st.plotly_chart(fig_pie_e, use_container_width=True)
+            grafico(fig_pie_e, width="stretch")
 
     # ---------------------------------------------------
     # TAB 4 — VIABILIDADE(ROI)
     # ---------------------------------------------------
-    with tab3:
+    @st.fragment
+    @metricas.medido("aba:viabilidade")
+    def aba_viabilidade():
         st.subheader("💰 Simulador de Viabilidade — ROI do Projeto")
 
         col_l, col_r = st.columns([1, 2])
@@ -549,57 +854,65 @@ if not df_raw.empty:
             
             investimento = st.number_input(
                 "Orçamento disponível (R$):",
-                value=50000.0,
-                step=5000.0
+                step=5000.0, key="roi_investimento"
             )
 
             st.markdown("#### 🔧 Custos unitários de modernização")
-            custo_led = st.number_input("Troca p/ LED", value=25.0)
-            custo_ar = st.number_input("Ar Inverter (R$)", value=3500.0)
-            custo_pc = st.number_input("Mini PC (R$)", value=2800.0)
+            st.number_input("Troca p/ LED", key="roi_custo_led")
+            st.number_input("Ar Inverter (R$)", key="roi_custo_ar")
+            st.number_input("Mini PC (R$)", key="roi_custo_pc")
+
+            st.markdown("#### 🎯 Critério")
+            if st.checkbox("Excluir itens com payback individual alto", key="roi_limitar_payback"):
+                st.slider("Payback máximo por item (meses)", 6, 120, step=6, key="roi_payback_maximo")
 
             st.info("""
-            📌 **Ordem de prioridade automática:** 1) Iluminação → 2) Climatização → 3) Informática  
+            📌 **Alocação otimizada:** cada grupo sala × equipamento é um candidato com custo e
+            economia próprios; a verba vai para as trocas de maior economia por real investido.
             """)
 
         with col_r:
-            st.markdown("### Distribuição automática da verba")
-
-            # Filtros
-            df_luz = df_raw[df_raw["Categoria_Macro"] == "Iluminação"]
-            df_ar = df_raw[df_raw["Categoria_Macro"] == "Climatização"]
-            df_pc = df_raw[df_raw["Categoria_Macro"] == "Informática"]
-
-            qtd_luz = df_luz["Quant"].sum()
-            qtd_ar = df_ar["Quant"].sum()
-            qtd_pc = df_pc["Quant"].sum()
-
-            # AJUSTE 3: CÁLCULO DA POTÊNCIA MÉDIA REAL DO INVENTÁRIO (W)
-            # Ajustei os fallbacks para bater com o relatório (32W Lâmpada, 1400W Ar)
-            media_w_luz = df_luz["Potencia_Real_W"].mean() if not df_luz.empty else 32.0
-            media_w_ar = df_ar["Potencia_Real_W"].mean() if not df_ar.empty else 1400.0
-            media_w_pc = df_pc["Potencia_Real_W"].mean() if not df_pc.empty else 200.0
-
-            # Lógica de investimento
-            max_inv_luz = qtd_luz * custo_led
-            inv_luz = min(investimento, max_inv_luz)
-            sobra_1 = investimento - inv_luz
-            luz_trocadas = int(inv_luz / custo_led) if custo_led > 0 else 0
-
-            max_inv_ar = qtd_ar * custo_ar
-            inv_ar = min(sobra_1, max_inv_ar)
-            sobra_2 = sobra_1 - inv_ar
-            ar_trocados = int(inv_ar / custo_ar) if custo_ar > 0 else 0
-
-            max_inv_pc = qtd_pc * custo_pc
-            inv_pc = min(sobra_2, max_inv_pc)
-            pc_trocados = int(inv_pc / custo_pc) if custo_pc > 0 else 0
+            st.markdown("### Distribuição otimizada da verba")
+
+            plano, resumo_plano = plano_retrofit()
+            unidades = resumo_plano['unidades']
+            luz_trocadas = int(unidades.get("Iluminação", 0))
+            ar_trocados = int(unidades.get("Climatização", 0))
+            pc_trocados = int(unidades.get("Informática", 0))
 
             c1, c2, c3 = st.columns(3)
             c1.metric("Lâmpadas instaladas", formatar_br(luz_trocadas, sufixo=" un.", decimais=0))
             c2.metric("Ar-condicionados novos", formatar_br(ar_trocados, sufixo=" un.", decimais=0))
             c3.metric("Mini PCs adquiridos", formatar_br(pc_trocados, sufixo=" un.", decimais=0))
 
+            st.caption(
+                f"Investido: **{formatar_br(resumo_plano['investido'], prefixo='R$ ')}** de "
+                f"{formatar_br(investimento, prefixo='R$ ')} · Limite superior (relaxação linear): "
+                f"{formatar_br(resumo_plano['limite_superior'], prefixo='R$ ')}/mês · "
+                f"Gap de otimalidade: {formatar_br(resumo_plano['gap_pct'], sufixo='%', decimais=3)}"
+            )
+
+        with st.expander(f"📋 Itens selecionados ({formatar_br(len(plano), decimais=0)} grupos)", expanded=False):
+            colunas_plano = [
+                'Setor', 'Id_sala', 'Categoria_Macro', 'des_nome_generico_equipamento', 'Potencia_Real_W',
+                'Unidades_Trocadas', 'Investimento_R$', 'Economia_Mensal_R$', 'Payback_Meses'
+            ]
+            mostrar_tabela(
+                plano[colunas_plano], {
+                    'Potencia_Real_W': dict(sufixo=" W", decimais=0),
+                    'Unidades_Trocadas': dict(decimais=0),
+                    'Investimento_R$': dict(prefixo="R$ "),
+                    'Economia_Mensal_R$': dict(prefixo="R$ "),
+                    'Payback_Meses': dict(decimais=1),
+                },
+                chave="pagina_plano", width="stretch", hide_index=True
+            )
+            st.download_button(
+                "⬇️ Baixar lista de trocas (CSV)",
+                plano[colunas_plano].to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig'),
+                file_name="plano_retrofit.csv", mime="text/csv"
+            )
+
         st.divider()
 
         st.markdown("### 📉 Economia Mensal Estimada")
@@ -607,30 +920,9 @@ if not df_raw.empty:
         # TEXTO CORRIGIDO: Mostra o valor real da tarifa usada no cálculo
         st.caption(f"Base de Cálculo: Tarifa Média Ponderada (**{formatar_br(tarifa_media_calculada, prefixo='R$ ')}/kWh**).")
 
-        # CÁLCULO DE ECONOMIA REVISADO
-        # Economia = Qtd * (Potencia_Antiga_kW - Potencia_Nova_kW) * Horas * Dias * Tarifa
-        
-        # Lâmpadas: Assume LED novo = 18W (0.018 kW) ou 50% de redução
-        kwh_old_luz = (media_w_luz / 1000)
-        kwh_new_luz = kwh_old_luz * 0.50 # Assume 50% de redução (LED)
-        eco_luz = luz_trocadas * ((kwh_old_luz - kwh_new_luz) * horas_luz * dias_mes * tarifa_media_calculada)
-
-        # Ar Condicionado: Assume Inverter economiza 35% sobre a média real
-        # FATOR DE USO 0.60 APLICADO AQUI TAMBÉM (CRÍTICO)
-        kwh_old_ar = (media_w_ar / 1000) * 0.60 # Duty Cycle Antigo
-        kwh_new_ar = kwh_old_ar * 0.65 # Redução de 35% no consumo real
-        eco_ar = ar_trocados * ((kwh_old_ar - kwh_new_ar) * horas_ar * dias_mes * tarifa_media_calculada)
-
-        # PCs: Assume Mini PC novo = 35W médio vs Desktop antigo
-        kwh_old_pc = (media_w_pc / 1000) * 0.80 # Duty Cycle Antigo
-        kwh_new_pc = (0.035) * 0.90 # Mini PC consumo médio 35W
-        eco_pc = pc_trocados * ((kwh_old_pc - kwh_new_pc) * horas_pc * dias_mes * tarifa_media_calculada)
-        
-        # Proteção para não dar economia negativa
-        eco_pc = max(eco_pc, 0)
-
-        economia_total = eco_luz + eco_ar + eco_pc
-        payback = investimento / economia_total if economia_total > 0 else 999
+        # Economia e payback do plano (fórmulas em roi.py, potência real de cada item)
+        economia_total = resumo_plano['economia']
+        payback = resumo_plano['payback']
 
         k1, k2 = st.columns(2)
         k1.metric("Economia Mensal", formatar_br(economia_total, prefixo="R$ "))
@@ -643,11 +935,182 @@ if not df_raw.empty:
         else:
             st.warning("⚠️ Retorno Longo (> 3 anos) — Reavaliar prioridades.")
 
+        st.divider()
+
+        # ---------------------------------------------------
+        # INCERTEZA (MONTE CARLO)
+        # ---------------------------------------------------
+        # Fragmento próprio: mexer nas distribuições refaz só a simulação
+        @st.fragment
+        def incerteza():
+            st.markdown("### 🎲 Incerteza (Monte Carlo)")
+            st.caption(
+                "Potências imputadas, horas e fatores de uso são estimativas. Cada cenário sorteia "
+                "esses valores (distribuição triangular) e recalcula consumo, conta e payback."
+            )
+
+            with st.expander("Configurar distribuições", expanded=False):
+                m1, m2, m3, m4 = st.columns(4)
+                n_amostras = m1.select_slider("Cenários", options=[500, 1000, 2000, 5000, 10000], key="mc_cenarios")
+                faixa_pot = m2.slider("Potência imputada (±%)", 0, 80, step=5, key="mc_faixa_pot")
+                faixa_horas = m3.slider("Horas de uso (± h)", 0.0, 4.0, step=0.5, key="mc_faixa_horas")
+                faixa_fator = m4.slider("Fator de uso (±%)", 0, 50, step=5, key="mc_faixa_fator")
+
+            distribuicoes = dict(DISTRIBUICOES_PADRAO)
+            distribuicoes['potencia_imputada'] = ('triangular', 1 - faixa_pot / 100, 1.0, 1 + faixa_pot / 100)
+            distribuicoes['horas'] = ('triangular', -faixa_horas, 0.0, faixa_horas)
+            distribuicoes['fator_uso'] = ('triangular', 1 - faixa_fator / 100, 1.0, 1 + faixa_fator / 100)
+
+            # Potência média (ponderada pelas unidades) dos itens do plano, por categoria
+            media_plano = (
+                (plano['Potencia_Real_W'] * plano['Unidades_Trocadas']).groupby(plano['Categoria_Macro'], observed=True).sum()
+                / plano.groupby('Categoria_Macro', observed=True)['Unidades_Trocadas'].sum()
+            )
+            roi_mc = (
+                ('luz_trocadas', luz_trocadas), ('ar_trocados', ar_trocados),
+                ('pc_trocados', pc_trocados), ('investimento', resumo_plano['investido']),
+                ('media_w_luz', media_plano.get("Iluminação")), ('media_w_ar', media_plano.get("Climatização")),
+                ('media_w_pc', media_plano.get("Informática")),
+            )
+            with st.spinner("Simulando cenários..."):
+                amostras = etapa_monte_carlo(
+                    fontes, params_uso, tarifa_media_calculada, custo_demanda_fixo,
+                    roi_mc, n_amostras, tuple(sorted(distribuicoes.items()))
+                )
+            bandas = resumir(amostras)
+
+            b1, b2, b3 = st.columns(3)
+            b1.metric("Conta Total (P50)", formatar_br(bandas.loc['Conta Total (R$/mês)', 'P50'], prefixo="R$ "),
+                      help=f"P10–P90: {formatar_br(bandas.loc['Conta Total (R$/mês)', 'P10'], prefixo='R$ ')} a "
+                           f"{formatar_br(bandas.loc['Conta Total (R$/mês)', 'P90'], prefixo='R$ ')}")
+            b2.metric("Consumo (P50)", formatar_br(bandas.loc['Consumo (kWh/mês)', 'P50'], sufixo=" kWh", decimais=0))
+            b3.metric("Payback (P50)", formatar_br(bandas.loc['Payback (meses)', 'P50'], sufixo=" meses", decimais=1))
+            st.caption(
+                f"Consumo Total determinístico: {formatar_br(consumo_total_kwh, sufixo=' kWh', decimais=0)} "
+                f"(P10–P90 dos cenários: {formatar_br(bandas.loc['Consumo (kWh/mês)', 'P10'], decimais=0)} a "
+                f"{formatar_br(bandas.loc['Consumo (kWh/mês)', 'P90'], sufixo=' kWh', decimais=0)}). "
+                f"{', '.join(CATEGORIAS_NO_TETO)} já usam fator de uso de 100%: nelas o fator é sorteado "
+                "só para baixo (até o mínimo da faixa), então a mediana tende a ficar abaixo do valor determinístico."
+            )
+
+            mostrar_tabela(bandas, width="stretch")
+
+            fig_mc = px.histogram(
+                pd.DataFrame({'Payback (meses)': amostras['payback']}), x='Payback (meses)', nbins=60,
+                title=f"Distribuição do Payback ({formatar_br(n_amostras, decimais=0)} cenários)"
+            )
+            for p in ('P10', 'P50', 'P90'):
+                fig_mc.add_vline(x=bandas.loc['Payback (meses)', p], line_dash="dash", annotation_text=p)
+            grafico(fig_mc, width="stretch")
+
+        incerteza()
+
+    # ---------------------------------------------------
+    # TAB CENÁRIOS — VARREDURA E SENSIBILIDADE
+    # ---------------------------------------------------
+    @st.fragment
+    @metricas.medido("aba:cenarios")
+    def aba_cenarios():
+        st.subheader("🧪 Varredura de Cenários e Sensibilidade")
+        st.caption(
+            "Todas as combinações são avaliadas de uma vez (coeficientes de kWh do inventário × grade "
+            "de parâmetros), sem recarregar o painel a cada ajuste. O payback é o do plano de trocas "
+            "da aba de ROI."
+        )
+
+        coef_a, coef_b = etapa_coeficientes(fontes, fator_sazonal_clima, params_uso['salas_24h'])
+        plano, resumo_plano = plano_retrofit()
+        kw_cenarios = dict(
+            a=coef_a, b=coef_b, peso_ponta=peso_ponta, custo_fixo=custo_demanda_fixo,
+            e=varredura.coeficientes_economia(plano), investido=resumo_plano['investido']
+        )
+        base_cen = dict(
+            tarifa_ponta=tarifa_ponta, tarifa_fora_ponta=tarifa_fora_ponta,
+            horas_ar=horas_ar, horas_luz=horas_luz, horas_pc=horas_pc,
+            horas_eletro=horas_eletro, horas_outros=horas_outros, dias_mes=dias_mes
+        )
+        metricas_cen = {"Conta Total (R$/mês)": 'Conta_R$', "Payback (meses)": 'Payback_Meses',
+                        "Consumo (kWh/mês)": 'Consumo_kWh'}
+
+        def faixa_parametro(p, variacao):
+            """Limites (baixo, alto) de um parâmetro para ±variacao% da base."""
+            lim = (0.0, 24.0) if p.startswith('horas') else (1.0, 31.0) if p == 'dias_mes' else (0.0, np.inf)
+            v = float(base_cen[p])
+            return max(v * (1 - variacao / 100), lim[0]), min(v * (1 + variacao / 100), lim[1])
+
+        col_t1, col_t2 = st.columns([1, 3])
+        with col_t1:
+            variacao = st.slider("Variação de cada parâmetro (±%)", 5, 50, step=5, key="cen_variacao")
+            metrica_tornado = st.radio("Métrica", list(metricas_cen), key="metrica_tornado")
+        with col_t2:
+            faixas = {p: faixa_parametro(p, variacao) for p in varredura.PARAMETROS}
+            tor = varredura.tornado(base_cen, faixas, metricas_cen[metrica_tornado], **kw_cenarios)
+            ref = tor.attrs['base']
+            fig_tor = go.Figure()
+            fig_tor.add_trace(go.Bar(y=tor['Parametro'], x=tor['Baixo'] - ref, base=ref, orientation='h',
+                                     name=f"-{variacao}%", marker_color='#2ca02c'))
+            fig_tor.add_trace(go.Bar(y=tor['Parametro'], x=tor['Alto'] - ref, base=ref, orientation='h',
+                                     name=f"+{variacao}%", marker_color='#d62728'))
+            fig_tor.update_layout(barmode='overlay', title=f"Tornado — {metrica_tornado}",
+                                  xaxis_title=metrica_tornado, height=420)
+            fig_tor.add_vline(x=ref, line_dash="dash", line_color="gray")
+            grafico(fig_tor, width="stretch")
+
+        st.divider()
+        st.markdown("#### 🗺️ Mapa de Calor (2 parâmetros)")
+        h1, h2, h3, h4 = st.columns(4)
+        eixo_x = h1.selectbox("Eixo X", varredura.PARAMETROS, format_func=varredura.ROTULOS.get, key="cen_eixo_x")
+        eixo_y = h2.selectbox("Eixo Y", varredura.PARAMETROS, format_func=varredura.ROTULOS.get, key="cen_eixo_y")
+        metrica_mapa = h3.selectbox("Métrica", list(metricas_cen), key="metrica_mapa")
+        pontos_mapa = h4.slider("Pontos por eixo", 5, 60, key="cen_pontos_mapa")
+
+        if eixo_x == eixo_y:
+            st.info("Escolha dois parâmetros diferentes para o mapa de calor.")
+        else:
+            faixas_mapa = {p: faixa_parametro(p, max(variacao, 30)) for p in (eixo_x, eixo_y)}
+            mapa = varredura.mapa_calor(
+                base_cen, eixo_x, np.linspace(*faixas_mapa[eixo_x], pontos_mapa),
+                eixo_y, np.linspace(*faixas_mapa[eixo_y], pontos_mapa),
+                metricas_cen[metrica_mapa], **kw_cenarios
+            )
+            fig_mapa = px.imshow(
+                mapa.to_numpy(), x=mapa.columns, y=mapa.index, origin='lower', aspect='auto',
+                color_continuous_scale='RdYlGn_r',
+                labels=dict(x=varredura.ROTULOS[eixo_x], y=varredura.ROTULOS[eixo_y], color=metrica_mapa)
+            )
+            fig_mapa.add_trace(go.Scatter(x=[base_cen[eixo_x]], y=[base_cen[eixo_y]], mode='markers',
+                                          marker=dict(symbol='x', size=12, color='black'), name="Atual"))
+            grafico(fig_mapa, width="stretch")
+
+        st.divider()
+        st.markdown("#### 📦 Varredura Completa")
+        s1, s2 = st.columns([3, 1])
+        params_grade = s1.multiselect(
+            "Parâmetros a varrer (demais ficam no valor atual)", varredura.PARAMETROS,
+            format_func=varredura.ROTULOS.get, key="cen_params_grade"
+        )
+        pontos_grade = s2.slider("Pontos por parâmetro", 2, 15, key="cen_pontos_grade")
+        if params_grade:
+            grade = {p: np.linspace(*faixa_parametro(p, variacao), pontos_grade) for p in params_grade}
+            todos = varredura.avaliar_cenarios(varredura.grade_cenarios(base_cen, grade), **kw_cenarios)
+            st.caption(f"{formatar_br(len(todos), decimais=0)} cenários avaliados.")
+            resumo_grade = todos[list(metricas_cen.values())].describe(percentiles=[0.1, 0.5, 0.9]).T
+            resumo_grade.index = list(metricas_cen)
+            mostrar_tabela(resumo_grade.drop(columns='count'), width="stretch")
+            st.download_button(
+                "⬇️ Baixar cenários (CSV)", todos.to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig'),
+                file_name="cenarios.csv", mime="text/csv"
+            )
+
     # ---------------------------------------------------
     # TAB 5 — DETALHES ANDAR / SALA
     # ---------------------------------------------------
-    with tab4:
+    @st.fragment
+    @metricas.medido("aba:detalhe")
+    def aba_detalhe():
         st.subheader("Análise detalhada")
+        # Recortes por setor, sala e andar saem do cubo (sem varrer o inventário)
+        cubo = resultados['cubo']
 
         col_a, col_s = st.columns(2)
 
@@ -656,138 +1119,243 @@ if not df_raw.empty:
             st.markdown("### 🏢 Consumo por Setor")
             
             # Global Stats (Mantido)
-            qtd_por_setor = df_raw.groupby('Setor')['Quant'].sum()
-            media_aparelhos_setor = qtd_por_setor.mean()
+            media_aparelhos_setor = estatisticas['media_aparelhos_setor']
             st.metric("Média de Aparelhos por Unidade Adm.", formatar_br(media_aparelhos_setor, sufixo=" un.", decimais=0))
 
-            # Interatividade de Drill-down
-            st.markdown("#### 🔍 Detalhar Setor")
-            lista_setores = sorted(df_raw['Setor'].unique())
-            setor_sel = st.selectbox("Selecione a Unidade Administrativa:", lista_setores, key="sel_setor_drill")
-
-            # Filtra dados pelo setor selecionado
-            df_sel_setor = df_raw[df_raw['Setor'] == setor_sel]
-            
-            custo_setor = df_sel_setor["Custo_Consumo_R$"].sum()
-            consumo_setor = df_sel_setor["Consumo_Mensal_kWh"].sum()
+            # Cada drill-down é um fragmento: trocar a seleção refaz só o grupo
+            @st.fragment
+            def detalhe_setor():
+                # Interatividade de Drill-down
+                st.markdown("#### 🔍 Detalhar Setor")
+                lista_setores = estatisticas['lista_setores']
+                setor_sel = st.selectbox("Selecione a Unidade Administrativa:", lista_setores, key="sel_setor_drill")
+
+                # Totais do setor selecionado (consulta ao cubo de agregados)
+                custo_setor = cubo_valor(cubo, 'Custo_Consumo_R$', Setor=setor_sel)
+                consumo_setor = cubo_valor(cubo, 'Consumo_Mensal_kWh', Setor=setor_sel)
             
-            c_s1, c_s2 = st.columns(2)
-            c_s1.metric("Custo do Setor", formatar_br(custo_setor, prefixo="R$ "))
-            c_s2.metric("Consumo do Setor", formatar_br(consumo_setor, sufixo=" kWh", decimais=0))
+                c_s1, c_s2 = st.columns(2)
+                c_s1.metric("Custo do Setor", formatar_br(custo_setor, prefixo="R$ "))
+                c_s2.metric("Consumo do Setor", formatar_br(consumo_setor, sufixo=" kWh", decimais=0))
 
-            st.caption(f"Salas que compõem o setor: **{setor_sel}**")
+                st.caption(f"Salas que compõem o setor: **{setor_sel}**")
             
-            # Agrupa por SALA dentro do SETOR selecionado
-            df_rooms_sector = df_sel_setor.groupby("Id_sala")[["Consumo_Mensal_kWh", "Custo_Consumo_R$"]].sum().reset_index()
-            df_rooms_sector = df_rooms_sector.sort_values("Custo_Consumo_R$", ascending=False)
-
-            st.dataframe(
-                df_rooms_sector.style.format({
-                    "Consumo_Mensal_kWh": lambda x: formatar_br(x, sufixo=" kWh", decimais=0),
-                    "Custo_Consumo_R$": lambda x: formatar_br(x, prefixo="R$ ")
-                }),
-                use_container_width=True, hide_index=True
-            )
+                # Agrupa por SALA dentro do SETOR selecionado
+                df_rooms_sector = cubo_tabela(cubo, ['Id_sala'], ["Consumo_Mensal_kWh", "Custo_Consumo_R$"], Setor=setor_sel)
+                df_rooms_sector = df_rooms_sector.sort_values("Custo_Consumo_R$", ascending=False)
+
+                mostrar_tabela(
+                    df_rooms_sector, {
+                        "Consumo_Mensal_kWh": dict(sufixo=" kWh", decimais=0),
+                        "Custo_Consumo_R$": dict(prefixo="R$ ")
+                    },
+                    chave="pagina_salas_setor", width="stretch", hide_index=True
+                )
+
+            detalhe_setor()
 
             st.divider()
 
             # Ranking Geral em Expander (para não poluir a tela)
             with st.expander("📊 Ver Ranking Geral de Todos os Setores"):
-                df_setor_all = df_raw.groupby("Setor")[["Consumo_Mensal_kWh", "Custo_Consumo_R$"]].sum().reset_index()
+                df_setor_all = resultados['setores']
                 df_setor_all = df_setor_all.sort_values("Custo_Consumo_R$", ascending=False)
                 
-                st.dataframe(
-                    df_setor_all.style.format({
-                        "Consumo_Mensal_kWh": lambda x: formatar_br(x, sufixo=" kWh", decimais=0),
-                        "Custo_Consumo_R$": lambda x: formatar_br(x, prefixo="R$ ")
-                    }),
-                    use_container_width=True, hide_index=True
+                mostrar_tabela(
+                    df_setor_all, {
+                        "Consumo_Mensal_kWh": dict(sufixo=" kWh", decimais=0),
+                        "Custo_Consumo_R$": dict(prefixo="R$ ")
+                    },
+                    chave="pagina_setores", width="stretch", hide_index=True
                 )
 
         with col_s:
             st.markdown("### 🚪 Salas (Geral)")
 
-            lista_salas = sorted(df_raw['Id_sala'].unique())
-            sala_sel = st.selectbox("Selecione a sala:", lista_salas)
-
-            df_sala = df_raw[df_raw['Id_sala'] == sala_sel]
-            custo_sala = df_sala["Custo_Consumo_R$"].sum()
-            st.metric(f"Custo Total — Sala {sala_sel}", formatar_br(custo_sala, prefixo="R$ "))
-
-            st.dataframe(
-                df_sala[["des_nome_equipamento", "Quant", "Potencia_Instalada_kW", "Custo_Consumo_R$"]]
-                .sort_values("Custo_Consumo_R$", ascending=False)
-                .style.format({
-                    "Quant": lambda x: formatar_br(x, decimais=0),
-                    "Potencia_Instalada_kW": lambda x: formatar_br(x, decimais=3),
-                    "Custo_Consumo_R$": lambda x: formatar_br(x, prefixo="R$ ")
-                }),
-                use_container_width=True, hide_index=True
-            )
+            @st.fragment
+            def detalhe_sala():
+                lista_salas = estatisticas['lista_salas']
+                sala_sel = st.selectbox("Selecione a sala:", lista_salas, key="sel_sala")
+
+                linhas = estatisticas['linhas_sala'].get(sala_sel, [])
+                df_sala = df_raw.take(linhas)[["des_nome_equipamento", "Quant", "Potencia_Instalada_kW"]].assign(
+                    **{"Custo_Consumo_R$": consumo_kwh[linhas] * tarifa_media_calculada}
+                )
+                custo_sala = cubo_valor(cubo, 'Custo_Consumo_R$', Id_sala=sala_sel)
+                st.metric(f"Custo Total — Sala {sala_sel}", formatar_br(custo_sala, prefixo="R$ "))
+
+                mostrar_tabela(
+                    df_sala.sort_values("Custo_Consumo_R$", ascending=False), {
+                        "Quant": dict(decimais=0),
+                        "Potencia_Instalada_kW": dict(decimais=3),
+                        "Custo_Consumo_R$": dict(prefixo="R$ ")
+                    },
+                    chave="pagina_itens_sala", width="stretch", hide_index=True
+                )
+
+            detalhe_sala()
         
         st.divider()
 
         # AGORA ANDAR FICA EMBAIXO, OCUPANDO LARGURA TOTAL
         st.markdown("### 🏬 Andares")
 
-        qtd_por_andar = df_raw.groupby('num_andar')['Quant'].sum()
-        media_aparelhos = qtd_por_andar.mean()
+        media_aparelhos = estatisticas['media_aparelhos_andar']
         st.metric("Média de Aparelhos por Andar", formatar_br(media_aparelhos, sufixo=" un.", decimais=0))
 
-        lista_andares = sorted(df_raw['num_andar'].unique())
-        andar_sel = st.selectbox("Selecione o andar:", lista_andares)
+        @st.fragment
+        def detalhe_andar():
+            lista_andares = estatisticas['lista_andares']
+            andar_sel = st.selectbox("Selecione o andar:", lista_andares, key="sel_andar")
 
-        df_andar = df_raw[df_raw['num_andar'] == andar_sel]
-        custo_andar = df_andar["Custo_Consumo_R$"].sum()
-        st.metric(f"Custo Total — Andar {andar_sel}", formatar_br(custo_andar, prefixo="R$ "))
+            custo_andar = cubo_valor(cubo, 'Custo_Consumo_R$', num_andar=andar_sel)
+            st.metric(f"Custo Total — Andar {andar_sel}", formatar_br(custo_andar, prefixo="R$ "))
 
-        df_andar_salas = (
-            df_andar.groupby("Id_sala")["Custo_Consumo_R$"]
-            .sum().reset_index().sort_values("Custo_Consumo_R$", ascending=False)
-        )
+            df_andar_salas = cubo_tabela(cubo, ['Id_sala'], ["Custo_Consumo_R$"], num_andar=andar_sel).sort_values(
+                "Custo_Consumo_R$", ascending=False
+            )
 
-        st.dataframe(
-            df_andar_salas.style.format({
-                "Custo_Consumo_R$": lambda x: formatar_br(x, prefixo="R$ ")
-            }),
-            use_container_width=True, hide_index=True
-        )
+            mostrar_tabela(
+                df_andar_salas, {"Custo_Consumo_R$": dict(prefixo="R$ ")},
+                chave="pagina_salas_andar", width="stretch", hide_index=True
+            )
+
+        detalhe_andar()
 
         st.divider()
 
         st.markdown("###  Gasto Relacionado a Aparelhos Térmicos e de Cozinha")
         st.caption("Filtro: Ar Condicionado, Geladeira, Frigobar, Bebedouro, Microondas, Cafeteira, etc.")
         
-        target_keywords = [
-            "AR CONDICIONADO", "GELADEIRA", "FRIGOBAR", "REFRIGERADOR", 
-            "BEBEDOURO", "DESUMIDIFICADOR", "VENTILADOR", "MICROONDAS", 
-            "TORRADEIRA", "CAFETEIRA", "CHALEIRA", "FOGÃO", "FORNO", 
-            "AQUECEDOR", "FOGAREIRO"
-        ]
-        
-        def is_target_appliance(nome):
-            n = str(nome).upper()
-            return any(k in n for k in target_keywords)
-        
-        df_clim = df_raw[df_raw['des_nome_generico_equipamento'].apply(is_target_appliance)].copy()
+        # Filtro (target_keywords) aplicado uma vez na etapa de colunas estáticas
+        df_clim_g = resultados['termicos']
         
-        if not df_clim.empty:
-            df_clim_g = df_clim.groupby("des_nome_generico_equipamento")[["Consumo_Mensal_kWh", "Custo_Consumo_R$"]].sum().reset_index()
+        if not df_clim_g.empty:
             df_clim_g = df_clim_g.sort_values("Custo_Consumo_R$", ascending=False)
             
             c_clim1, c_clim2 = st.columns(2)
-            c_clim1.metric("Custo Total (Selecionados)", formatar_br(df_clim['Custo_Consumo_R$'].sum(), prefixo="R$ "))
-            c_clim2.metric("Consumo Total (Selecionados)", formatar_br(df_clim['Consumo_Mensal_kWh'].sum(), sufixo=" kWh", decimais=0))
-
-            st.dataframe(
-                df_clim_g.style.format({
-                    "Consumo_Mensal_kWh": lambda x: formatar_br(x, sufixo=" kWh", decimais=0),
-                    "Custo_Consumo_R$": lambda x: formatar_br(x, prefixo="R$ ")
-                }),
-                use_container_width=True, hide_index=True
+            c_clim1.metric("Custo Total (Selecionados)", formatar_br(resultados['termicos_custo'], prefixo="R$ "))
+            c_clim2.metric("Consumo Total (Selecionados)", formatar_br(resultados['termicos_consumo'], sufixo=" kWh", decimais=0))
+
+            mostrar_tabela(
+                df_clim_g, {
+                    "Consumo_Mensal_kWh": dict(sufixo=" kWh", decimais=0),
+                    "Custo_Consumo_R$": dict(prefixo="R$ ")
+                },
+                chave="pagina_termicos", width="stretch", hide_index=True
             )
         else:
             st.info("Nenhum equipamento da lista específica foi identificado.")
 
+    # ---------------------------------------------------
+    # TAB CAMPUS — TODOS OS PRÉDIOS (AGREGADOS PARCIAIS)
+    # ---------------------------------------------------
+    @st.fragment
+    @metricas.medido("aba:campus")
+    def aba_campus():
+        st.subheader("🏛️ Visão do Campus")
+        with st.spinner("Ingerindo prédios..."):
+            chave_predios = tuple(
+                tuple(sorted(dict(p, versao=versao_caminho(p['inventario'])[1]).items())) for p in predios_campus
+            )
+            metas = etapa_ingestao_campus(chave_predios, imputacao.versao_regras())
+        parciais = [
+            etapa_parciais_predio(m['particao'], str(m['versoes']), m['regras'], params_uso,
+                                  tarifa_media_calculada, tarifa_kw_demanda)
+            for m in metas
+        ]
+        tot = campus.totais_campus(parciais)
+        
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Prédios", formatar_br(len(metas), decimais=0))
+        c2.metric("Potência Instalada (Campus)", formatar_br(tot['Potencia_Instalada_kW'], sufixo=" kW", decimais=1))
+        c3.metric("Consumo Total (Campus)", formatar_br(tot['Consumo_Mensal_kWh'], sufixo=" kWh", decimais=0))
+        c4.metric("Conta Total (Campus)", formatar_br(tot['Conta_Total_R$'], prefixo="R$ "))
+        
+        por_predio = campus.combinar(parciais, por=('Predio',))
+        por_predio['Conta_Total_R$'] = por_predio['Custo_Consumo_R$'] + por_predio['Custo_Demanda_R$']
+        por_predio = por_predio.sort_values('Conta_Total_R$', ascending=False)
+        fig_predios = px.bar(por_predio, x='Predio', y='Conta_Total_R$', color='Predio',
+                             title="Conta Mensal Estimada por Prédio")
+        fig_predios.update_layout(showlegend=False, separators=",.")
+        grafico(fig_predios, width="stretch")
+        
+        formato_campus = {
+            'Quant': dict(decimais=0),
+            'Potencia_Instalada_kW': dict(sufixo=" kW", decimais=1),
+            'Demanda_Estimada_kW': dict(sufixo=" kW", decimais=1),
+            'Consumo_Mensal_kWh': dict(sufixo=" kWh", decimais=0),
+            'Custo_Consumo_R$': dict(prefixo="R$ "),
+            'Custo_Demanda_R$': dict(prefixo="R$ "),
+            'Conta_Total_R$': dict(prefixo="R$ "),
+        }
+        mostrar_tabela(por_predio, formato_campus, chave="pagina_predios", width="stretch", hide_index=True)
+        
+        st.divider()
+        st.markdown("### 🔎 Detalhamento entre Prédios")
+
+        @st.fragment
+        def detalhe_campus():
+            rotulos_nivel = {'Setor': "Setor", 'num_andar': "Andar", 'Id_sala': "Sala", 'Categoria_Macro': "Categoria"}
+            d1, d2, d3 = st.columns([1, 2, 1])
+            nivel = d1.selectbox("Agrupar por", list(rotulos_nivel), format_func=rotulos_nivel.get, key="campus_nivel")
+            predios_filtro = d2.multiselect("Prédios", list(por_predio['Predio']), default=list(por_predio['Predio']))
+            separar = d3.checkbox("Separar por prédio", key="campus_separar")
+        
+            tabela_nivel = campus.combinar(
+                parciais, por=(('Predio', nivel) if separar else (nivel,)), filtros={'Predio': predios_filtro}
+            ).sort_values('Custo_Consumo_R$', ascending=False)
+            mostrar_tabela(tabela_nivel, formato_campus, chave="pagina_campus_nivel",
+                           width="stretch", hide_index=True)
+
+        detalhe_campus()
+
+    # Só a aba aberta é desenhada (as demais nem calculam suas etapas)
+    desenhos = [aba_dimensionamento, aba_consumo, aba_eficiencia, aba_viabilidade, aba_cenarios, aba_detalhe]
+    if predios_campus:
+        desenhos.append(aba_campus)
+    for aba, desenhar in zip(abas, desenhos):
+        if aba.open:
+            with aba:
+                desenhar()
+
 else:
     st.warning("Carregando dados... Verifique sua conexão.")
+
+# ---------------------------------------------------
+# PAINEL DE ADMINISTRAÇÃO (OCULTO: ?admin=1)
+# ---------------------------------------------------
+# Fica no fim do script para já incluir as medições desta execução.
+if st.query_params.get("admin") == "1":
+    with st.sidebar.expander("🛠️ Métricas de desempenho"):
+        coletar = st.toggle("Coletar métricas", value=metricas.ativo())
+        if coletar != metricas.ativo():
+            metricas.ativar(coletar)
+            st.rerun()
+        st.caption(f"Registros também em `{metricas.arquivo()}` (JSON por linha).")
+
+        resumo_metricas = metricas.resumo()
+        if resumo_metricas.empty:
+            st.info("Nenhuma medição ainda. Ligue a coleta e interaja com o painel.")
+        else:
+            st.dataframe(formatar_tabela_br(resumo_metricas, {
+                'total_s': dict(decimais=3), 'media_ms': dict(decimais=1), 'max_ms': dict(decimais=1),
+                'pico_mb': dict(decimais=1), 'chamadas': dict(decimais=0),
+                'acertos': dict(decimais=0), 'falhas': dict(decimais=0),
+            }), hide_index=True)
+            st.markdown("**Últimas medições**")
+            st.dataframe(pd.DataFrame(metricas.registros()[-30:][::-1]), hide_index=True)
+        if st.button("Limpar métricas"):
+            metricas.limpar()
+            st.rerun()
+
+        st.markdown("**Cache de resultados em disco**")
+        uso_disco = cache_disco.estatisticas()
+        st.caption(
+            f"{formatar_br(uso_disco['entradas'], decimais=0)} de {formatar_br(uso_disco['limite_entradas'], decimais=0)} "
+            f"entradas · {formatar_br(uso_disco['mb'], sufixo=' MB', decimais=1)} de "
+            f"{formatar_br(uso_disco['limite_mb'], sufixo=' MB', decimais=0)} (`{cache_disco.DIR_RESULTADOS}`)"
+        )
+        if st.button("Limpar cache em disco"):
+            cache_disco.limpar()
+            st.rerun()
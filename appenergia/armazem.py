@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+import fonte_dados
+import imputacao
+import metricas
+from fonte_dados import slug
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# ---------------------------------------------------
+# ARMAZÉM COMPARTILHADO (ARROW MAPEADO EM MEMÓRIA)
+# ---------------------------------------------------
+# A parte estática dos dados (inventário preparado, ocupação reconstruída)
+# fica num arquivo Arrow IPC sem compressão em DIR_CACHE/armazem/, gravado
+# uma vez por versão do arquivo de origem e da tabela de regras de potência
+# (o inventário preparado traz a potência imputada). Cada processo abre o
+# arquivo mapeado em memória: as colunas numéricas e de data apontam direto para
+# as páginas do arquivo (o sistema operacional as mantém uma vez só, para
+# todos os processos), e as categóricas só copiam os códigos. No app, o
+# DataFrame aberto é um único objeto por processo (st.cache_resource), sem
+# cópia por sessão. É somente leitura: quem precisar de colunas novas
+# (consumo, custo) as mantém à parte, como vetores da sessão.
+
+DIR_ARMAZEM = os.path.join(fonte_dados.DIR_CACHE, "armazem")
+FORMATO = 1  # mudar quando as colunas gravadas mudarem (invalida os arquivos antigos)
+
+
+def caminho(nome, chave, dir_base=DIR_ARMAZEM):
+    """Arquivo de `nome` para `chave` = (caminho de origem, versão)."""
+    origem, versao = chave
+    base = slug(os.path.splitext(os.path.basename(str(origem)))[0])
+    texto = repr((FORMATO, origem, versao, imputacao.versao_regras()))
+    h = hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(dir_base, f"{nome}-{base}-{h}.arrow")
+
+
+def disponivel(nome, chave, dir_base=DIR_ARMAZEM):
+    return pa is not None and os.path.exists(caminho(nome, chave, dir_base))
+
+
+def _gravar(df, destino):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with pa.OSFile(tmp, 'wb') as f, pa.ipc.new_file(f, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        os.replace(tmp, destino)  # atômico: os outros processos nunca veem o arquivo pela metade
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _abrir(origem):
+    with pa.memory_map(origem) as f:
+        tabela = pa.ipc.open_file(f).read_all()
+    # split_blocks: um bloco por coluna, sem consolidar (consolidar copiaria as páginas mapeadas)
+    df = tabela.to_pandas(split_blocks=True)
+    # Arrow devolve None nos textos vazios; o pipeline produzia NaN
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def _limpar_versoes_antigas(destino):
+    """Remove as outras versões do mesmo nome/origem (quem já as mapeou continua lendo)."""
+    pasta = os.path.dirname(destino)
+    prefixo = os.path.basename(destino).rsplit('-', 1)[0] + '-'
+    for arq in os.listdir(pasta):
+        antigo = os.path.join(pasta, arq)
+        if arq.startswith(prefixo) and arq.endswith(".arrow") and antigo != destino:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+
+
+@metricas.medido()
+def compartilhar(nome, chave, construir, dir_base=DIR_ARMAZEM):
+    """
+    DataFrame somente leitura de `nome` para `chave` = (caminho, versão),
+    aberto do armazém. Se nenhum processo o gravou ainda, é produzido por
+    `construir()` e gravado. Sem pyarrow (ou com colunas que o Arrow não
+    grava), devolve o próprio resultado de `construir()`.
+    """
+    if pa is None:
+        return construir()
+
+    destino = caminho(nome, chave, dir_base)
+    if os.path.exists(destino):
+        try:
+            df = _abrir(destino)
+            metricas.marcar_cache('acerto')
+            return df
+        except Exception:
+            pass  # Arquivo corrompido: reconstrói abaixo
+
+    metricas.marcar_cache('falha')
+    df = construir()
+    if df.empty:
+        return df  # Erro de carga ou fonte ausente: nada a compartilhar
+    try:
+        _gravar(df, destino)
+        _limpar_versoes_antigas(destino)
+        return _abrir(destino)
+    except Exception:
+        return df
@@ -0,0 +1,181 @@
+"""
+Benchmarks do pipeline com dados sintéticos (ver sinteticos.py).
+
+Exemplos:
+    python benchmark.py                                   # 1k, 100k e 10M linhas
+    python benchmark.py --escalas 1k 100k --salvar benchmarks/baseline.json
+    python benchmark.py --escalas 1k 100k --comparar benchmarks/baseline.json
+
+Para cada escala mede o tempo (melhor de N repetições) e o pico de memória
+(tracemalloc, numa execução à parte para não distorcer o tempo) de cada
+etapa. Com --comparar, sai com código 1 se alguma etapa ficar mais lenta
+ou mais pesada que a baseline além da tolerância.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import nucleo
+import sinteticos
+from motor_consumo import calcular_consumo
+from ocupacao import reconstruir_ocupacao, resumo_diario
+from roi import candidatos_retrofit, otimizar_orcamento
+from simulacao import perfil_ocupacao_semanal, simular_ano
+
+ESCALAS_PADRAO = ('1k', '100k', '10M')
+TOLERANCIA = 0.25      # +25% de tempo/memória antes de acusar regressão
+PISO_TEMPO_S = 0.02    # diferenças abaixo disso são ruído
+PISO_MEMORIA_MB = 1.0
+
+
+def interpretar_escala(texto):
+    """'1k' -> 1_000, '10M' -> 10_000_000."""
+    mult = {'k': 1_000, 'm': 1_000_000}.get(texto[-1].lower(), 1)
+    return int(float(texto[:-1] if mult > 1 else texto) * mult)
+
+
+def etapas(n, dir_tmp, semente=0):
+    """
+    Lista ordenada de (nome, função) em que cada função recebe o estado das
+    etapas anteriores (dict) e grava nele a sua saída.
+    """
+    uso = {k: nucleo.PARAMETROS_PADRAO[k] for k in nucleo.PARAMETROS_USO}
+    csv = os.path.join(dir_tmp, f"inventario_{n}.csv")
+
+    def gerar(e):
+        e['bruto'] = sinteticos.gerar_inventario(n, semente)
+        e['catracas'] = sinteticos.gerar_catracas(n, semente)
+
+    def escrever_csv(e):
+        e['bruto'].to_csv(csv, index=False)
+
+    def ler_csv(e):
+        e['lido'] = nucleo.ler_inventario_csv(csv)
+
+    def limpar(e):
+        e['df'] = nucleo.limpar_inventario(e['lido'].copy())
+
+    def derivar(e):
+        e['df'], e['kernel'] = nucleo.derivar_colunas(e['df'])
+
+    def consumo(e):
+        e['consumo'] = calcular_consumo(e['kernel'], **uso)
+
+    def agregados(e):
+        e['agr'] = nucleo.calcular_agregados(e['df'], e['consumo'], 0.82, 40.0)
+
+    def roi(e):
+        cand = candidatos_retrofit(e['df'], 11.5, 11.5, 11.5, 22, 0.82, 25.0, 3500.0, 2800.0)
+        e['plano'] = otimizar_orcamento(cand, 50000.0)
+
+    def ocupacao(e):
+        e['oc'] = reconstruir_ocupacao(e['catracas'])
+        e['resumo_oc'] = resumo_diario(e['oc'])
+
+    def simulacao(e):
+        e['sim'] = simular_ano(e['kernel'], **uso, perfil_ocupacao=perfil_ocupacao_semanal(e['oc']))
+
+    return [
+        ('gerar', gerar), ('escrever_csv', escrever_csv), ('ler_csv', ler_csv),
+        ('limpar_inventario', limpar), ('derivar_colunas', derivar), ('consumo', consumo),
+        ('agregados', agregados), ('roi', roi), ('ocupacao', ocupacao), ('simulacao_8760h', simulacao),
+    ]
+
+
+def medir(n, repeticoes=3, memoria=True, semente=0):
+    """{etapa: {'tempo_s', 'pico_mb'}} para `n` linhas."""
+    res = {}
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        lista = etapas(n, dir_tmp, semente)
+        for _ in range(repeticoes):
+            estado = {}
+            for nome, f in lista:
+                gc.collect()
+                t0 = time.perf_counter()
+                f(estado)
+                dt = time.perf_counter() - t0
+                r = res.setdefault(nome, {'tempo_s': dt})
+                r['tempo_s'] = min(r['tempo_s'], dt)
+            del estado
+
+        if memoria:
+            estado = {}
+            for nome, f in lista:
+                gc.collect()
+                tracemalloc.start()
+                f(estado)
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                res[nome]['pico_mb'] = pico / 2**20
+            del estado
+    return res
+
+
+def comparar(atual, baseline, tolerancia=TOLERANCIA):
+    """Lista de regressões (texto) entre duas execuções {escala: {etapa: métricas}}."""
+    regressoes = []
+    for escala, etapas_base in baseline.items():
+        for etapa, base in etapas_base.items():
+            cur = atual.get(escala, {}).get(etapa)
+            if cur is None:
+                continue
+            for chave, piso in (('tempo_s', PISO_TEMPO_S), ('pico_mb', PISO_MEMORIA_MB)):
+                if chave in base and chave in cur and cur[chave] > base[chave] * (1 + tolerancia) + piso:
+                    regressoes.append(f"{escala}/{etapa}: {chave} {base[chave]:.3f} -> {cur[chave]:.3f}")
+    return regressoes
+
+
+def imprimir(resultados):
+    for escala, res in resultados.items():
+        print(f"\n== {escala} linhas ==")
+        print(f"{'etapa':<20}{'tempo (s)':>12}{'pico (MB)':>12}")
+        for etapa, r in res.items():
+            pico = f"{r['pico_mb']:.1f}" if 'pico_mb' in r else '-'
+            print(f"{etapa:<20}{r['tempo_s']:>12.4f}{pico:>12}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks do pipeline com dados sintéticos.")
+    ap.add_argument('--escalas', nargs='+', default=list(ESCALAS_PADRAO))
+    ap.add_argument('--repeticoes', type=int, default=3)
+    ap.add_argument('--sem-memoria', action='store_true', help="Não mede o pico de memória (tracemalloc)")
+    ap.add_argument('--salvar', help="Grava os resultados como baseline (JSON)")
+    ap.add_argument('--comparar', help="Compara com uma baseline (JSON) e acusa regressões")
+    ap.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = ap.parse_args(argv)
+
+    resultados = {}
+    for escala in args.escalas:
+        resultados[escala] = medir(interpretar_escala(escala), args.repeticoes, not args.sem_memoria)
+    imprimir(resultados)
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(args.salvar) or '.', exist_ok=True)
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump({
+                'maquina': {'python': platform.python_version(), 'plataforma': platform.platform(),
+                            'processador': platform.processor() or platform.machine()},
+                'resultados': resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline gravada em {args.salvar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            baseline = json.load(f)['resultados']
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        if regressoes:
+            print("\nREGRESSÕES:")
+            print("\n".join(f"  {r}" for r in regressoes))
+            return 1
+        print("\nSem regressões em relação à baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
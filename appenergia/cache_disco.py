@@ -0,0 +1,199 @@
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+import fonte_dados
+import imputacao
+
+# ---------------------------------------------------
+# CACHE DE RESULTADOS EM DISCO (LRU, ENTRE PROCESSOS)
+# ---------------------------------------------------
+# O st.cache_data vive na memória de cada processo e some a cada reinício.
+# Por baixo dele, as etapas caras (agregados, simulação, ROI, Monte Carlo)
+# guardam o resultado em DIR_CACHE/resultados/, um arquivo pickle por
+# chamada. A chave é o hash das entradas da etapa (a versão dos dados vem
+# em `fontes`, e o resto são os parâmetros do sidebar e do ROI), da tabela
+# de regras de potência e do código-fonte dos módulos do app: as etapas
+# chamam funções de vários módulos, então editar qualquer um deles (ou o
+# CSV de regras) invalida os resultados calculados com a versão anterior.
+# Cada gravação é atômica (tmp + os.replace), então vários processos podem
+# ler e gravar ao mesmo tempo; cada leitura renova o mtime do arquivo, e o
+# despejo remove os menos usados recentemente até caber nos limites de
+# tamanho (ENERGIA_CACHE_RESULTADOS_MB; 0 desliga o cache) e de número de
+# entradas (ENERGIA_CACHE_RESULTADOS_ITENS).
+
+DIR_RESULTADOS = os.path.join(fonte_dados.DIR_CACHE, "resultados")
+ENV_MB = "ENERGIA_CACHE_RESULTADOS_MB"
+ENV_ITENS = "ENERGIA_CACHE_RESULTADOS_ITENS"
+LIMITE_MB = 512
+LIMITE_ITENS = 5000
+FORMATO = 1              # mudar quando o formato de algum resultado mudar
+TMP_ABANDONADO_S = 3600  # temporários mais velhos que isso são de gravações interrompidas
+
+_AUSENTE = object()
+_TIPOS_SIMPLES = (type(None), bool, int, float, str, bytes)
+
+
+def limites():
+    """(bytes, entradas) máximos do cache em disco."""
+    mb = float(os.environ.get(ENV_MB, LIMITE_MB))
+    return int(mb * 2**20), int(os.environ.get(ENV_ITENS, LIMITE_ITENS))
+
+
+def ativo():
+    return limites()[0] > 0
+
+
+def _canonico(v):
+    """Forma estável das entradas (dicionários em ordem, escalares NumPy como Python)."""
+    if isinstance(v, dict):
+        return ('dict', tuple(sorted((repr(k), _canonico(x)) for k, x in v.items())))
+    if isinstance(v, (tuple, list)):
+        return (type(v).__name__, tuple(_canonico(x) for x in v))
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, _TIPOS_SIMPLES):
+        return v
+    # DataFrames etc. não têm repr estável: a chamada não usa o cache em disco
+    raise TypeError(f"entrada sem chave estável: {type(v).__name__}")
+
+
+@functools.lru_cache(maxsize=None)
+def versao_codigo(pasta=os.path.dirname(os.path.abspath(__file__))):
+    """Hash do código-fonte dos módulos do app (uma vez por processo)."""
+    h = hashlib.sha256()
+    for arq in sorted(os.listdir(pasta)):
+        if arq.endswith('.py'):
+            h.update(arq.encode('utf-8'))
+            with open(os.path.join(pasta, arq), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()[:20]
+
+
+def chave(nome, args, kwargs):
+    texto = repr((FORMATO, nome, versao_codigo(), imputacao.versao_regras(),
+                  _canonico(args), _canonico(kwargs)))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _arquivo(k, dir_base):
+    return os.path.join(dir_base, f"{k}.pkl")
+
+
+def ler(k, dir_base=DIR_RESULTADOS):
+    """Resultado guardado em `k` (ou _AUSENTE); o acesso renova a entrada no LRU."""
+    caminho = _arquivo(k, dir_base)
+    try:
+        with open(caminho, 'rb') as f:
+            valor = pickle.load(f)
+    except FileNotFoundError:
+        return _AUSENTE
+    except Exception:
+        return _AUSENTE  # Arquivo ilegível (versão antiga de pandas etc.): recalcula
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass  # Despejado por outro processo logo depois da leitura
+    return valor
+
+
+def gravar(k, valor, dir_base=DIR_RESULTADOS):
+    dados = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+    limite_bytes, limite_itens = limites()
+    if len(dados) > limite_bytes:
+        return  # Maior que o cache inteiro
+    os.makedirs(dir_base, exist_ok=True)
+    destino = _arquivo(k, dir_base)
+    tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(dados)
+    os.replace(tmp, destino)
+    despejar(dir_base, limite_bytes, limite_itens)
+
+
+def _entradas(dir_base):
+    """[(mtime_ns, tamanho, caminho)] das entradas, das menos usadas às mais usadas."""
+    entradas = []
+    agora = time.time()
+    try:
+        itens = list(os.scandir(dir_base))
+    except FileNotFoundError:
+        return entradas
+    for e in itens:
+        try:
+            st_ = e.stat()
+        except OSError:
+            continue  # Removido por outro processo
+        if e.name.endswith('.pkl'):
+            entradas.append((st_.st_mtime_ns, st_.st_size, e.path))
+        elif e.name.endswith('.tmp') and agora - st_.st_mtime > TMP_ABANDONADO_S:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+    return sorted(entradas)
+
+
+def despejar(dir_base=DIR_RESULTADOS, limite_bytes=None, limite_itens=None):
+    """Remove as entradas usadas há mais tempo até caber nos limites. Retorna quantas saíram."""
+    if limite_bytes is None or limite_itens is None:
+        limite_bytes, limite_itens = limites()
+    entradas = _entradas(dir_base)
+    total, restantes, removidas = sum(t for _, t, _ in entradas), len(entradas), 0
+    for _, tamanho, caminho in entradas:
+        if total <= limite_bytes and restantes <= limite_itens:
+            break
+        try:
+            os.remove(caminho)
+            removidas += 1
+        except OSError:
+            pass  # Outro processo despejou a mesma entrada
+        total -= tamanho
+        restantes -= 1
+    return removidas
+
+
+def estatisticas(dir_base=DIR_RESULTADOS):
+    entradas = _entradas(dir_base)
+    limite_bytes, limite_itens = limites()
+    return {
+        'entradas': len(entradas), 'mb': sum(t for _, t, _ in entradas) / 2**20,
+        'limite_mb': limite_bytes / 2**20, 'limite_entradas': limite_itens,
+    }
+
+
+def limpar(dir_base=DIR_RESULTADOS):
+    return despejar(dir_base, 0, 0)
+
+
+def persistente(func, nome=None, dir_base=DIR_RESULTADOS):
+    """
+    Decorador: o resultado de cada chamada fica no cache em disco, chaveado
+    pelas entradas. Sem cache (desligado, entradas sem chave estável ou
+    resultado que não vira pickle), a função roda normalmente.
+    """
+    rotulo = nome or func.__name__
+
+    @functools.wraps(func)
+    def chamada(*args, **kwargs):
+        if not ativo():
+            return func(*args, **kwargs)
+        try:
+            k = chave(rotulo, args, kwargs)
+        except TypeError:
+            return func(*args, **kwargs)
+        valor = ler(k, dir_base)
+        if valor is not _AUSENTE:
+            return valor
+        valor = func(*args, **kwargs)
+        try:
+            gravar(k, valor, dir_base)
+        except Exception:
+            pass  # Disco cheio, resultado sem pickle etc.: segue sem persistir
+        return valor
+    return chamada
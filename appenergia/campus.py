@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import fonte_dados
+import imputacao
+import nucleo
+from fonte_dados import slug
+from motor_consumo import calcular_consumo, preparar_consumo
+from ocupacao import reconstruir_ocupacao
+
+# ---------------------------------------------------
+# MODO CAMPUS — VÁRIOS PRÉDIOS, INGESTÃO PARTICIONADA
+# ---------------------------------------------------
+# Um diretório (uma subpasta ou um par <prédio>.csv/.xlsx por prédio) ou um
+# manifesto (CSV/JSON com predio, inventario, ocupacao) descreve o campus.
+# Cada prédio é ingerido num processo do pool e gravado na sua própria
+# partição Parquet (DIR_CACHE/campus/predio=<nome>-<hash>/; o hash do nome
+# original separa prédios cujos nomes viram o mesmo slug). Os totais do campus
+# saem da soma dos agregados parciais de cada prédio — nunca de um único
+# DataFrame com o campus inteiro.
+
+DIR_CAMPUS = os.path.join(fonte_dados.DIR_CACHE, "campus")
+CAMPUS_ENV = "ENERGIA_CAMPUS"
+
+# Níveis de detalhamento disponíveis nos agregados parciais
+NIVEIS = ('Categoria_Macro', 'Setor', 'num_andar', 'Id_sala')
+
+
+def descobrir_predios(origem):
+    """
+    Lista de {'predio', 'inventario', 'ocupacao'} a partir de um diretório
+    ou de um manifesto .csv/.json (caminhos relativos ao manifesto).
+    """
+    if os.path.isfile(origem):
+        base = os.path.dirname(os.path.abspath(origem))
+        if origem.lower().endswith('.json'):
+            with open(origem, encoding='utf-8') as f:
+                registros = json.load(f)
+        else:
+            registros = pd.read_csv(origem, sep=None, engine='python').to_dict('records')
+        predios = []
+        for r in registros:
+            oc = r.get('ocupacao')
+            predios.append({
+                'predio': str(r['predio']),
+                'inventario': os.path.join(base, r['inventario']),
+                'ocupacao': os.path.join(base, oc) if isinstance(oc, str) and oc else None,
+            })
+        return predios
+
+    predios = []
+    for item in sorted(os.listdir(origem)):
+        caminho = os.path.join(origem, item)
+        if os.path.isdir(caminho):
+            arquivos = sorted(os.listdir(caminho))
+            csvs = [a for a in arquivos if a.lower().endswith('.csv')]
+            xlsx = [a for a in arquivos if a.lower().endswith('.xlsx')]
+            if csvs:
+                predios.append({
+                    'predio': item,
+                    'inventario': os.path.join(caminho, csvs[0]),
+                    'ocupacao': os.path.join(caminho, xlsx[0]) if xlsx else None,
+                })
+        elif item.lower().endswith('.csv'):
+            nome = os.path.splitext(item)[0]
+            oc = os.path.join(origem, f"{nome}.xlsx")
+            predios.append({'predio': nome, 'inventario': caminho, 'ocupacao': oc if os.path.exists(oc) else None})
+    return predios
+
+
+def dir_particao(predio, dir_campus=DIR_CAMPUS):
+    h = hashlib.sha1(str(predio).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(dir_campus, f"predio={slug(predio)}-{h}")
+
+
+def _gravar_parquet(df, destino):
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, destino)
+
+
+def ingerir_predio(registro, dir_campus=DIR_CAMPUS):
+    """
+    Ingestão de um prédio (roda num processo do pool): limpeza, imputação e
+    colunas derivadas, gravadas na partição do prédio. Partições cujas
+    fontes (tamanho + mtime) e tabela de regras de potência não mudaram
+    são reaproveitadas (a partição guarda a potência imputada).
+    """
+    destino = dir_particao(registro['predio'], dir_campus)
+    versoes = {k: list(fonte_dados.versao_arquivo(registro[k])) if registro.get(k) else None
+               for k in ('inventario', 'ocupacao')}
+    regras = imputacao.versao_regras()
+    meta_path = os.path.join(destino, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('versoes') == versoes and meta.get('regras') == regras:
+            return meta
+
+    df = nucleo.limpar_inventario(nucleo.ler_inventario_csv(registro['inventario']))
+    df, _ = nucleo.derivar_colunas(df)
+    df.insert(0, 'Predio', registro['predio'])
+    # Textos de tipo misto (números e strings) não entram no Parquet
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    os.makedirs(destino, exist_ok=True)
+    _gravar_parquet(df, os.path.join(destino, 'inventario.parquet'))
+    n_eventos = 0
+    if registro.get('ocupacao'):
+        try:
+            df_oc = reconstruir_ocupacao(nucleo.ler_planilha_ocupacao(registro['ocupacao']))
+            _gravar_parquet(df_oc.drop(columns=['Data_Dia']), os.path.join(destino, 'ocupacao.parquet'))
+            n_eventos = len(df_oc)
+        except Exception:
+            pass  # Prédio sem catracas legíveis: segue só com o inventário
+
+    meta = dict(registro, versoes=versoes, regras=regras, itens=len(df), eventos=n_eventos, particao=destino)
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, meta_path)
+    return meta
+
+
+def ingerir_campus(predios, processos=None, dir_campus=DIR_CAMPUS):
+    """Ingestão paralela (um prédio por tarefa). Retorna as metas de cada partição."""
+    if processos == 0 or len(predios) <= 1:
+        return [ingerir_predio(p, dir_campus) for p in predios]
+    with ProcessPoolExecutor(processos, mp_context=fonte_dados.contexto_processos()) as pool:
+        return list(pool.map(ingerir_predio, predios, [dir_campus] * len(predios)))
+
+
+def ler_particao(meta):
+    """(inventário preparado, ocupação, kernel) de um prédio a partir da partição."""
+    df = pd.read_parquet(os.path.join(meta['particao'], 'inventario.parquet'), memory_map=True)
+    # Parquet devolve None nos textos vazios; o CSV devolvia NaN
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    caminho_oc = os.path.join(meta['particao'], 'ocupacao.parquet')
+    df_oc = pd.DataFrame()
+    if os.path.exists(caminho_oc):
+        df_oc = pd.read_parquet(caminho_oc, memory_map=True)
+        df_oc['Data_Dia'] = df_oc['DataHora'].dt.date
+    return df, df_oc, preparar_consumo(df)
+
+
+# ---------------------------------------------------
+# AGREGADOS PARCIAIS E TOTAIS DO CAMPUS
+# ---------------------------------------------------
+def agregados_parciais(df, kernel, tarifa_media, tarifa_kw_demanda, **params_uso):
+    """
+    Somas de um prédio por (Predio, Categoria_Macro, Setor, num_andar,
+    Id_sala). São aditivas: os totais do campus ou de qualquer recorte são
+    somas destas linhas.
+    """
+    consumo = calcular_consumo(kernel, **params_uso)
+    parc = df[['Predio', *NIVEIS, 'Quant', 'Potencia_Instalada_kW', 'Demanda_Estimada_kW']].assign(
+        Consumo_Mensal_kWh=consumo
+    )
+    parc = parc.groupby(['Predio', *NIVEIS], observed=True, sort=False, dropna=False).sum().reset_index()
+    parc['Custo_Consumo_R$'] = parc['Consumo_Mensal_kWh'] * tarifa_media
+    parc['Custo_Demanda_R$'] = parc['Demanda_Estimada_kW'] * tarifa_kw_demanda
+    return parc
+
+
+COLUNAS_SOMA = ['Quant', 'Potencia_Instalada_kW', 'Demanda_Estimada_kW',
+                'Consumo_Mensal_kWh', 'Custo_Consumo_R$', 'Custo_Demanda_R$']
+
+
+def combinar(parciais, por=('Predio',), filtros=None):
+    """
+    Soma os agregados parciais de vários prédios no nível `por`, depois de
+    aplicar `filtros` ({coluna: valor ou lista}) — ex.: um Setor em todos
+    os prédios, ou um andar de um prédio.
+    """
+    tabela = pd.concat(parciais, ignore_index=True) if isinstance(parciais, list) else parciais
+    for col, valor in (filtros or {}).items():
+        valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+        tabela = tabela[tabela[col].isin(valores)]
+    if not por:
+        return tabela[COLUNAS_SOMA].sum()
+    return tabela.groupby(list(por), observed=True, dropna=False)[COLUNAS_SOMA].sum().reset_index()
+
+
+def totais_campus(parciais):
+    """Totais do campus (Series) a partir dos agregados parciais."""
+    tot = combinar(parciais, por=())
+    tot['Conta_Total_R$'] = tot['Custo_Consumo_R$'] + tot['Custo_Demanda_R$']
+    return tot
@@ -0,0 +1,135 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------
+# CLASSIFICADOR DE PALAVRAS-CHAVE (AHO-CORASICK)
+# ---------------------------------------------------
+# Um único motor para todos os testes "o nome contém a palavra X?" —
+# categoria macro, aparelhos térmicos/cozinha, equipamentos 24h,
+# refrigeração e regras de imputação de potência. Todas as palavras vão para
+# um autômato Aho-Corasick, que varre cada texto distinto uma única vez e
+# devolve, de uma vez, todas as palavras contidas nele (bits de um inteiro).
+# O resultado fica memorizado por texto, então cada nome é varrido uma vez
+# por processo, não importa quantos consumidores o consultem; as linhas são
+# expandidas pelos códigos do factorize (ou das categóricas).
+
+_trava = threading.Lock()
+# (vocabulário {palavra: bit}, autômato, memória {texto: bits}); trocado
+# inteiro quando entram palavras novas, para nunca misturar versões
+_estado = ({}, None, {})
+MEMO_MAXIMO = 200_000  # textos distintos memorizados antes de recomeçar
+
+
+def _compilar(palavras):
+    """Autômato (transições, falhas, saídas) para a lista de palavras."""
+    transicoes, falha, saida = [{}], [0], [0]
+    for bit, palavra in enumerate(palavras):
+        estado = 0
+        for ch in palavra:
+            if ch not in transicoes[estado]:
+                transicoes.append({})
+                falha.append(0)
+                saida.append(0)
+                transicoes[estado][ch] = len(transicoes) - 1
+            estado = transicoes[estado][ch]
+        saida[estado] |= 1 << bit
+
+    # Busca em largura: a falha de cada estado é o maior sufixo que também é prefixo
+    fila = list(transicoes[0].values())
+    while fila:
+        proxima = []
+        for estado in fila:
+            for ch, filho in transicoes[estado].items():
+                f = falha[estado]
+                while f and ch not in transicoes[f]:
+                    f = falha[f]
+                falha[filho] = transicoes[f].get(ch, 0) if transicoes[f].get(ch) != filho else 0
+                saida[filho] |= saida[falha[filho]]
+                proxima.append(filho)
+        fila = proxima
+    return transicoes, falha, saida
+
+
+def _varrer(texto, automato):
+    """Bits de todas as palavras do vocabulário contidas em `texto`."""
+    transicoes, falha, saida = automato
+    estado, bits = 0, saida[0]
+    for ch in texto:
+        while estado and ch not in transicoes[estado]:
+            estado = falha[estado]
+        estado = transicoes[estado].get(ch, 0)
+        bits |= saida[estado]
+    return bits
+
+
+def _estado_com(palavras):
+    """Estado atual, recompilado (com memória zerada) se houver palavras novas."""
+    global _estado
+    estado = _estado
+    if estado[1] is not None and all(p in estado[0] for p in palavras):
+        return estado
+    with _trava:
+        vocabulario = dict(_estado[0])
+        for p in palavras:
+            vocabulario.setdefault(p, len(vocabulario))
+        _estado = (vocabulario, _compilar(sorted(vocabulario, key=vocabulario.get)), {})
+        return _estado
+
+
+def _bits_distintos(unicos, estado):
+    """Bits de palavras contidas para cada texto distinto (varre só os inéditos)."""
+    _, automato, memo = estado
+    if len(memo) > MEMO_MAXIMO:
+        memo.clear()
+    saida = []
+    for u in unicos:
+        texto = str(u).upper()
+        bits = memo.get(texto)
+        if bits is None:
+            bits = memo[texto] = _varrer(texto, automato)
+        saida.append(bits)
+    return saida
+
+
+def _por_distinto(textos, palavras):
+    """(códigos por linha, matriz distintos x palavras)."""
+    palavras = [str(p).upper() for p in palavras]
+    estado = _estado_com(palavras)
+    codigos, unicos = pd.factorize(pd.Series(textos), use_na_sentinel=False, sort=False)
+    bits = _bits_distintos(unicos, estado)
+    posicoes = [estado[0][p] for p in palavras]
+    tabela = np.array([[(b >> pos) & 1 for pos in posicoes] for b in bits], dtype=bool)
+    return codigos, tabela.reshape(len(unicos), len(palavras))
+
+
+def casamentos(textos, palavras):
+    """
+    Matriz (linhas x palavras) dizendo se cada texto contém cada palavra
+    (sem diferenciar maiúsculas). Cada texto distinto é varrido uma vez.
+    """
+    codigos, tabela = _por_distinto(textos, palavras)
+    return tabela[codigos]
+
+
+def contem_alguma(textos, palavras):
+    """Máscara por linha: o texto contém alguma das palavras?"""
+    codigos, tabela = _por_distinto(textos, palavras)
+    return tabela.any(axis=1)[codigos]
+
+
+def primeira_regra(textos, regras):
+    """
+    Índice da primeira regra que casa em cada linha (-1 se nenhuma casar).
+    `regras` é uma lista de palavras ou de tuplas de palavras; uma regra
+    casa se o texto contiver qualquer uma delas.
+    """
+    regras = [(r,) if isinstance(r, str) else tuple(r) for r in regras]
+    codigos, tabela = _por_distinto(textos, [p for grupo in regras for p in grupo])
+    if not regras:
+        return np.full(len(codigos), -1)
+    inicio = np.cumsum([0] + [len(g) for g in regras[:-1]])
+    por_regra = np.logical_or.reduceat(tabela, inicio, axis=1) if tabela.shape[1] else tabela
+    idx = np.where(por_regra.any(axis=1), por_regra.argmax(axis=1), -1)
+    return idx[codigos]
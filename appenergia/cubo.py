@@ -0,0 +1,120 @@
+from itertools import combinations
+
+import pandas as pd
+
+# ---------------------------------------------------
+# CUBO DE AGREGADOS (SETOR / ANDAR / SALA / CATEGORIA)
+# ---------------------------------------------------
+# Construído uma vez por conjunto de parâmetros: as somas por célula mais
+# fina (Setor, num_andar, Id_sala, Categoria_Macro) e, a partir delas, todos
+# os níveis de agregação (2^4 combinações de dimensões). Cada nível fica
+# indexado pelas suas dimensões, então os totais e recortes das abas são
+# consultas ao índice — nunca uma nova varredura do inventário.
+
+DIMENSOES = ('Setor', 'num_andar', 'Id_sala', 'Categoria_Macro')
+MEDIDAS = ['Quant', 'Potencia_Instalada_kW', 'Demanda_Estimada_kW', 'Consumo_Mensal_kWh',
+           'Custo_Consumo_R$', 'Custo_Demanda_R$', 'Itens']
+
+
+def _celulas(df, consumo_kwh, tarifa_media, tarifa_kw_demanda):
+    """Somas por célula mais fina (DIMENSOES), com os custos."""
+    celulas = df[[*DIMENSOES, 'Quant', 'Potencia_Instalada_kW', 'Demanda_Estimada_kW']].assign(
+        Consumo_Mensal_kWh=consumo_kwh, Itens=1
+    ).groupby(list(DIMENSOES), observed=True, sort=False).sum()
+    celulas['Custo_Consumo_R$'] = celulas['Consumo_Mensal_kWh'] * tarifa_media
+    celulas['Custo_Demanda_R$'] = celulas['Demanda_Estimada_kW'] * tarifa_kw_demanda
+    return celulas[MEDIDAS]
+
+
+def _consolidar(celulas):
+    """Todos os níveis do cubo a partir das células mais finas."""
+    # Cada nível sai do menor nível já montado que tenha uma dimensão a mais
+    cubo = {DIMENSOES: celulas.sort_index()}
+    for n in range(len(DIMENSOES) - 1, -1, -1):
+        for dims in combinations(DIMENSOES, n):
+            pai = min((cubo[p] for p in combinations(DIMENSOES, n + 1) if set(dims) <= set(p)), key=len)
+            if dims:
+                cubo[dims] = pai.groupby(level=list(dims), observed=True).sum()
+            else:
+                cubo[dims] = pai.sum().to_frame().T
+    return cubo
+
+
+def construir_cubo(df, consumo_kwh, tarifa_media, tarifa_kw_demanda):
+    """
+    {dimensões (tupla, na ordem de DIMENSOES): DataFrame de MEDIDAS indexado
+    por essas dimensões}. A chave () guarda o total geral (uma linha).
+    """
+    return _consolidar(_celulas(df, consumo_kwh, tarifa_media, tarifa_kw_demanda))
+
+
+def aplicar_delta(cubo, removidas, consumo_removidas, inseridas, consumo_inseridas,
+                  tarifa_media, tarifa_kw_demanda):
+    """
+    Cubo atualizado sem varrer o inventário de novo: as células mais finas
+    perdem as linhas removidas e ganham as inseridas (uma atualização conta
+    como as duas coisas), e os demais níveis são reconsolidados a partir
+    delas. Células que ficam sem itens são descartadas.
+    """
+    partes = [
+        # As categorias das duas versões do inventário podem diferir: o
+        # delta é agrupado pelos valores
+        sinal * _celulas(linhas.astype({d: object for d in DIMENSOES}), consumo, tarifa_media, tarifa_kw_demanda)
+        for sinal, linhas, consumo in ((-1, removidas, consumo_removidas), (1, inseridas, consumo_inseridas))
+        if len(linhas)
+    ]
+    if not partes:
+        return cubo
+    delta = pd.concat(partes).groupby(level=list(DIMENSOES), sort=False).sum()
+
+    celulas = cubo[DIMENSOES]
+    pos = celulas.index.get_indexer(delta.index)
+    existe = pos >= 0
+    valores = celulas.to_numpy(dtype=float, copy=True)
+    valores[pos[existe]] += delta.to_numpy()[existe]
+    celulas = pd.DataFrame(valores, index=celulas.index, columns=celulas.columns)
+    if not existe.all():
+        celulas = pd.concat([celulas, delta[~existe]])
+    return _consolidar(celulas[celulas['Itens'] > 0])
+
+
+def _nivel(cubo, dims):
+    return cubo[tuple(d for d in DIMENSOES if d in dims)]
+
+
+def valor(cubo, medida=None, **filtros):
+    """
+    Total de uma célula do cubo (ex.: valor(cubo, 'Custo_Consumo_R$',
+    Setor='SAI')). Sem `medida`, devolve a linha com todas as medidas.
+    Células inexistentes valem zero.
+    """
+    nivel = _nivel(cubo, filtros)
+    if filtros:
+        chave = tuple(filtros[d] for d in DIMENSOES if d in filtros)
+        try:
+            linha = nivel.loc[chave if len(chave) > 1 else chave[0]]
+        except KeyError:
+            linha = pd.Series(0.0, index=MEDIDAS)
+    else:
+        linha = nivel.iloc[0]
+    return linha if medida is None else float(linha[medida])
+
+
+def tabela(cubo, por, medidas=None, **filtros):
+    """
+    Recorte do cubo agrupado por `por` (lista de dimensões) dentro dos
+    `filtros` — ex.: salas de um setor, tabela(cubo, ['Id_sala'], Setor='SAI').
+    Retorna um DataFrame com as colunas `por` + `medidas`.
+    """
+    por = [por] if isinstance(por, str) else list(por)
+    medidas = list(medidas or MEDIDAS)
+    nivel = _nivel(cubo, [*por, *filtros])
+    if filtros:
+        niveis = [d for d in DIMENSOES if d in filtros]
+        chave = tuple(filtros[d] for d in niveis)
+        try:
+            nivel = nivel.xs(chave if len(chave) > 1 else chave[0],
+                             level=niveis if len(niveis) > 1 else niveis[0], drop_level=False)
+        except KeyError:
+            nivel = nivel.iloc[:0]
+    return nivel.reset_index()[[*por, *medidas]]
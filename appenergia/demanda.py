@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------
+# DEMANDA INTEGRADA EM 15 MINUTOS E DEMANDA CONTRATADA
+# ---------------------------------------------------
+# As distribuidoras faturam a demanda pela maior média de 15 minutos do
+# mês. Aqui qualquer série de carga (simulada horária ou medida minuto a
+# minuto) é levada a intervalos de 15 min, e a demanda contratada é
+# escolhida pelo menor custo anual entre vários candidatos, considerando a
+# multa de ultrapassagem. Tudo em operações vetorizadas (sem laço por
+# intervalo ou por mês).
+
+INTERVALO = "15min"
+TOLERANCIA_ULTRAPASSAGEM = 0.05   # 5% acima do contratado sem multa
+MULTIPLICADOR_ULTRAPASSAGEM = 2.0  # excedente cobrado em dobro
+
+
+def integrar_15min(serie_kw):
+    """
+    Série de demanda integrada em 15 min a partir de uma série de potência
+    (kW) com índice de datas. Resoluções finas são promediadas em cada
+    intervalo; resoluções grossas (ex.: horária) são repetidas.
+    """
+    serie_kw = serie_kw.sort_index()
+    passo = pd.Series(serie_kw.index).diff().median() if len(serie_kw) > 1 else pd.Timedelta(INTERVALO)
+    if passo > pd.Timedelta(INTERVALO):
+        fim = serie_kw.index[-1] + passo - pd.Timedelta(INTERVALO)
+        return serie_kw.reindex(pd.date_range(serie_kw.index[0], fim, freq=INTERVALO), method='ffill')
+    return serie_kw.resample(INTERVALO).mean().dropna()
+
+
+def resumo_demanda(d15, percentis=(50, 90, 95, 99)):
+    """
+    Máxima mensal e percentis da demanda de 15 min.
+    Retorna (DataFrame por mês, dict {percentil: kW}).
+    """
+    mensal = d15.groupby(d15.index.to_period('M')).agg(['max', 'mean'])
+    mensal.columns = ['Demanda_Maxima_kW', 'Demanda_Media_kW']
+    mensal.index.name = 'Mes'
+    valores = np.percentile(d15.to_numpy(), percentis) if len(d15) else np.zeros(len(percentis))
+    return mensal, dict(zip(percentis, valores))
+
+
+def custo_demanda(contratada, maximas_mensais, tarifa_kw,
+                  tolerancia=TOLERANCIA_ULTRAPASSAGEM, multiplicador=MULTIPLICADOR_ULTRAPASSAGEM):
+    """
+    Custo anual de demanda para cada candidato (vetor) dadas as máximas
+    mensais (vetor). Fatura-se o maior entre contratado e medido; se o
+    medido passar da tolerância, o excedente paga ainda a multa.
+    Matriz candidatos × meses, somada nos meses.
+    """
+    c = np.atleast_1d(np.asarray(contratada, dtype=float))[:, None]
+    m = np.asarray(maximas_mensais, dtype=float)[None, :]
+    faturada = np.maximum(c, m) * tarifa_kw
+    excedente = np.where(m > c * (1 + tolerancia), m - c, 0.0)
+    return (faturada + multiplicador * tarifa_kw * excedente).sum(axis=1)
+
+
+def recomendar_demanda_contratada(maximas_mensais, tarifa_kw, candidatos=None, passo_kw=1.0, instalada_kw=None):
+    """
+    Demanda contratada de menor custo anual. Sem `candidatos`, testa de
+    passo em passo entre 50% e 110% da maior máxima mensal. Com
+    `instalada_kw`, a recomendação nunca passa da potência instalada (a
+    curva de custo continua completa).
+    Retorna (kW recomendado, custo anual, DataFrame candidato × custo,
+    True se o ótimo sem limite ficaria acima da potência instalada).
+    """
+    maximas = np.asarray(maximas_mensais, dtype=float)
+    if candidatos is None:
+        topo = maximas.max() if len(maximas) else 0.0
+        candidatos = np.arange(np.floor(topo * 0.5), np.ceil(topo * 1.10) + passo_kw, passo_kw)
+    candidatos = np.asarray(candidatos, dtype=float)
+    custos = custo_demanda(candidatos, maximas, tarifa_kw)
+    curva = pd.DataFrame({'Demanda_Contratada_kW': candidatos, 'Custo_Anual_R$': custos})
+    i = int(custos.argmin())
+    limitada = bool(instalada_kw is not None and candidatos[i] > instalada_kw)
+    if limitada:
+        permitidos = candidatos <= instalada_kw
+        if permitidos.any():
+            i = int(np.flatnonzero(permitidos)[custos[permitidos].argmin()])
+        else:
+            return float(instalada_kw), float(custo_demanda(instalada_kw, maximas, tarifa_kw)[0]), curva, True
+    return float(candidatos[i]), float(custos[i]), curva, limitada
+
+
+def analisar_demanda(serie_kw, tarifa_kw, instalada_kw=None):
+    """
+    Pipeline completo: integração em 15 min, máximas mensais, percentis e
+    demanda contratada recomendada (limitada à potência instalada, se dada).
+    """
+    d15 = integrar_15min(serie_kw)
+    mensal, percentis = resumo_demanda(d15)
+    kw, custo, curva, limitada = recomendar_demanda_contratada(
+        mensal['Demanda_Maxima_kW'], tarifa_kw, instalada_kw=instalada_kw
+    )
+    return {
+        'mensal': mensal,
+        'percentis': percentis,
+        'maxima_kw': float(d15.max()) if len(d15) else 0.0,
+        'contratada_kw': kw,
+        'custo_anual': custo,
+        'curva_custo': curva,
+        'instalada_kw': instalada_kw,
+        'acima_instalada': limitada,
+    }
+
+
+def _numero_br(coluna):
+    """Números como texto: com vírgula, o ponto é separador de milhar ("1.234,5")."""
+    if coluna.dtype != object:
+        return pd.to_numeric(coluna, errors='coerce')
+    texto = coluna.astype(str).str.strip()
+    com_virgula = texto.str.contains(',', regex=False)
+    texto = texto.where(~com_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors='coerce')
+
+
+def ler_medicao(arquivo):
+    """
+    CSV de medição: primeira coluna de texto com datas e primeira coluna
+    numérica (kW, aceita número pt-BR como "1.234,5"). Devolve uma Series
+    indexada pela data. ValueError se faltar alguma das duas colunas.
+    """
+    df = pd.read_csv(arquivo, sep=None, engine='python')
+    datas = next((
+        c for c in df.columns
+        if df[c].dtype == object and pd.to_datetime(df[c], errors='coerce', dayfirst=True).notna().mean() > 0.9
+    ), None)
+    if datas is None:
+        raise ValueError("a medição não tem uma coluna de data/hora reconhecível")
+    numericas = {c: _numero_br(df[c]) for c in df.columns if c != datas}
+    valores = next((v for v in numericas.values() if v.notna().mean() > 0.9), None)
+    if valores is None:
+        raise ValueError("a medição não tem uma coluna numérica de potência (kW)")
+    serie = pd.Series(valores.to_numpy(), index=pd.to_datetime(df[datas], errors='coerce', dayfirst=True))
+    return serie[serie.index.notna()].dropna()
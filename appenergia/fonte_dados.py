@@ -0,0 +1,370 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metricas
+
+try:
+    import pyarrow  # noqa: F401
+    TEM_PARQUET = True
+except ImportError:
+    TEM_PARQUET = False
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# ---------------------------------------------------
+# FONTES DE DADOS (OFFLINE-FIRST)
+# ---------------------------------------------------
+# Ordem de preferência para cada fonte:
+#   1. caminho configurado por variável de ambiente (sempre vence);
+#   2. a cópia mais recente entre o arquivo do repositório e a última
+#      cópia remota baixada para o diretório de cache.
+# O GitHub só é consultado quando pedido (revalidar) ou quando não existe
+# nenhuma cópia local. Os dados já interpretados ficam em Parquet, com o
+# hash do conteúdo no nome do arquivo.
+DIR_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_CACHE = os.environ.get("ENERGIA_CACHE_DIR", os.path.join(DIR_REPO, ".cache_energia"))
+
+DATA_URL_INVENTARIO = "https://raw.githubusercontent.com/Web3economyst/UFRGS_Energy/refs/heads/main/Planilha%20Unificada(Equipamentos%20Consumo).csv"
+DATA_URL_OCUPACAO = "https://github.com/Web3economyst/UFRGS_Energy/raw/main/Hor%C3%A1rios.xlsx"
+
+FONTES = {
+    'inventario': {
+        'url': DATA_URL_INVENTARIO,
+        'local': os.path.join(DIR_REPO, "Planilha Unificada(Equipamentos Consumo).csv"),
+        'env': "ENERGIA_INVENTARIO",
+        'arquivo_remoto': "inventario.csv",
+    },
+    'ocupacao': {
+        'url': DATA_URL_OCUPACAO,
+        'local': os.path.join(DIR_REPO, "Horários.xlsx"),
+        'env': "ENERGIA_OCUPACAO",
+        'arquivo_remoto': "ocupacao.xlsx",
+    },
+}
+
+
+def _caminho_remoto(nome):
+    return os.path.join(DIR_CACHE, "remoto", FONTES[nome]['arquivo_remoto'])
+
+
+def caminho_fonte(nome):
+    """
+    Resolve o arquivo a ser lido para a fonte `nome` ('inventario' ou
+    'ocupacao'). Baixa do GitHub só se não houver nenhuma cópia local.
+    """
+    fonte = FONTES[nome]
+    configurado = os.environ.get(fonte['env'])
+    if configurado:
+        return configurado
+
+    candidatos = [c for c in (fonte['local'], _caminho_remoto(nome)) if os.path.exists(c)]
+    if not candidatos:
+        revalidar(nome)
+        return _caminho_remoto(nome)
+    return max(candidatos, key=os.path.getmtime)
+
+
+def versao_arquivo(caminho):
+    """
+    Impressão digital barata (tamanho, mtime) usada como chave do
+    st.cache_data; o hash de conteúdo só é calculado em caso de miss.
+    """
+    st_ = os.stat(caminho)
+    return (st_.st_size, st_.st_mtime_ns)
+
+
+def slug(nome):
+    """Nome seguro para arquivo ou diretório (prédio, nome de arquivo de origem)."""
+    s = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', s).strip('_').lower() or 'predio'
+
+
+def prefixo_cache(nome, caminho):
+    """
+    Prefixo dos arquivos de cache de `caminho`: nome da fonte, nome do
+    arquivo e hash do caminho completo — dois inventario.csv em pastas
+    diferentes (prédios do campus) nunca dividem o prefixo.
+    """
+    origem = os.path.abspath(str(caminho))
+    base = slug(os.path.splitext(os.path.basename(origem))[0])
+    return f"{nome}-{base}-{hashlib.sha1(origem.encode('utf-8')).hexdigest()[:10]}-"
+
+
+def hash_conteudo(caminho, bloco=1 << 20):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()[:20]
+
+
+@metricas.medido()
+def ler_com_cache(caminho, nome, parser):
+    """
+    Lê `caminho` com `parser(caminho) -> DataFrame`, guardando o resultado em
+    Parquet chaveado pelo hash do conteúdo. Nas próximas execuções a leitura
+    é um Parquet mapeado em memória em vez de CSV/XLSX.
+    """
+    if not TEM_PARQUET:
+        return parser(caminho)
+
+    destino = os.path.join(DIR_CACHE, f"{prefixo_cache(nome, caminho)}{hash_conteudo(caminho)}.parquet")
+    if os.path.exists(destino):
+        try:
+            df = pd.read_parquet(destino, memory_map=True)
+            # Parquet devolve None nos textos vazios; o CSV/XLSX devolvia NaN
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].where(df[col].notna(), np.nan)
+            metricas.marcar_cache('acerto')
+            return df
+        except Exception:
+            pass  # Cache corrompido: reprocessa abaixo
+
+    metricas.marcar_cache('falha')
+    df = parser(caminho)
+    try:
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        tmp = f"{destino}.{os.getpid()}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, destino)
+        _limpar_versoes_antigas(nome, prefixo_cache(nome, caminho), manter=destino)
+    except Exception:
+        pass  # Colunas de tipo misto etc.: segue sem cache
+    return df
+
+
+def _limpar_versoes_antigas(nome, prefixo, manter):
+    """Remove as outras versões do mesmo arquivo de origem (e as do formato antigo, só com o hash)."""
+    antigo = re.compile(rf"{re.escape(nome)}-[0-9a-f]{{20}}\.parquet")
+    for arq in os.listdir(DIR_CACHE):
+        caminho = os.path.join(DIR_CACHE, arq)
+        mesma_origem = arq.startswith(prefixo) or antigo.fullmatch(arq)
+        if mesma_origem and arq.endswith(".parquet") and caminho != manter:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+@metricas.medido()
+def revalidar(nome, timeout=15):
+    """
+    GET condicional (If-None-Match / If-Modified-Since) da cópia remota.
+    Retorna True se um conteúdo novo foi baixado e False se o servidor
+    respondeu 304. Erros de rede são propagados para quem chamou.
+    """
+    fonte = FONTES[nome]
+    destino = _caminho_remoto(nome)
+    meta_path = destino + ".meta.json"
+
+    meta = {}
+    if os.path.exists(destino) and os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+
+    req = urllib.request.Request(fonte['url'])
+    if meta.get('etag'):
+        req.add_header('If-None-Match', meta['etag'])
+    if meta.get('last_modified'):
+        req.add_header('If-Modified-Since', meta['last_modified'])
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            conteudo = resp.read()
+            meta = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return False
+        raise
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(conteudo)
+    os.replace(tmp, destino)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return True
+
+
+# ---------------------------------------------------
+# CARGA CONCORRENTE (PARTIDA A FRIO)
+# ---------------------------------------------------
+# Numa partida a frio as fontes não são lidas uma depois da outra: os
+# downloads que faltam correm juntos (asyncio, com o urllib em threads) e a
+# planilha de catracas — a leitura mais cara — é interpretada numa thread à
+# parte enquanto o inventário é lido e limpo.
+#
+# A carga usa threads, não processos: o servidor do Streamlit tem várias
+# threads, e um fork de processo com threads pode deixar o filho travado
+# num lock que outra thread segurava (logging, pandas/Arrow). Os pools de
+# processos do app (campus, Monte Carlo) usam contexto_processos(): os
+# filhos nascem de um forkserver (processo limpo, que já importou os
+# módulos do app) ou, onde não houver forkserver, por spawn.
+THREADS_CARGA = 2
+MODULOS_PRECARREGADOS = ['campus', 'monte_carlo']
+
+_pool_carga = None
+_tarefas = {}            # chave -> Future ainda não consumido
+_iniciadas = set()       # chaves já disparadas (não dispara de novo)
+_trava_carga = threading.Lock()
+
+
+def contexto_processos():
+    """Contexto multiprocessing dos pools (forkserver; spawn onde não houver)."""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    contexto = multiprocessing.get_context('forkserver')
+    contexto.set_forkserver_preload(MODULOS_PRECARREGADOS)
+    return contexto
+
+
+def _em_paralelo(func, nomes):
+    """{nome: func(nome) ou a exceção levantada}, com as chamadas simultâneas."""
+    async def todas():
+        return await asyncio.gather(*(asyncio.to_thread(func, n) for n in nomes), return_exceptions=True)
+    return dict(zip(nomes, asyncio.run(todas())))
+
+
+def resolver_fontes(nomes=tuple(FONTES)):
+    """{nome: caminho} das fontes (None se indisponível); as que não têm cópia local são baixadas juntas."""
+    return {nome: None if isinstance(c, Exception) else c for nome, c in _em_paralelo(caminho_fonte, nomes).items()}
+
+
+def revalidar_fontes(nomes=tuple(FONTES)):
+    """revalidar() de todas as fontes ao mesmo tempo. Retorna as que mudaram."""
+    resultados = _em_paralelo(revalidar, nomes)
+    for r in resultados.values():
+        if isinstance(r, Exception):
+            raise r
+    return [nome for nome, mudou in resultados.items() if mudou]
+
+
+def em_segundo_plano(chave, func, *args):
+    """
+    Começa func(*args) numa thread à parte, uma única vez por `chave`; o
+    resultado é retirado com resultado(chave, ...).
+    """
+    global _pool_carga
+    with _trava_carga:
+        if chave in _iniciadas:
+            return
+        if len(_iniciadas) > 256:
+            _iniciadas.clear()
+        _iniciadas.add(chave)
+        try:
+            if _pool_carga is None:
+                _pool_carga = ThreadPoolExecutor(THREADS_CARGA, thread_name_prefix="carga")
+            _tarefas[chave] = _pool_carga.submit(func, *args)
+        except Exception:
+            _pool_carga = None  # Pool encerrado (fim do interpretador): resultado() lê aqui mesmo
+
+
+def resultado(chave, func, *args):
+    """Resultado da tarefa `chave` (esperando por ela) ou, sem tarefa, func(*args) aqui mesmo."""
+    with _trava_carga:
+        futuro = _tarefas.pop(chave, None)
+    if futuro is not None:
+        try:
+            return futuro.result()
+        except Exception:
+            pass  # Falhou na thread: refaz aqui, onde o erro aparece para quem chamou
+    return func(*args)
+
+
+# ---------------------------------------------------
+# LEITURA RÁPIDA DE XLSX (openpyxl read-only)
+# ---------------------------------------------------
+# Em vez de pd.read_excel(nrows=5) em cada aba (que abre e interpreta a
+# aba inteira) e depois a aba escolhida com todas as colunas, lemos só a
+# linha de cabeçalho de cada aba e, em seguida, apenas as colunas
+# necessárias, em blocos, direto para arrays tipados.
+
+
+def descobrir_aba(caminho, colunas):
+    """
+    Nome da primeira aba cujo cabeçalho contém todas as `colunas`
+    (ou None). Só a primeira linha de cada aba é lida.
+    """
+    wb = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            cabecalho = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            nomes = {str(x).strip() for x in cabecalho if x is not None}
+            if all(c in nomes for c in colunas):
+                return ws.title
+        return None
+    finally:
+        wb.close()
+
+
+def _bloco_para_frame(linhas, colunas, datas):
+    df = pd.DataFrame(dict(zip(colunas, zip(*linhas))) if linhas else {c: [] for c in colunas})
+    for col in datas:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def ler_colunas_xlsx(caminho, aba, colunas, datas=(), bloco=50_000):
+    """
+    Lê apenas `colunas` da aba `aba` em modo streaming. As colunas em
+    `datas` são convertidas para datetime64 a cada bloco de linhas.
+    """
+    wb = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = wb[aba].iter_rows(values_only=True)
+        cabecalho = [str(x).strip() if x is not None else '' for x in next(linhas, ())]
+        idx = [cabecalho.index(c) for c in colunas]
+
+        partes, atual = [], []
+        for linha in linhas:
+            atual.append(tuple(linha[i] if i < len(linha) else None for i in idx))
+            if len(atual) >= bloco:
+                partes.append(_bloco_para_frame(atual, colunas, datas))
+                atual = []
+        partes.append(_bloco_para_frame(atual, colunas, datas))
+    finally:
+        wb.close()
+
+    df = pd.concat(partes, ignore_index=True)
+    # Linhas totalmente vazias são ignoradas, como no pd.read_excel
+    return df.dropna(how='all').reset_index(drop=True)
+
+
+def _ler_planilha_pandas(caminho, colunas):
+    xls = pd.ExcelFile(caminho)
+    for aba in xls.sheet_names:
+        cols = [str(x).strip() for x in pd.read_excel(xls, sheet_name=aba, nrows=5).columns]
+        if all(c in cols for c in colunas):
+            return pd.read_excel(xls, sheet_name=aba)
+    return pd.read_excel(xls, sheet_name=xls.sheet_names[0])
+
+
+def ler_planilha(caminho, colunas, datas=()):
+    """
+    Localiza a aba com `colunas` e lê só essas colunas. Se nenhuma aba
+    tiver o cabeçalho, devolve a primeira aba inteira (como antes).
+    """
+    try:
+        aba = descobrir_aba(caminho, colunas)
+    except Exception:
+        # openpyxl ausente ou formato que ele não abre (.xls, por exemplo)
+        return _ler_planilha_pandas(caminho, colunas)
+    if aba is None:
+        return pd.read_excel(caminho, sheet_name=0)
+    return ler_colunas_xlsx(caminho, aba, list(colunas), datas=datas)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------
+# FORMATAÇÃO PT-BR (1.234,56)
+# ---------------------------------------------------
+# formatar_br serve para valores avulsos (st.metric, legendas). Para
+# tabelas, formatar_coluna_br formata a coluna inteira de uma vez (dígitos
+# e separadores montados com aritmética do NumPy), com resultado idêntico
+# ao de formatar_br célula a célula.
+
+
+def formatar_br(valor, prefixo="", sufixo="", decimais=2):
+    """
+    Formata números float para string no padrão brasileiro:
+    1.234,56 (milhar com ponto, decimal com vírgula)
+    """
+    try:
+        if pd.isna(valor):
+            return "-"
+
+        # Formata primeiro com padrão US (vírgula=milhar, ponto=decimal)
+        formato = f"{{:,.{decimais}f}}"
+        texto = formato.format(valor)
+
+        # Troca os caracteres
+        texto = texto.replace(",", "X").replace(".", ",").replace("X", ".")
+
+        return f"{prefixo}{texto}{sufixo}"
+    except Exception:
+        return str(valor)
+
+
+# Acima disso o float não representa mais as casas decimais pedidas
+LIMITE_EXATO = 1e15
+
+
+def _texto_br(n, decimais):
+    """
+    Texto pt-BR, sem sinal, de inteiros não negativos `n` (o valor já
+    multiplicado por 10**decimais): os dígitos são montados numa matriz de
+    caracteres, com ponto a cada três casas e vírgula antes dos decimais.
+    """
+    linhas = len(n)
+    largura = max(len(str(int(n.max()))), decimais + 1)
+    potencias = 10 ** np.arange(largura - 1, -1, -1, dtype=np.int64)
+    digitos = (n[:, None] // potencias) % 10
+    # Zeros à esquerda viram espaço (mantendo o "0" da parte inteira)
+    n_digitos = np.maximum((n[:, None] >= potencias).sum(axis=1), decimais + 1)
+    vazio = np.arange(largura) < (largura - n_digitos)[:, None]
+    chars = np.where(vazio, ord(' '), digitos + ord('0')).astype(np.uint32)
+
+    n_inteiro = largura - decimais
+    grupos = -(-n_inteiro // 3)
+    inteiro = np.concatenate(
+        [np.full((linhas, grupos * 3 - n_inteiro), ord(' '), dtype=np.uint32), chars[:, :n_inteiro]], axis=1
+    ).reshape(linhas, grupos, 3)
+    # Ponto antes de cada grupo cujo grupo anterior já tem dígito
+    sep = np.full((linhas, grupos, 1), ord(' '), dtype=np.uint32)
+    sep[:, 1:, 0] = np.where(inteiro[:, :-1, 2] != ord(' '), ord('.'), ord(' '))
+    partes = [np.concatenate([sep, inteiro], axis=2).reshape(linhas, -1)]
+    if decimais > 0:
+        partes += [np.full((linhas, 1), ord(','), dtype=np.uint32), chars[:, n_inteiro:]]
+    matriz = np.ascontiguousarray(np.concatenate(partes, axis=1))
+    return np.char.lstrip(matriz.view(f'<U{matriz.shape[1]}').ravel())
+
+
+def formatar_coluna_br(valores, prefixo="", sufixo="", decimais=2):
+    """
+    formatar_br aplicado a um array/Series inteiro, de forma vetorizada.
+    Retorna um array de strings (NaN vira "-").
+    """
+    bruto = np.asarray(valores)
+    if bruto.dtype.kind not in 'biuf':
+        return np.array([formatar_br(v, prefixo, sufixo, decimais) for v in bruto], dtype=object)
+    v = bruto.astype(float)
+    saida = np.full(len(v), "-", dtype=object)
+
+    x = np.abs(v) * 10.0 ** decimais
+    n = np.rint(x)
+    # Quase empates (x,5) e valores enormes dependem da representação binária
+    # exata: esses poucos casos passam pelo formatar_br escalar
+    with np.errstate(invalid='ignore'):
+        duvida = ~np.isfinite(x) | (x >= LIMITE_EXATO) | (np.abs(x - np.floor(x) - 0.5) <= 1e-9 * np.maximum(x, 1))
+    ok = ~duvida
+    if ok.any():
+        texto = _texto_br(n[ok].astype(np.int64), decimais)
+        texto = np.char.add(np.where(np.signbit(v[ok]), '-', ''), texto)
+        saida[ok] = np.char.add(np.char.add(prefixo, texto), sufixo)
+    for i in np.flatnonzero(duvida & ~np.isnan(v)):
+        saida[i] = formatar_br(v[i], prefixo, sufixo, decimais)
+    return saida
+
+
+def formatar_tabela_br(df, formatos=None):
+    """
+    Cópia de `df` com as colunas de `formatos` ({coluna: kwargs de
+    formatar_br}) já convertidas em texto pt-BR. Sem `formatos`, todas as
+    colunas numéricas usam o formato padrão (2 casas).
+    """
+    if formatos is None:
+        formatos = {c: {} for c in df.columns if pd.api.types.is_numeric_dtype(df[c])}
+    saida = df.copy()
+    for col, kwargs in formatos.items():
+        if col in saida.columns:
+            saida[col] = formatar_coluna_br(saida[col].to_numpy(), **kwargs)
+    return saida
@@ -0,0 +1,88 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import fonte_dados
+from classificador import primeira_regra
+from metricas import medido
+
+# ---------------------------------------------------
+# TABELA DE REGRAS DE IMPUTAÇÃO
+# ---------------------------------------------------
+# Cada linha de regras_potencia.csv é uma regra, avaliada na ordem do arquivo
+# (a primeira que casar vence, como no antigo encadeamento de "if"):
+#   fallback -> potência <= 0 e o nome contém `padrao`: usa `valor` (W)
+#   unidade  -> potência > 0 e des_potencia contém `padrao`: p * valor / divisor
+# Para incluir um novo equipamento ou unidade basta acrescentar uma linha.
+REGRAS_POTENCIA_PATH = os.environ.get(
+    "REGRAS_POTENCIA_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "regras_potencia.csv"),
+)
+
+_versoes_regras = {}
+_trava_regras = threading.Lock()
+
+
+def versao_regras(caminho=None):
+    """
+    Hash do conteúdo da tabela de regras, para as chaves dos caches em disco
+    (armazém, retratos, resultados): editar o CSV invalida o que foi imputado
+    com a versão anterior. Só relê o arquivo quando tamanho/mtime mudam.
+    """
+    caminho = os.path.abspath(caminho or REGRAS_POTENCIA_PATH)
+    try:
+        marca = (caminho, fonte_dados.versao_arquivo(caminho))
+    except OSError:
+        return None  # Sem tabela: carregar_regras falha antes de qualquer cache
+    with _trava_regras:
+        if marca not in _versoes_regras:
+            _versoes_regras.clear()
+            _versoes_regras[marca] = fonte_dados.hash_conteudo(caminho)
+        return _versoes_regras[marca]
+
+
+def carregar_regras(caminho=None):
+    """
+    Lê a tabela de regras de imputação/conversão de potência.
+    """
+    regras = pd.read_csv(caminho or REGRAS_POTENCIA_PATH, dtype={'tipo': str, 'padrao': str})
+    regras['tipo'] = regras['tipo'].str.strip().str.lower()
+    regras['padrao'] = regras['padrao'].str.strip().str.upper()
+    regras['valor'] = pd.to_numeric(regras['valor'], errors='coerce').fillna(0.0)
+    regras['divisor'] = pd.to_numeric(regras['divisor'], errors='coerce').fillna(1.0)
+    return regras.reset_index(drop=True)
+
+
+@medido()
+def estimar_potencia_real(df, regras=None):
+    """
+    Versão vetorizada da imputação de potência (W) por linha do inventário.
+
+    Espera as colunas `num_potencia` (numérica), `des_potencia` e
+    `des_nome_generico_equipamento` (já em maiúsculas).
+    """
+    if regras is None:
+        regras = carregar_regras()
+
+    p = df['num_potencia'].to_numpy(dtype=float)
+    nome = df['des_nome_generico_equipamento']
+    unidade = df['des_potencia']
+
+    fallback = regras[regras['tipo'] == 'fallback']
+    conversao = regras[regras['tipo'] == 'unidade']
+
+    # Se potência for 0 ou inválida, imputa média de mercado (ou 0 se não souber);
+    # os padrões passam pelo classificador de palavras-chave (um por valor distinto)
+    idx_fb = primeira_regra(nome, fallback['padrao'].tolist())
+    valores_fb = np.append(fallback['valor'].to_numpy(dtype=float), 0.0)
+    imputada = valores_fb[idx_fb]
+
+    # Conversão de unidades (sem regra = potência já em W)
+    idx_un = primeira_regra(unidade, conversao['padrao'].tolist())
+    mult = np.append(conversao['valor'].to_numpy(dtype=float), 1.0)[idx_un]
+    div = np.append(conversao['divisor'].to_numpy(dtype=float), 1.0)[idx_un]
+    convertida = (p * mult) / div
+
+    return pd.Series(np.where(p <= 0, imputada, convertida), index=df.index, name='Potencia_Real_W')
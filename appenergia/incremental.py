@@ -0,0 +1,352 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import fonte_dados
+import imputacao
+import nucleo
+from cubo import aplicar_delta, construir_cubo
+from fonte_dados import slug
+from metricas import medido
+from motor_consumo import preparar_consumo
+
+# ---------------------------------------------------
+# REINGESTÃO INCREMENTAL DO INVENTÁRIO
+# ---------------------------------------------------
+# O CSV é editado o tempo todo pelas equipes de contagem. Em vez de limpar,
+# imputar e categorizar o inventário inteiro a cada edição, cada linha bruta
+# recebe uma impressão digital (hash do conteúdo) e é comparada com o último
+# retrato processado: só as linhas inseridas ou alteradas passam pela
+# limpeza/colunas derivadas, e os cubos de agregados já calculados recebem
+# apenas o delta (menos as linhas que saíram, mais as que entraram).
+#
+# O retrato fica em memória (por processo) e em disco, em
+# DIR_CACHE/incremental/<arquivo>/, junto com alteracoes.jsonl — o registro
+# de auditoria de cada reingestão (o que entrou, saiu ou mudou, e quem
+# contou). O retrato vale para uma versão do CSV e da tabela de regras de
+# potência: se as regras mudam, a potência imputada das linhas mantidas
+# também muda, e o inventário inteiro é reprocessado.
+
+DIR_INCREMENTAL = os.path.join(fonte_dados.DIR_CACHE, "incremental")
+
+# Colunas que identificam "o mesmo item" entre versões: uma linha removida e
+# uma inserida com a mesma chave contam como atualização
+CHAVES_ITEM = ('Id_sala', 'des_nome_equipamento', 'modelo_equipamento', 'num_série_equipamento')
+COLUNA_RESPONSAVEL = 'responsável pela contagem'
+MAX_ITENS_LOG = 500      # itens detalhados por entrada do registro
+CUBOS_POR_ARQUIVO = 8    # conjuntos de parâmetros com cubo guardado
+RETRATO_ABANDONADO_S = 3600  # retratos .tmp mais velhos que isso são de gravações interrompidas
+
+_estados = {}            # caminho -> retrato atual
+_travas = {}
+_trava_global = threading.Lock()
+
+
+def _trava(caminho):
+    with _trava_global:
+        return _travas.setdefault(caminho, threading.Lock())
+
+
+def dir_retrato(caminho, dir_base=DIR_INCREMENTAL):
+    return os.path.join(dir_base, slug(os.path.splitext(os.path.basename(caminho))[0]))
+
+
+def impressoes(df_bruto):
+    """Impressão digital (uint64) do conteúdo de cada linha bruta."""
+    return pd.util.hash_pandas_object(df_bruto, index=False).to_numpy()
+
+
+def _parear(a, b):
+    """
+    Pareia as ocorrências de valores iguais em `a` e `b` (multiconjunto).
+    Retorna (posições em a, posições em b) dos pares e as sobras de cada lado.
+    """
+    da = pd.DataFrame({'v': a, 'pa': np.arange(len(a))})
+    db = pd.DataFrame({'v': b, 'pb': np.arange(len(b))})
+    da['k'] = da.groupby('v', sort=False).cumcount()
+    db['k'] = db.groupby('v', sort=False).cumcount()
+    m = da.merge(db, on=['v', 'k'], how='outer')
+    pares = m.dropna(subset=['pa', 'pb'])
+    so_a = m.loc[m['pb'].isna(), 'pa']
+    so_b = m.loc[m['pa'].isna(), 'pb']
+    return (pares['pa'].to_numpy(np.int64), pares['pb'].to_numpy(np.int64),
+            np.sort(so_a.to_numpy(np.int64)), np.sort(so_b.to_numpy(np.int64)))
+
+
+def diferencas(bruto_antigo, imp_antigas, bruto_novo, imp_novas):
+    """
+    Posições das linhas mantidas (antiga -> nova), atualizadas (antiga ->
+    nova, pela chave CHAVES_ITEM), removidas (antigas) e inseridas (novas).
+    """
+    mant_a, mant_n, sai, entra = _parear(imp_antigas, imp_novas)
+    chaves = [c for c in CHAVES_ITEM if c in bruto_antigo.columns and c in bruto_novo.columns]
+    if chaves and len(sai) and len(entra):
+        chave_a = impressoes(bruto_antigo.iloc[sai][chaves])
+        chave_n = impressoes(bruto_novo.iloc[entra][chaves])
+        pa, pn, resto_a, resto_n = _parear(chave_a, chave_n)
+        atual_a, atual_n, sai, entra = sai[pa], entra[pn], sai[resto_a], entra[resto_n]
+    else:
+        atual_a = atual_n = np.array([], dtype=np.int64)
+    return {'mantidas': (mant_a, mant_n), 'atualizadas': (atual_a, atual_n),
+            'removidas': sai, 'inseridas': entra}
+
+
+def preparar_linhas(df_bruto):
+    """Limpeza, imputação e colunas derivadas de um conjunto de linhas brutas."""
+    return nucleo.colunas_derivadas(nucleo.limpar_inventario(df_bruto.copy()))
+
+
+def _concatenar(partes):
+    """Concatena inventários preparados mantendo as colunas categóricas."""
+    partes = [p for p in partes if len(p)] or partes[:1]
+    for col in partes[0].columns:
+        if all(isinstance(p[col].dtype, pd.CategoricalDtype) for p in partes):
+            categorias = sorted(set().union(*(p[col].cat.categories for p in partes)), key=str)
+            for p in partes:
+                p[col] = p[col].cat.set_categories(categorias)
+    return nucleo.compactar_inventario(pd.concat(partes, ignore_index=True))
+
+
+# ---------------------------------------------------
+# RETRATO EM DISCO E REGISTRO DE ALTERAÇÕES
+# ---------------------------------------------------
+def _assinatura(imp):
+    """Resumo das impressões digitais das linhas (confere o retrato ao ler)."""
+    return hashlib.sha256(np.ascontiguousarray(imp).tobytes()).hexdigest()[:20]
+
+
+def _retrato_atual(destino):
+    try:
+        with open(os.path.join(destino, "atual"), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _gravar_retrato(estado, destino):
+    """
+    Grava o retrato num diretório novo (retrato-<id>/) e só então troca o
+    ponteiro `atual` com um único os.replace: quem lê vê o retrato antigo
+    inteiro ou o novo inteiro, nunca um parquet de cada versão.
+    """
+    os.makedirs(destino, exist_ok=True)
+    nome = f"retrato-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+    tmp = os.path.join(destino, f"{nome}.tmp")
+    os.makedirs(tmp)
+    try:
+        gravados = {}
+        for arq, df in (('bruto', estado['bruto']), ('preparado', estado['df'])):
+            df = df.copy()
+            # Textos de tipo misto (números e strings) não entram no Parquet
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+            df.to_parquet(os.path.join(tmp, f"{arq}.parquet"), index=False)
+            gravados[arq] = df
+        meta = {'versao': list(estado['versao']), 'regras': estado['regras'],
+                'linhas': len(estado['df']), 'linhas_bruto': len(estado['bruto']),
+                'impressao': _assinatura(impressoes(gravados['bruto']))}
+        with open(os.path.join(tmp, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(destino, nome))
+        ponteiro = os.path.join(destino, f"atual.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(ponteiro, 'w', encoding='utf-8') as f:
+            f.write(nome)
+        os.replace(ponteiro, os.path.join(destino, "atual"))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    _limpar_retratos(destino)
+
+
+def _limpar_retratos(destino):
+    """Remove os retratos que o ponteiro não usa mais (e os do formato antigo)."""
+    atual = _retrato_atual(destino)
+    agora = time.time()
+    for arq in os.listdir(destino):
+        caminho = os.path.join(destino, arq)
+        if arq in ('bruto.parquet', 'preparado.parquet', 'meta.json'):
+            try:
+                os.remove(caminho)  # Retrato solto, do formato anterior
+            except OSError:
+                pass
+        elif arq.startswith('retrato-') and arq != atual:
+            try:
+                # Temporários recentes são gravações de outro processo em andamento
+                if arq.endswith('.tmp') and agora - os.stat(caminho).st_mtime < RETRATO_ABANDONADO_S:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(caminho, ignore_errors=True)
+
+
+def _ler_retrato(destino):
+    """Retrato apontado por `atual`, ou None se faltar ou não conferir com o meta."""
+    nome = _retrato_atual(destino)
+    if nome is None:
+        return None
+    origem = os.path.join(destino, nome)
+    try:
+        with open(os.path.join(origem, "meta.json"), encoding='utf-8') as f:
+            meta = json.load(f)
+        bruto = pd.read_parquet(os.path.join(origem, "bruto.parquet"))
+        df = pd.read_parquet(os.path.join(origem, "preparado.parquet"))
+    except Exception:
+        return None
+    # Parquet devolve None nos textos vazios; o CSV devolvia NaN
+    for d in (bruto, df):
+        for col in d.columns[d.dtypes == object]:
+            d[col] = d[col].where(d[col].notna(), np.nan)
+    imp = impressoes(bruto)
+    if (len(df) != meta.get('linhas') or len(bruto) != meta.get('linhas_bruto')
+            or _assinatura(imp) != meta.get('impressao')):
+        return None  # Retrato inconsistente: reprocessa tudo
+    return {'versao': tuple(meta['versao']), 'regras': meta.get('regras'), 'bruto': bruto,
+            'imp': imp, 'df': df, 'cubos': OrderedDict()}
+
+
+def _texto(v):
+    return None if pd.isna(v) else str(v)
+
+
+def _descrever(bruto, pos, responsavel=True):
+    linha = bruto.iloc[pos]
+    item = {c: _texto(linha[c]) for c in CHAVES_ITEM if c in bruto.columns}
+    if responsavel and COLUNA_RESPONSAVEL in bruto.columns:
+        item['responsavel'] = _texto(linha[COLUNA_RESPONSAVEL])
+    return item
+
+
+def _registrar(destino, caminho, versao, delta, bruto_antigo, bruto_novo, segundos):
+    """Acrescenta uma entrada ao alteracoes.jsonl do arquivo."""
+    itens = []
+    for pos in delta['inseridas'][:MAX_ITENS_LOG]:
+        itens.append({'tipo': 'inserida', 'linha': int(pos), **_descrever(bruto_novo, pos)})
+    for pos in delta['removidas'][:MAX_ITENS_LOG]:
+        itens.append({'tipo': 'removida', 'linha_anterior': int(pos), **_descrever(bruto_antigo, pos)})
+    for pa, pn in list(zip(*delta['atualizadas']))[:MAX_ITENS_LOG]:
+        antes, depois = bruto_antigo.iloc[pa], bruto_novo.iloc[pn]
+        campos = {c: [_texto(antes[c]), _texto(depois[c])] for c in bruto_novo.columns
+                  if c in bruto_antigo.columns and _texto(antes[c]) != _texto(depois[c])}
+        itens.append({'tipo': 'atualizada', 'linha': int(pn), 'linha_anterior': int(pa),
+                      **_descrever(bruto_novo, pn), 'campos': campos})
+    entrada = {
+        'quando': datetime.datetime.now().isoformat(timespec='seconds'),
+        'arquivo': caminho, 'versao': list(versao),
+        'inseridas': int(len(delta['inseridas'])), 'atualizadas': int(len(delta['atualizadas'][0])),
+        'removidas': int(len(delta['removidas'])), 'mantidas': int(len(delta['mantidas'][0])),
+        'segundos': round(segundos, 4), 'itens': itens,
+    }
+    os.makedirs(destino, exist_ok=True)
+    with open(os.path.join(destino, "alteracoes.jsonl"), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+
+
+def ler_alteracoes(caminho, dir_base=DIR_INCREMENTAL):
+    """Registro de alterações do arquivo (lista de entradas, mais antigas primeiro)."""
+    arq = os.path.join(dir_retrato(caminho, dir_base), "alteracoes.jsonl")
+    if not os.path.exists(arq):
+        return []
+    with open(arq, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+# ---------------------------------------------------
+# ATUALIZAÇÃO
+# ---------------------------------------------------
+@medido()
+def atualizar_inventario(caminho, versao, df_bruto, dir_base=DIR_INCREMENTAL, persistir=True):
+    """
+    Inventário preparado (limpo + colunas derivadas) para `df_bruto`,
+    reaproveitando o último retrato de `caminho`: só as linhas novas ou
+    alteradas são processadas. Retorna (df preparado, kernel de consumo).
+    """
+    destino = dir_retrato(caminho, dir_base)
+    regras = imputacao.versao_regras()
+    with _trava(caminho):
+        anterior = _estados.get(caminho) or _ler_retrato(destino)
+        mesmas_regras = anterior is not None and anterior.get('regras') == regras
+        if mesmas_regras and anterior['versao'] == tuple(versao):
+            _estados[caminho] = anterior
+            return anterior['df'], anterior.setdefault('kernel', preparar_consumo(anterior['df']))
+
+        t0 = datetime.datetime.now()
+        imp = impressoes(df_bruto)
+        if anterior is None:
+            df = preparar_linhas(df_bruto)
+            delta = {'mantidas': (np.array([], np.int64),) * 2, 'atualizadas': (np.array([], np.int64),) * 2,
+                     'removidas': np.array([], np.int64), 'inseridas': np.arange(len(df_bruto))}
+            bruto_antigo = df_bruto.iloc[:0]
+        elif not mesmas_regras:
+            # Regras novas: tudo é reprocessado, mas o registro mostra só o que mudou no CSV
+            delta = diferencas(anterior['bruto'], anterior['imp'], df_bruto, imp)
+            df = preparar_linhas(df_bruto)
+            bruto_antigo = anterior['bruto']
+        else:
+            delta = diferencas(anterior['bruto'], anterior['imp'], df_bruto, imp)
+            mant_a, mant_n = delta['mantidas']
+            novas = np.sort(np.concatenate([delta['inseridas'], delta['atualizadas'][1]]))
+            # Linhas mantidas vêm do retrato; as novas/alteradas são processadas;
+            # tudo volta para a ordem do CSV atual
+            partes = _concatenar([anterior['df'].take(mant_a), preparar_linhas(df_bruto.iloc[novas])])
+            ordem = np.empty(len(df_bruto), dtype=np.int64)
+            ordem[mant_n] = np.arange(len(mant_n))
+            ordem[novas] = len(mant_n) + np.arange(len(novas))
+            df = partes.take(ordem).reset_index(drop=True)
+            bruto_antigo = anterior['bruto']
+
+        estado = {'versao': tuple(versao), 'regras': regras, 'bruto': df_bruto, 'imp': imp, 'df': df,
+                  'kernel': preparar_consumo(df), 'cubos': OrderedDict(),
+                  'anterior': anterior, 'delta': delta}
+        if mesmas_regras:
+            estado['cubos'] = anterior.get('cubos', OrderedDict())
+        if anterior is not None:
+            anterior.pop('anterior', None)  # só um passo de histórico em memória
+        _estados[caminho] = estado
+        segundos = (datetime.datetime.now() - t0).total_seconds()
+        if persistir:
+            _registrar(destino, caminho, versao, delta, bruto_antigo, df_bruto, segundos)
+            # O retrato em disco só serve à próxima partida a frio: grava em segundo plano
+            threading.Thread(target=_gravar_retrato, args=(estado, destino), daemon=True).start()
+        return df, estado['kernel']
+
+
+@medido()
+def cubo_incremental(caminho, versao, df, chave, consumo_kwh, tarifa_media, tarifa_kw_demanda):
+    """
+    Cubo de agregados de `df` (versão `versao` de `caminho`) para os
+    parâmetros `chave`. Se houver o cubo da versão anterior com os mesmos
+    parâmetros, aplica só o delta (linhas removidas/alteradas saem,
+    inseridas/alteradas entram); senão, monta o cubo do zero.
+    """
+    with _trava(caminho):
+        estado = _estados.get(caminho)
+        if estado is None or estado['versao'] != tuple(versao) or len(estado['df']) != len(consumo_kwh):
+            return construir_cubo(df, consumo_kwh, tarifa_media, tarifa_kw_demanda)
+        cubos = estado['cubos']
+        guardado = cubos.get(chave)
+        anterior, delta = estado.get('anterior'), estado.get('delta')
+        if guardado is not None and guardado['versao'] == estado['versao']:
+            cubo = guardado['cubo']
+        elif guardado is not None and anterior is not None and guardado['versao'] == anterior['versao']:
+            saem = np.concatenate([delta['removidas'], delta['atualizadas'][0]])
+            entram = np.concatenate([delta['inseridas'], delta['atualizadas'][1]])
+            cubo = aplicar_delta(
+                guardado['cubo'],
+                anterior['df'].take(saem), guardado['consumo'][saem],
+                estado['df'].take(entram), np.asarray(consumo_kwh)[entram],
+                tarifa_media, tarifa_kw_demanda,
+            )
+        else:
+            cubo = construir_cubo(estado['df'], consumo_kwh, tarifa_media, tarifa_kw_demanda)
+        cubos[chave] = {'versao': estado['versao'], 'cubo': cubo, 'consumo': np.asarray(consumo_kwh)}
+        cubos.move_to_end(chave)
+        while len(cubos) > CUBOS_POR_ARQUIVO:
+            cubos.popitem(last=False)
+        return cubo
@@ -0,0 +1,201 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+# ---------------------------------------------------
+# INSTRUMENTAÇÃO DAS ETAPAS (TEMPO, MEMÓRIA E CACHE)
+# ---------------------------------------------------
+# Desligada por padrão: etapa() devolve um contexto nulo e os decoradores
+# só testam um booleano antes de chamar a função original. Ligada
+# (ENERGIA_METRICAS=1 ou pelo painel de administração, ?admin=1), cada
+# etapa registra duração, memória alocada (tracemalloc) e, nas etapas
+# cacheadas, se foi acerto ou falha de cache. Os registros ficam em memória
+# para o painel e são acrescentados, um JSON por linha, ao arquivo de
+# métricas (ENERGIA_METRICAS_ARQUIVO, padrão DIR_CACHE/metricas.jsonl).
+
+ENV_ATIVO = "ENERGIA_METRICAS"
+ENV_ARQUIVO = "ENERGIA_METRICAS_ARQUIVO"
+MAX_REGISTROS = 5000     # registros mantidos em memória para o painel
+
+_ativo = False
+_registros = deque(maxlen=MAX_REGISTROS)
+_trava = threading.Lock()
+_local = threading.local()
+_NULO = nullcontext()
+
+
+def ativo():
+    return _ativo
+
+
+def ativar(ligar=True):
+    """Liga/desliga a coleta no processo inteiro (tracemalloc junto)."""
+    global _ativo
+    if ligar and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not ligar and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _ativo = bool(ligar)
+
+
+def arquivo():
+    """Caminho do arquivo JSON-lines de métricas."""
+    if os.environ.get(ENV_ARQUIVO):
+        return os.environ[ENV_ARQUIVO]
+    import fonte_dados  # importado aqui: fonte_dados também é instrumentado
+    return os.path.join(fonte_dados.DIR_CACHE, "metricas.jsonl")
+
+
+def _pilha():
+    pilha = getattr(_local, 'pilha', None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    return pilha
+
+
+def _memoria():
+    return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+
+def _gravar(registro):
+    with _trava:
+        _registros.append(registro)
+        try:
+            caminho = arquivo()
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+            with open(caminho, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError:
+            pass  # Sem onde gravar: o painel continua com os registros em memória
+
+
+@contextmanager
+def _medicao(nome, cache=None):
+    pilha = _pilha()
+    atual, pico = _memoria()
+    if pilha:
+        pilha[-1]['pico'] = max(pilha[-1]['pico'], pico)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    quadro = {'nome': nome, 'cache': cache, 'memoria': atual, 'pico': atual}
+    pilha.append(quadro)
+    t0 = time.perf_counter()
+    try:
+        yield quadro
+    finally:
+        segundos = time.perf_counter() - t0
+        pilha.pop()
+        atual, pico = _memoria()
+        pico = max(quadro['pico'], pico)
+        # A etapa de fora enxerga o pico das de dentro (o reset_peak zerou o dela)
+        if pilha:
+            pilha[-1]['pico'] = max(pilha[-1]['pico'], pico)
+        registro = {
+            'quando': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'etapa': nome,
+            'pai': pilha[-1]['nome'] if pilha else None,
+            'segundos': round(segundos, 6),
+            'memoria_mb': round((atual - quadro['memoria']) / 2**20, 3),
+            'pico_mb': round((pico - quadro['memoria']) / 2**20, 3),
+        }
+        if quadro['cache']:
+            registro['cache'] = quadro['cache']
+        _gravar(registro)
+
+
+def etapa(nome):
+    """Contexto que mede um trecho (`with metricas.etapa("aba:consumo"): ...`)."""
+    return _medicao(nome) if _ativo else _NULO
+
+
+def marcar_cache(resultado):
+    """Marca a etapa em andamento como 'acerto' ou 'falha' de cache."""
+    if _ativo:
+        pilha = _pilha()
+        if pilha:
+            pilha[-1]['cache'] = resultado
+
+
+def medido(nome=None):
+    """Decorador: mede cada chamada da função (nome padrão: modulo.funcao)."""
+    def aplicar(func):
+        rotulo = nome or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def chamada(*args, **kwargs):
+            if not _ativo:
+                return func(*args, **kwargs)
+            with _medicao(rotulo):
+                return func(*args, **kwargs)
+        return chamada
+    return aplicar
+
+
+def em_cache(decorador, nome=None):
+    """
+    Envolve um decorador de cache (ex.: st.cache_data(...)) medindo cada
+    chamada: se o corpo da função rodou, foi falha de cache; senão, acerto.
+    """
+    def aplicar(func):
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        def corpo(*args, **kwargs):
+            marcar_cache('falha')
+            return func(*args, **kwargs)
+        cacheada = decorador(corpo)
+
+        @functools.wraps(func)
+        def chamada(*args, **kwargs):
+            if not _ativo:
+                return cacheada(*args, **kwargs)
+            with _medicao(rotulo, cache='acerto'):
+                return cacheada(*args, **kwargs)
+        if hasattr(cacheada, 'clear'):
+            chamada.clear = cacheada.clear
+        return chamada
+    return aplicar
+
+
+# ---------------------------------------------------
+# CONSULTA (PAINEL)
+# ---------------------------------------------------
+def registros():
+    with _trava:
+        return list(_registros)
+
+
+def limpar():
+    with _trava:
+        _registros.clear()
+
+
+def resumo(regs=None):
+    """Uma linha por etapa: chamadas, tempos, pico de memória e acertos/falhas de cache."""
+    df = pd.DataFrame(registros() if regs is None else regs)
+    colunas = ['etapa', 'chamadas', 'total_s', 'media_ms', 'max_ms', 'pico_mb', 'acertos', 'falhas']
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+    if 'cache' not in df.columns:
+        df['cache'] = None
+    df['acerto'] = df['cache'].eq('acerto')
+    df['falha'] = df['cache'].eq('falha')
+    saida = df.groupby('etapa', sort=False).agg(
+        chamadas=('segundos', 'size'), total_s=('segundos', 'sum'), media_ms=('segundos', 'mean'),
+        max_ms=('segundos', 'max'), pico_mb=('pico_mb', 'max'), acertos=('acerto', 'sum'), falhas=('falha', 'sum'),
+    ).reset_index()
+    saida[['media_ms', 'max_ms']] *= 1000
+    return saida.sort_values('total_s', ascending=False, ignore_index=True)[colunas]
+
+
+if os.environ.get(ENV_ATIVO, "").strip().lower() not in ("", "0", "false", "nao", "não"):
+    ativar(True)
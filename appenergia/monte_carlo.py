@@ -0,0 +1,213 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import fonte_dados
+from motor_consumo import CATEGORIAS, FATOR_USO, IDX_CLIMATIZACAO, mascara_24h
+from roi import FATOR_USO_AR, FATOR_USO_PC, economia_retrofit, payback_meses
+
+# ---------------------------------------------------
+# MONTE CARLO — INCERTEZA DE CONSUMO, CUSTO E PAYBACK
+# ---------------------------------------------------
+# Potências imputadas (1400 W por ar-condicionado, 200 W por computador...),
+# horas de uso e fatores de uso são estimativas. Aqui cada cenário sorteia
+# esses valores e todos os cenários são avaliados de uma vez, como matrizes
+# (amostras × itens imputados) multiplicadas pelos pesos de cada grupo de
+# carga, em blocos para limitar a memória — opcionalmente distribuídos num
+# pool de processos.
+
+# O fator de uso sorteado (base × multiplicador) tem de ficar em [0, 1]. Em
+# vez de cortar (o que, nas categorias com fator 1,0, jogava metade dos
+# cenários exatamente em 1,0), o que passa de 1 é rebatido para baixo: a
+# distribuição continua contínua, com a moda no fator base. Nas categorias
+# já no teto (CATEGORIAS_NO_TETO, fator 1,0) o fator é sorteado em
+# [mínimo × base, base]: o uso não passa de 100% da potência, então ali a
+# incerteza só reduz o consumo e a mediana fica um pouco abaixo da
+# estimativa determinística (o painel avisa ao lado das bandas).
+
+# Cada entrada: (distribuição, parâmetros...). Distribuições suportadas:
+#   ('triangular', min, moda, max) | ('uniforme', min, max)
+#   ('normal', media, desvio)      | ('fixo', valor)
+DISTRIBUICOES_PADRAO = {
+    'potencia_imputada': ('triangular', 0.6, 1.0, 1.5),  # multiplicador por item imputado
+    'horas': ('triangular', -2.0, 0.0, 2.0),              # desvio (h) por categoria
+    'fator_uso': ('triangular', 0.75, 1.0, 1.25),         # multiplicador por categoria
+}
+
+PERCENTIS = (10, 50, 90)
+ELEMENTOS_POR_BLOCO = 2_000_000
+
+IDX_AR = CATEGORIAS.index("Climatização")
+IDX_LUZ = CATEGORIAS.index("Iluminação")
+IDX_PC = CATEGORIAS.index("Informática")
+MEDIA_W_PADRAO = {IDX_LUZ: 32.0, IDX_AR: 1400.0, IDX_PC: 200.0}
+CATEGORIAS_NO_TETO = tuple(c for c in CATEGORIAS if FATOR_USO[c] >= 1.0)
+
+
+def amostrar(rng, dist, tamanho):
+    """Sorteia `tamanho` valores da distribuição descrita pela tupla `dist`."""
+    tipo, *p = dist
+    if tipo == 'triangular':
+        if p[0] == p[2]:
+            return np.full(tamanho, float(p[1]))
+        return rng.triangular(p[0], p[1], p[2], tamanho)
+    if tipo == 'uniforme':
+        return rng.uniform(p[0], p[1], tamanho)
+    if tipo == 'normal':
+        return rng.normal(p[0], p[1], tamanho)
+    if tipo == 'fixo':
+        return np.full(tamanho, float(p[0]))
+    raise ValueError(f"Distribuição desconhecida: {tipo}")
+
+
+def rebater_fator(fator):
+    """Leva valores para [0, 1] por reflexão nas bordas (1,1 -> 0,9; -0,1 -> 0,1)."""
+    r = np.abs(fator) % 2.0
+    return np.where(r > 1.0, 2.0 - r, r)
+
+
+def _avaliar_bloco(dados, semente, n):
+    """
+    Avalia `n` cenários. O consumo é linear na potência de cada item, então
+    só os itens imputados precisam de sorteio individual: seus desvios
+    entram por um produto de matrizes (cenários × itens) @ (itens × grupos).
+    Grupos = categoria × (uso normal | 24h).
+    """
+    rng = np.random.default_rng(semente)
+    dist = dados['distribuicoes']
+    n_cat = len(CATEGORIAS)
+
+    horas_cat = np.clip(dados['horas_cat'][None, :] + amostrar(rng, dist['horas'], (n, n_cat)), 0, 24)
+    mult_fator = amostrar(rng, dist['fator_uso'], (n, n_cat))
+    desvio_pot = amostrar(rng, dist['potencia_imputada'], (n, dados['n_imputadas'])) - 1.0
+
+    # Potência-dia por grupo em cada cenário (base + desvio dos imputados)
+    grupos = dados['base_grupo'][None, :] + desvio_pot @ dados['peso_imputadas']
+    coef = np.ones((n, 2 * n_cat))
+    coef[:, :n_cat] = horas_cat * rebater_fator(dados['fator_uso_cat'][None, :] * mult_fator)
+    coef *= dados['sazonal_grupo'][None, :]
+    res = {'kwh': (grupos * coef).sum(axis=1)}
+
+    roi = dados.get('roi')
+    if roi:
+        # Potência média por categoria em cada cenário
+        soma = dados['soma_real_cat'][None, :] + desvio_pot @ dados['real_imputadas']
+        cont = dados['cont_cat']
+        media = np.where(cont > 0, soma / np.maximum(cont, 1), [MEDIA_W_PADRAO.get(i, 0.0) for i in range(n_cat)])
+        media = media * dados['escala_media'][None, :]
+        eco = economia_retrofit(
+            roi['luz_trocadas'], roi['ar_trocados'], roi['pc_trocados'],
+            media[:, IDX_LUZ], media[:, IDX_AR], media[:, IDX_PC],
+            horas_cat[:, IDX_LUZ], horas_cat[:, IDX_AR], horas_cat[:, IDX_PC],
+            dados['dias_mes'], dados['tarifa'],
+            fator_uso_ar=rebater_fator(FATOR_USO_AR * mult_fator[:, IDX_AR]),
+            fator_uso_pc=rebater_fator(FATOR_USO_PC * mult_fator[:, IDX_PC]),
+        )
+        res['economia'] = eco[0] + eco[1] + eco[2]
+    return res
+
+
+def _uma_quente(indices, valores, n_colunas):
+    """Matriz (itens × n_colunas) com `valores` na coluna `indices` de cada item."""
+    m = np.zeros((len(indices), n_colunas))
+    m[np.arange(len(indices)), indices] = valores
+    return m
+
+
+_DADOS_PROCESSO = None
+
+
+def _iniciar_processo(dados):
+    global _DADOS_PROCESSO
+    _DADOS_PROCESSO = dados
+
+
+def _avaliar_bloco_processo(args):
+    return _avaliar_bloco(_DADOS_PROCESSO, *args)
+
+
+def simular_incerteza(kernel, imputada, potencia_real_w,
+                      horas_ar, horas_luz, horas_pc, horas_eletro, horas_outros,
+                      dias_mes, fator_sazonal_clima=1.0, salas_24h=(),
+                      tarifa=1.0, custo_fixo=0.0, roi=None,
+                      n_amostras=2000, semente=42, distribuicoes=None, processos=0):
+    """
+    Roda `n_amostras` cenários e devolve um dict de arrays por cenário
+    (kwh, custo, conta e, com `roi`, economia e payback).
+
+    `roi`: dict com luz_trocadas, ar_trocados, pc_trocados e investimento;
+    opcionalmente media_w_luz/ar/pc, a potência média dos itens trocados.
+    O resultado não depende de `processos`: cada bloco tem sua semente.
+    """
+    dist = dict(DISTRIBUICOES_PADRAO, **(distribuicoes or {}))
+    n_cat = len(CATEGORIAS)
+    eh_24h = mascara_24h(kernel, salas_24h)
+    cat = kernel['cat_idx']
+    imputadas = np.flatnonzero(np.asarray(imputada, dtype=bool))
+
+    # kWh de cada linha por hora de uso (uso normal) ou por mês (24h)
+    grupo = cat + n_cat * eh_24h
+    peso = kernel['potencia_w'] * np.where(eh_24h, 24 * 30 * kernel['fator_uso_24h'], dias_mes) / 1000
+    sazonal = np.ones(n_cat)
+    if fator_sazonal_clima > 1.0:
+        sazonal[IDX_CLIMATIZACAO] = fator_sazonal_clima
+
+    dados = {
+        'distribuicoes': dist,
+        'n_imputadas': len(imputadas),
+        'horas_cat': np.array([horas_ar, horas_luz, horas_pc, horas_eletro,
+                               horas_outros, horas_outros, horas_outros], dtype=float),
+        'fator_uso_cat': np.array([FATOR_USO[c] for c in CATEGORIAS]),
+        'base_grupo': np.bincount(grupo, weights=peso, minlength=2 * n_cat),
+        'peso_imputadas': _uma_quente(grupo[imputadas], peso[imputadas], 2 * n_cat),
+        'sazonal_grupo': np.tile(sazonal, 2),
+        'dias_mes': dias_mes,
+        'tarifa': tarifa,
+        'roi': roi,
+    }
+    if roi:
+        real = np.asarray(potencia_real_w, dtype=float)
+        dados['soma_real_cat'] = np.bincount(cat, weights=real, minlength=n_cat)
+        dados['cont_cat'] = np.bincount(cat, minlength=n_cat)
+        dados['real_imputadas'] = _uma_quente(cat[imputadas], real[imputadas], n_cat)
+        # Plano otimizado: potência média dos itens escolhidos em relação à
+        # média da categoria (o sorteio perturba a média, a escala se mantém)
+        escala = np.ones(n_cat)
+        for i, chave in ((IDX_LUZ, 'media_w_luz'), (IDX_AR, 'media_w_ar'), (IDX_PC, 'media_w_pc')):
+            if roi.get(chave) and dados['cont_cat'][i] > 0:
+                escala[i] = roi[chave] / (dados['soma_real_cat'][i] / dados['cont_cat'][i])
+        dados['escala_media'] = escala
+
+    tam_bloco = max(1, min(n_amostras, ELEMENTOS_POR_BLOCO // max(len(imputadas), 1)))
+    tamanhos = [min(tam_bloco, n_amostras - i) for i in range(0, n_amostras, tam_bloco)]
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    tarefas = list(zip(sementes, tamanhos))
+
+    if processos and len(tarefas) > 1:
+        with ProcessPoolExecutor(processos, mp_context=fonte_dados.contexto_processos(),
+                                 initializer=_iniciar_processo, initargs=(dados,)) as pool:
+            blocos = list(pool.map(_avaliar_bloco_processo, tarefas))
+    else:
+        blocos = [_avaliar_bloco(dados, s, n) for s, n in tarefas]
+
+    res = {k: np.concatenate([b[k] for b in blocos]) for k in blocos[0]}
+    res['custo'] = res['kwh'] * tarifa
+    res['conta'] = res['custo'] + custo_fixo
+    if roi:
+        res['payback'] = payback_meses(roi['investimento'], res['economia'])
+    return res
+
+
+def resumir(amostras, percentis=PERCENTIS):
+    """Tabela métrica × percentil (P10/P50/P90 por padrão)."""
+    nomes = {
+        'kwh': 'Consumo (kWh/mês)', 'custo': 'Custo Variável (R$/mês)',
+        'conta': 'Conta Total (R$/mês)', 'economia': 'Economia (R$/mês)',
+        'payback': 'Payback (meses)',
+    }
+    linhas = {
+        nomes[k]: np.percentile(v, percentis)
+        for k, v in amostras.items() if k in nomes
+    }
+    return pd.DataFrame(linhas, index=[f"P{p}" for p in percentis]).T
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from classificador import contem_alguma
+from metricas import medido
+
+# ---------------------------------------------------
+# KERNEL DE CONSUMO MENSAL (kWh)
+# ---------------------------------------------------
+# A parte que não depende dos sliders (categoria, equipamentos 24h, fator de
+# uso, códigos de sala) é preparada uma vez no carregamento. A cada rerun o
+# consumo sai de uma única expressão NumPy sobre esses vetores.
+
+CATEGORIAS = [
+    "Climatização", "Iluminação", "Informática", "Eletrodomésticos",
+    "Elevadores", "Bombas", "Outros"
+]
+IDX_CLIMATIZACAO = CATEGORIAS.index("Climatização")
+IDX_OUTROS = CATEGORIAS.index("Outros")
+
+# Fator de uso por categoria (No relatório, itens gerais foram somados 100%)
+FATOR_USO = {
+    "Climatização": 0.60, "Iluminação": 1.00, "Informática": 0.80,
+    "Eletrodomésticos": 1.00, "Elevadores": 1.00, "Bombas": 1.00, "Outros": 1.00
+}
+
+# Equipamentos que sempre ficam ligados 24h (30 dias/mês)
+PALAVRAS_24H = ("GELADEIRA", "FREEZER", "SERVIDOR", "RACK", "NOBREAK")
+PALAVRAS_REFRIGERACAO = ("GELADEIRA", "FREEZER")
+FATOR_USO_REFRIGERACAO = 0.40
+
+
+@medido()
+def preparar_consumo(df):
+    """
+    Pré-calcula os vetores do kernel a partir do inventário já categorizado
+    (colunas Categoria_Macro, des_nome_generico_equipamento, Id_sala e
+    Potencia_Total_Item_W).
+    """
+    cat_idx = pd.Categorical(df['Categoria_Macro'], categories=CATEGORIAS).codes.astype(np.int8)
+    cat_idx = np.where(cat_idx < 0, IDX_OUTROS, cat_idx).astype(np.int8)
+
+    nome = df['des_nome_generico_equipamento']
+    refrigeracao = contem_alguma(nome, PALAVRAS_REFRIGERACAO)
+    sala = df['Id_sala']
+    if not isinstance(sala.dtype, pd.CategoricalDtype):
+        sala = sala.astype(str)  # categóricas (inventário compactado) já têm categorias em texto
+    sala_codigos, salas = pd.factorize(sala, sort=False)
+
+    return {
+        'potencia_w': df['Potencia_Total_Item_W'].to_numpy(dtype=float),
+        'cat_idx': cat_idx,
+        'fator_uso': np.array([FATOR_USO[c] for c in CATEGORIAS])[cat_idx],
+        'equip_24h': contem_alguma(nome, PALAVRAS_24H),
+        'fator_uso_24h': np.where(refrigeracao, FATOR_USO_REFRIGERACAO, 1.00),
+        'sala_codigos': sala_codigos,
+        'salas': np.asarray(salas, dtype=object),
+    }
+
+
+def mascara_24h(kernel, salas_24h=()):
+    """
+    Linhas tratadas como 24h: equipamentos sempre ligados ou salas marcadas.
+    """
+    if len(salas_24h) == 0:
+        return kernel['equip_24h']
+    codigos_sel = np.flatnonzero(np.isin(kernel['salas'], [str(s) for s in salas_24h]))
+    return kernel['equip_24h'] | np.isin(kernel['sala_codigos'], codigos_sel)
+
+
+@medido()
+def calcular_consumo(kernel, horas_ar, horas_luz, horas_pc, horas_eletro, horas_outros,
+                     dias_mes, fator_sazonal_clima=1.0, salas_24h=()):
+    """
+    Consumo mensal (kWh) por linha do inventário para os parâmetros do sidebar.
+    """
+    horas_cat = np.array([horas_ar, horas_luz, horas_pc, horas_eletro,
+                          horas_outros, horas_outros, horas_outros], dtype=float)
+    eh_24h = mascara_24h(kernel, salas_24h)
+
+    h = np.where(eh_24h, 24.0, horas_cat[kernel['cat_idx']])
+    dias = np.where(eh_24h, 30, dias_mes)
+    fator_uso = np.where(eh_24h, kernel['fator_uso_24h'], kernel['fator_uso'])
+
+    cons = (kernel['potencia_w'] * h * dias * fator_uso) / 1000
+
+    # Multiplicador sazonal (Default 1.0 na Baseline)
+    if fator_sazonal_clima > 1.0:
+        cons = np.where(kernel['cat_idx'] == IDX_CLIMATIZACAO, cons * fator_sazonal_clima, cons)
+    return cons
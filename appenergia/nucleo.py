@@ -0,0 +1,325 @@
+import numpy as np
+import pandas as pd
+
+import fonte_dados
+from classificador import contem_alguma, primeira_regra
+from cubo import construir_cubo, tabela, valor
+from demanda import analisar_demanda
+from imputacao import estimar_potencia_real
+from metricas import medido
+from motor_consumo import calcular_consumo, preparar_consumo
+from ocupacao import reconstruir_ocupacao
+from roi import candidatos_retrofit, otimizar_orcamento
+from simulacao import perfil_ocupacao_semanal, simular_ano
+
+# ---------------------------------------------------
+# NÚCLEO DE CÁLCULO (SEM STREAMLIT)
+# ---------------------------------------------------
+# Toda a lógica numérica do painel, só com pandas/NumPy: limpeza do
+# inventário, categorização, consumo, demanda, eficiência e ROI. O app.py
+# envolve estas funções em etapas cacheadas; o relatorio.py as usa em
+# lote, sem servidor web.
+
+# Parâmetros padrão do relatório (os mesmos valores iniciais do sidebar)
+PARAMETROS_PADRAO = {
+    'horas_ar': 11.5, 'horas_luz': 11.5, 'horas_pc': 11.5, 'horas_eletro': 1.0, 'horas_outros': 11.5,
+    'dias_mes': 22, 'fator_sazonal_clima': 1.0, 'salas_24h': (),
+    'tarifa_ponta': 2.90, 'tarifa_fora_ponta': 0.70, 'tarifa_kw_demanda': 40.0,
+    'orcamento': 50000.0, 'custo_led': 25.0, 'custo_ar': 3500.0, 'custo_pc': 2800.0,
+}
+PARAMETROS_USO = ('horas_ar', 'horas_luz', 'horas_pc', 'horas_eletro', 'horas_outros',
+                  'dias_mes', 'fator_sazonal_clima', 'salas_24h')
+
+PESO_PONTA = 0.054
+HORAS_MES = 720
+
+
+def tarifa_media(tarifa_ponta, tarifa_fora_ponta, peso_ponta=PESO_PONTA):
+    """Tarifa média ponderada ponta / fora ponta (R$/kWh)."""
+    return (tarifa_ponta * peso_ponta) + (tarifa_fora_ponta * (1 - peso_ponta))
+
+
+# ---------------------------------------------------
+# INGESTÃO E LIMPEZA
+# ---------------------------------------------------
+@medido()
+def ler_inventario_csv(arq):
+    # Leitura com tratamento de encoding
+    df = pd.read_csv(arq, encoding='utf-8', on_bad_lines='skip')
+    df.columns = df.columns.str.strip()
+    return df
+
+
+@medido()
+def ler_planilha_ocupacao(arq):
+    # Só o cabeçalho de cada aba é inspecionado; da aba de catracas são lidas
+    # apenas as colunas usadas na reconstrução da ocupação
+    return fonte_dados.ler_planilha(arq, ['DataHora', 'EntradaSaida'], datas=['DataHora'])
+
+
+def carregar_ocupacao(caminho):
+    """Catracas com ocupação reconstruída; DataFrame vazio se não houver."""
+    if caminho is None:
+        return pd.DataFrame()
+    try:
+        return reconstruir_ocupacao(fonte_dados.ler_com_cache(caminho, 'ocupacao', ler_planilha_ocupacao))
+    except Exception:
+        return pd.DataFrame()
+
+
+@medido()
+def limpar_inventario(df_inv):
+    """Inventário limpo, com imputação de potência (altera e devolve `df_inv`)."""
+    # 1. Tratamento de Quantidade (Igual ao Relatório: Vazio = 0)
+    df_inv['Quant'] = pd.to_numeric(df_inv['Quant'], errors='coerce').fillna(0)
+
+    # 2. Tratamento Numérico da Potência
+    df_inv['num_potencia'] = pd.to_numeric(df_inv['num_potencia'], errors='coerce').fillna(0)
+
+    # 3. Tratamento de Textos
+    df_inv['des_nome_generico_equipamento'] = df_inv['des_nome_generico_equipamento'].astype(str).str.strip().str.upper()
+    df_inv['des_categoria'] = df_inv['des_categoria'].astype(str).str.strip()
+
+    # Lógica de Salas e Setores
+    if 'num_andar' in df_inv.columns:
+        df_inv['num_andar'] = df_inv['num_andar'].astype(str).str.replace(r'\.0$', '', regex=True).replace(['nan','NaN',''], 'Não Identificado')
+    else:
+        df_inv['num_andar'] = 'Não Identificado'
+
+    if 'Id_sala' in df_inv.columns:
+        df_inv['Id_sala'] = df_inv['Id_sala'].astype(str).replace(['nan','NaN',''], 'Não Identificado')
+    else:
+        df_inv['Id_sala'] = 'Não Identificado'
+
+    if 'Setor' in df_inv.columns:
+        df_inv['Setor'] = df_inv['Setor'].astype(str).str.strip().replace(['nan','NaN',''], 'Não Identificado')
+    else:
+        df_inv['Setor'] = 'Não Identificado'
+
+    # --- A MÁGICA DA IMPUTAÇÃO (Igual ao Relatório) ---
+    # Regras declarativas em regras_potencia.csv, avaliadas de forma vetorizada
+    df_inv['Potencia_Real_W'] = estimar_potencia_real(df_inv)
+    df_inv['Potencia_Total_Item_W'] = df_inv['Potencia_Real_W'] * df_inv['Quant']
+    return compactar_inventario(df_inv)
+
+
+# Textos repetitivos guardados como categóricas (códigos inteiros + tabela
+# de valores): groupby, unique() e filtros == comparam códigos, não strings
+COLUNAS_CATEGORICAS = ('Setor', 'Id_sala', 'num_andar', 'des_categoria', 'des_nome_generico_equipamento',
+                       'des_potencia', 'des_nome_equipamento', 'Marca')
+# Numéricas que cabem em float32 sem perda (quantidades e potências nominais);
+# potências reais e valores em R$ continuam em float64
+COLUNAS_FLOAT32 = ('Quant', 'num_potencia')
+
+
+def compactar_inventario(df_inv):
+    """
+    Representação compacta do inventário limpo: categóricas nos textos
+    repetitivos e float32 onde a conversão é exata. O Streamlit guarda uma
+    cópia por sessão, então isso pesa direto na memória do servidor.
+    """
+    for col in COLUNAS_CATEGORICAS:
+        if col in df_inv.columns and not isinstance(df_inv[col].dtype, pd.CategoricalDtype):
+            s = df_inv[col]
+            # Textos de tipo misto viram str (categorias homogêneas, graváveis em Parquet)
+            df_inv[col] = s.where(s.isna(), s.astype(str)).astype('category')
+    for col in COLUNAS_FLOAT32:
+        if col in df_inv.columns and df_inv[col].dtype == np.float64:
+            v32 = df_inv[col].astype(np.float32)
+            if np.array_equal(v32.to_numpy(dtype=np.float64), df_inv[col].to_numpy(), equal_nan=True):
+                df_inv[col] = v32
+    return df_inv
+
+
+def load_data(caminho_inventario, caminho_ocupacao=None):
+    """
+    Inventário limpo e ocupação a partir dos caminhos (cache Parquet em
+    disco). A ocupação é lida numa thread à parte enquanto o inventário é
+    lido e limpo.
+    """
+    try:
+        chave_oc = ('ocupacao', caminho_ocupacao, fonte_dados.versao_arquivo(caminho_ocupacao))
+    except (TypeError, OSError):
+        chave_oc = None  # Sem planilha: carregar_ocupacao devolve vazio
+    else:
+        fonte_dados.em_segundo_plano(chave_oc, carregar_ocupacao, caminho_ocupacao)
+    df_inv = fonte_dados.ler_com_cache(caminho_inventario, 'inventario', ler_inventario_csv)
+    return limpar_inventario(df_inv), fonte_dados.resultado(chave_oc, carregar_ocupacao, caminho_ocupacao)
+
+
+# ---------------------------------------------------
+# CATEGORIZAÇÃO E COLUNAS DERIVADAS
+# ---------------------------------------------------
+# Fatores de demanda por categoria (coincidência no pico)
+fatores_demanda = {
+    'Climatização': 0.85, 'Iluminação': 1.00, 'Informática': 0.70,
+    'Eletrodomésticos': 0.50, 'Elevadores': 0.30, 'Bombas': 0.70, 'Outros': 0.50
+}
+
+# Categorias macro em ordem alfabética (a mesma ordem dos groupby com texto)
+CATEGORIAS_MACRO = sorted(fatores_demanda)
+
+# Categorização por des_categoria: vence a primeira regra cujo texto contiver
+# alguma das palavras; sem regra = "Outros"
+REGRAS_CATEGORIA = [
+    ("Climatização", ("CLIM", "AR")),
+    ("Iluminação", ("ILUM", "LÂMP")),
+    ("Informática", ("COMP", "MONIT", "INFORM")),
+    ("Eletrodomésticos", ("ELETRO", "DOMÉSTICO", "COPA", "COZINHA")),
+    ("Elevadores", ("ELEV",)),
+    ("Bombas", ("BOMB",)),
+]
+_CODIGO_REGRA = np.array([CATEGORIAS_MACRO.index(c) for c, _ in REGRAS_CATEGORIA] + [CATEGORIAS_MACRO.index("Outros")])
+
+
+def categorizar(textos):
+    """Categoria macro (Categorical em CATEGORIAS_MACRO) de cada texto."""
+    idx = primeira_regra(textos, [palavras for _, palavras in REGRAS_CATEGORIA])
+    return pd.Categorical.from_codes(_CODIGO_REGRA[idx], categories=CATEGORIAS_MACRO)
+
+
+def agrupar(cat):
+    return str(categorizar([cat])[0])
+
+# Filtro de aparelhos térmicos e de cozinha (Tab 5)
+target_keywords = [
+    "AR CONDICIONADO", "GELADEIRA", "FRIGOBAR", "REFRIGERADOR",
+    "BEBEDOURO", "DESUMIDIFICADOR", "VENTILADOR", "MICROONDAS",
+    "TORRADEIRA", "CAFETEIRA", "CHALEIRA", "FOGÃO", "FORNO",
+    "AQUECEDOR", "FOGAREIRO"
+]
+
+def is_target_appliance(nome):
+    return bool(contem_alguma([nome], target_keywords)[0])
+
+
+@medido()
+def colunas_derivadas(df_inv):
+    """
+    Colunas estáticas por linha (categoria, potência instalada, demanda,
+    filtro de aparelhos). Altera e devolve `df_inv`.
+    """
+    # Categoria e filtro de aparelhos saem do classificador de palavras-chave,
+    # que varre cada texto distinto uma vez
+    df_inv['Categoria_Macro'] = categorizar(df_inv['des_categoria'])
+    df_inv['Potencia_Instalada_kW'] = df_inv['Potencia_Total_Item_W'] / 1000
+    fator = df_inv['Categoria_Macro'].map(fatores_demanda).astype(float).fillna(0.5)
+    df_inv['Demanda_Estimada_kW'] = df_inv['Potencia_Instalada_kW'] * fator
+    df_inv['Alvo_Termico_Cozinha'] = contem_alguma(df_inv['des_nome_generico_equipamento'], target_keywords)
+    return df_inv
+
+
+def derivar_colunas(df_inv):
+    """
+    Colunas estáticas (categoria, potência instalada, demanda, filtro de
+    aparelhos) e kernel de consumo. Retorna (df_inv, kernel).
+    """
+    df_inv = colunas_derivadas(df_inv)
+    return df_inv, preparar_consumo(df_inv)
+
+
+# ---------------------------------------------------
+# AGREGADOS, EFICIÊNCIA E RELATÓRIO
+# ---------------------------------------------------
+@medido()
+def calcular_agregados(df, consumo_kwh, tarifa_media, tarifa_kw_demanda, cubo=None):
+    """
+    Totais e agrupamentos que alimentam as abas, a partir do consumo mensal
+    por item (motor_consumo.calcular_consumo). Totais e tabelas por
+    categoria/setor saem do cubo (res['cubo']), montado uma única vez — ou
+    recebido já pronto (ex.: atualizado por deltas em incremental.py).
+    """
+    if cubo is None:
+        cubo = construir_cubo(df, consumo_kwh, tarifa_media, tarifa_kw_demanda)
+    res = {'cubo': cubo}
+    total = valor(res['cubo'])
+    res['total_instalado_kw'] = total['Potencia_Instalada_kW']
+    res['total_demanda_pico_kw'] = total['Demanda_Estimada_kW']
+    res['consumo_total_kwh'] = total['Consumo_Mensal_kWh']
+    res['custo_demanda_fixo'] = total['Custo_Demanda_R$']
+    res['custo_total_consumo'] = total['Custo_Consumo_R$']
+
+    # Tab 1 — demanda por categoria
+    dft = tabela(res['cubo'], ['Categoria_Macro'], ['Potencia_Instalada_kW', 'Demanda_Estimada_kW', 'Custo_Demanda_R$'])
+    dft.insert(3, 'Fator', dft['Categoria_Macro'].map(fatores_demanda).astype(float))
+    res['demanda_categoria'] = dft.rename(columns={'Custo_Demanda_R$': 'Custo Demanda (R$)'})
+
+    # Tabs 2 e 3 — consumo e custo por categoria
+    res['consumo_categoria'] = tabela(res['cubo'], ['Categoria_Macro'], ['Consumo_Mensal_kWh', 'Custo_Consumo_R$'])
+
+    # Tab 5 — ranking de setores e aparelhos térmicos/cozinha
+    res['setores'] = tabela(res['cubo'], ['Setor'], ['Consumo_Mensal_kWh', 'Custo_Consumo_R$'])
+    alvo = df['Alvo_Termico_Cozinha'].to_numpy()
+    df_clim = df.loc[alvo, ['des_nome_generico_equipamento']].assign(Consumo_Mensal_kWh=np.asarray(consumo_kwh)[alvo])
+    df_clim['Custo_Consumo_R$'] = df_clim['Consumo_Mensal_kWh'] * tarifa_media
+    res['termicos'] = df_clim.groupby("des_nome_generico_equipamento", observed=True)[["Consumo_Mensal_kWh", "Custo_Consumo_R$"]].sum().reset_index()
+    res['termicos_custo'] = df_clim['Custo_Consumo_R$'].sum()
+    res['termicos_consumo'] = df_clim['Consumo_Mensal_kWh'].sum()
+    return res
+
+
+def indicadores_eficiencia(consumo_total_kwh, total_demanda_pico_kw, total_instalado_kw):
+    """Potência média real (kW) e seu uso relativo ao pico estimado e à instalada (%)."""
+    potencia_media_kw = consumo_total_kwh / HORAS_MES
+    return {
+        'potencia_media_kw': potencia_media_kw,
+        'uso_vs_pico_pct': 100 * potencia_media_kw / total_demanda_pico_kw if total_demanda_pico_kw else np.nan,
+        'uso_vs_instalada_pct': 100 * potencia_media_kw / total_instalado_kw if total_instalado_kw else np.nan,
+    }
+
+
+def relatorio(df, kernel, df_oc=None, simular=True, **parametros):
+    """
+    Indicadores do painel para um conjunto de parâmetros (faltantes vêm de
+    PARAMETROS_PADRAO). Retorna (dict de indicadores, dict de tabelas).
+    """
+    p = dict(PARAMETROS_PADRAO, **parametros)
+    p['salas_24h'] = tuple(p['salas_24h'] or ())
+    uso = {k: p[k] for k in PARAMETROS_USO}
+    tarifa = tarifa_media(p['tarifa_ponta'], p['tarifa_fora_ponta'])
+
+    agr = calcular_agregados(df, calcular_consumo(kernel, **uso), tarifa, p['tarifa_kw_demanda'])
+    ind = {
+        'tarifa_media': tarifa,
+        'potencia_instalada_kw': agr['total_instalado_kw'],
+        'demanda_estimada_kw': agr['total_demanda_pico_kw'],
+        'custo_demanda_fixo': agr['custo_demanda_fixo'],
+        'consumo_total_kwh': agr['consumo_total_kwh'],
+        'custo_variavel': agr['custo_total_consumo'],
+        'conta_total': agr['custo_total_consumo'] + agr['custo_demanda_fixo'],
+        'custo_termicos': agr['termicos_custo'],
+    }
+    ind.update(indicadores_eficiencia(agr['consumo_total_kwh'], agr['total_demanda_pico_kw'], agr['total_instalado_kw']))
+
+    cand = candidatos_retrofit(df, p['horas_luz'], p['horas_ar'], p['horas_pc'], p['dias_mes'], tarifa,
+                               p['custo_led'], p['custo_ar'], p['custo_pc'])
+    plano, resumo = otimizar_orcamento(cand, p['orcamento'], p.get('payback_maximo'))
+    ind.update({
+        'roi_investido': resumo['investido'],
+        'roi_economia_mensal': resumo['economia'],
+        'roi_payback_meses': resumo['payback'],
+        'roi_gap_pct': resumo['gap_pct'],
+    })
+
+    tabelas = {
+        'consumo_categoria': agr['consumo_categoria'],
+        'demanda_categoria': agr['demanda_categoria'],
+        'setores': agr['setores'],
+        'plano_retrofit': plano,
+    }
+
+    if simular:
+        ano = df_oc['DataHora'].max().year if df_oc is not None and not df_oc.empty else None
+        sim = simular_ano(kernel, **uso, perfil_ocupacao=perfil_ocupacao_semanal(df_oc), ano=ano)
+        dem = analisar_demanda(pd.Series(sim['total_kw'], index=sim['horas']), p['tarifa_kw_demanda'],
+                               agr['total_instalado_kw'])
+        ind.update({
+            'pico_coincidente_kw': sim['pico_coincidente_kw'],
+            'energia_anual_simulada_kwh': sim['energia_anual_kwh'],
+            'demanda_maxima_15min_kw': dem['maxima_kw'],
+            'demanda_contratada_recomendada_kw': dem['contratada_kw'],
+            'custo_anual_demanda': dem['custo_anual'],
+        })
+        tabelas['demanda_mensal'] = dem['mensal'].reset_index().astype({'Mes': str})
+
+    return {k: (float(v) if isinstance(v, (np.floating, np.integer)) else v) for k, v in ind.items()}, tabelas
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from metricas import medido
+
+# ---------------------------------------------------
+# RECONSTRUÇÃO DA OCUPAÇÃO A PARTIR DAS CATRACAS
+# ---------------------------------------------------
+# Uma ordenação global e um cumsum segmentado por dia substituem o antigo
+# groupby('Data_Dia').apply(ajustar_dia), que fazia uma chamada Python por
+# dia. O deslocamento pelo mínimo negativo de cada dia sai de um
+# transform('min').
+#
+# Eventos no mesmo instante não têm ordem natural, mas a ordem muda o pico
+# (uma entrada antes ou depois de uma saída simultânea). A regra é
+# explícita: por DataHora e, no empate, pela posição da linha na planilha.
+# (O código antigo usava o quicksort instável do NumPy, cuja ordem nos
+# empates depende da versão e da CPU.)
+
+
+def ordem_eventos(datahora):
+    """Posições dos eventos ordenados por (DataHora, linha original)."""
+    t = datahora.to_numpy(dtype='datetime64[ns]')
+    return np.lexsort((np.arange(len(t)), t))
+
+
+@medido()
+def reconstruir_ocupacao(df_oc):
+    """
+    Recebe a aba bruta de Entradas e Saídas (colunas DataHora e
+    EntradaSaida) e devolve os eventos ordenados com Variacao, Data_Dia,
+    Ocupacao_Dia e Ocupacao_Acumulada.
+    """
+    df_oc = df_oc.copy()
+    df_oc.columns = df_oc.columns.astype(str).str.strip()
+    df_oc = df_oc.dropna(subset=['DataHora'])
+    df_oc['DataHora'] = pd.to_datetime(df_oc['DataHora'], errors='coerce')
+
+    # Eventos sem data válida não pertencem a nenhum dia
+    df_oc = df_oc[df_oc['DataHora'].notna()]
+    df_oc = df_oc.take(ordem_eventos(df_oc['DataHora']))
+    df_oc['Variacao'] = df_oc['EntradaSaida'].astype(str).str.upper().str[0].map({'E': 1, 'S': -1}).fillna(0)
+    df_oc['Data_Dia'] = df_oc['DataHora'].dt.date
+
+    dia = df_oc['DataHora'].dt.normalize()
+    ocupacao = df_oc['Variacao'].groupby(dia, sort=False).cumsum()
+    minimo = ocupacao.groupby(dia, sort=False).transform('min')
+
+    # Se o dia começou "negativo" (saídas sem entrada registrada), desloca
+    df_oc['Ocupacao_Dia'] = ocupacao - minimo.clip(upper=0)
+    df_oc['Ocupacao_Acumulada'] = df_oc['Ocupacao_Dia']
+    return df_oc
+
+
+def resumo_diario(df_oc):
+    """
+    Tabela por dia com pico de ocupação, número de entradas e de saídas.
+    """
+    if df_oc.empty:
+        return pd.DataFrame(columns=['Data_Dia', 'Pico_Ocupacao', 'Entradas', 'Saidas'])
+
+    variacao = df_oc['Variacao'].to_numpy()
+    resumo = pd.DataFrame({
+        'Data_Dia': df_oc['Data_Dia'].to_numpy(),
+        'Pico_Ocupacao': df_oc['Ocupacao_Dia'].to_numpy(),
+        'Entradas': (variacao > 0).astype(np.int64),
+        'Saidas': (variacao < 0).astype(np.int64),
+    }).groupby('Data_Dia', sort=True).agg(
+        Pico_Ocupacao=('Pico_Ocupacao', 'max'),
+        Entradas=('Entradas', 'sum'),
+        Saidas=('Saidas', 'sum'),
+    )
+    return resumo.reset_index()
@@ -0,0 +1,130 @@
+"""
+Relatórios em lote, sem Streamlit.
+
+Exemplos:
+    python relatorio.py --parametros cenarios.json --saida relatorios --formato csv json
+    python relatorio.py --inventario predio_a.csv predio_b.csv --formato parquet --tabelas
+    python relatorio.py --campus prédios/ --sem-simulacao --formato csv
+
+`--parametros` aceita um JSON (objeto ou lista de objetos) ou um CSV com
+uma linha por cenário; colunas ausentes usam nucleo.PARAMETROS_PADRAO.
+Em CSV, `salas_24h` é uma lista separada por "|". Cada prédio é lido e
+preparado uma única vez; os cenários reaproveitam o mesmo kernel.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+import campus
+import fonte_dados
+import nucleo
+
+FORMATOS = ('json', 'csv', 'parquet')
+
+
+def ler_parametros(caminho):
+    """Lista de dicts de parâmetros a partir de JSON ou CSV (None = só o padrão)."""
+    if caminho is None:
+        return [{'cenario': 'padrao'}]
+    if caminho.lower().endswith('.json'):
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        cenarios = dados if isinstance(dados, list) else [dados]
+    else:
+        df = pd.read_csv(caminho, sep=None, engine='python')
+        cenarios = [{k: v for k, v in linha.items() if pd.notna(v)} for linha in df.to_dict('records')]
+        for c in cenarios:
+            if isinstance(c.get('salas_24h'), str):
+                c['salas_24h'] = tuple(s.strip() for s in c['salas_24h'].split('|') if s.strip())
+    for i, c in enumerate(cenarios):
+        c.setdefault('cenario', f"cenario_{i + 1}")
+        desconhecidos = set(c) - set(nucleo.PARAMETROS_PADRAO) - {'cenario', 'payback_maximo'}
+        if desconhecidos:
+            raise ValueError(f"Parâmetros desconhecidos em '{c['cenario']}': {sorted(desconhecidos)}")
+    return cenarios
+
+
+def gravar(df, caminho_base, formatos):
+    for fmt in formatos:
+        caminho = f"{caminho_base}.{fmt}"
+        if fmt == 'json':
+            df.to_json(caminho, orient='records', force_ascii=False, indent=2)
+        elif fmt == 'csv':
+            df.to_csv(caminho, index=False)
+        else:
+            df.to_parquet(caminho, index=False)
+
+
+def executar(inventarios, ocupacoes, cenarios, simular=True, com_tabelas=False, log=print, nomes=None):
+    """
+    Roda todos os cenários para todos os prédios. Retorna (DataFrame de
+    indicadores — uma linha por prédio × cenário —, dict de tabelas).
+    Sem `nomes`, cada prédio leva o nome do arquivo de inventário.
+    """
+    nomes = nomes or [os.path.splitext(os.path.basename(c))[0] for c in inventarios]
+    linhas, tabelas = [], {}
+    for predio, caminho_inv, caminho_oc in zip(nomes, inventarios, ocupacoes):
+        t0 = time.perf_counter()
+        df, df_oc = nucleo.load_data(caminho_inv, caminho_oc)
+        df, kernel = nucleo.derivar_colunas(df)
+        log(f"[{predio}] {len(df)} itens carregados em {time.perf_counter() - t0:.2f} s")
+
+        for c in cenarios:
+            params = {k: v for k, v in c.items() if k != 'cenario'}
+            ind, tab = nucleo.relatorio(df, kernel, df_oc, simular=simular, **params)
+            linhas.append({'predio': predio, 'cenario': c['cenario'], **ind})
+            if com_tabelas:
+                for nome, t in tab.items():
+                    tabelas.setdefault(nome, []).append(t.assign(predio=predio, cenario=c['cenario']))
+        log(f"[{predio}] {len(cenarios)} cenário(s) em {time.perf_counter() - t0:.2f} s")
+
+    tabelas = {nome: pd.concat(ts, ignore_index=True) for nome, ts in tabelas.items()}
+    return pd.DataFrame(linhas), tabelas
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Relatórios de energia em lote (sem Streamlit).")
+    ap.add_argument('--inventario', nargs='+', help="CSV(s) de inventário; um prédio por arquivo")
+    ap.add_argument('--ocupacao', nargs='+', help="Planilha(s) de catracas, na mesma ordem dos inventários")
+    ap.add_argument('--campus', help="Diretório ou manifesto de prédios (ver campus.py)")
+    ap.add_argument('--parametros', help="JSON ou CSV com os cenários")
+    ap.add_argument('--saida', default='relatorios', help="Diretório de saída")
+    ap.add_argument('--formato', nargs='+', choices=FORMATOS, default=['json'])
+    ap.add_argument('--tabelas', action='store_true', help="Grava também as tabelas por categoria/setor/plano")
+    ap.add_argument('--sem-simulacao', action='store_true', help="Pula a simulação 8760 h e a demanda de 15 min")
+    args = ap.parse_args(argv)
+
+    nomes = None
+    if args.campus:
+        predios = campus.descobrir_predios(args.campus)
+        nomes = [p['predio'] for p in predios]
+        inventarios = [p['inventario'] for p in predios]
+        ocupacoes = [p['ocupacao'] for p in predios]
+    elif args.inventario:
+        inventarios = args.inventario
+        ocupacoes = list(args.ocupacao or []) + [None] * (len(inventarios) - len(args.ocupacao or []))
+    else:
+        inventarios = [fonte_dados.caminho_fonte('inventario')]
+        ocupacoes = [args.ocupacao[0] if args.ocupacao else fonte_dados.caminho_fonte('ocupacao')]
+
+    cenarios = ler_parametros(args.parametros)
+    indicadores, tabelas = executar(
+        inventarios, ocupacoes, cenarios,
+        simular=not args.sem_simulacao, com_tabelas=args.tabelas,
+        log=lambda msg: print(msg, file=sys.stderr), nomes=nomes
+    )
+
+    os.makedirs(args.saida, exist_ok=True)
+    gravar(indicadores, os.path.join(args.saida, 'indicadores'), args.formato)
+    for nome, t in tabelas.items():
+        gravar(t, os.path.join(args.saida, nome), args.formato)
+    print(f"{len(indicadores)} relatório(s) gravado(s) em {args.saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import numpy as np
+
+# ---------------------------------------------------
+# ECONOMIA DA MODERNIZAÇÃO (ROI)
+# ---------------------------------------------------
+# Economia = Qtd * (Potencia_Antiga_kW - Potencia_Nova_kW) * Horas * Dias * Tarifa
+# As funções aceitam escalares ou arrays NumPy (mesmo formato em todos os
+# argumentos), para servir tanto à aba de ROI quanto ao Monte Carlo.
+
+REDUCAO_LED = 0.50          # LED: 50% de redução sobre a lâmpada atual
+REDUCAO_INVERTER = 0.35     # Inverter economiza 35% sobre a média real
+POTENCIA_MINI_PC_KW = 0.035  # Mini PC consumo médio 35W
+FATOR_USO_MINI_PC = 0.90
+
+FATOR_USO_AR = 0.60
+FATOR_USO_PC = 0.80
+
+
+def economia_retrofit(luz_trocadas, ar_trocados, pc_trocados,
+                      media_w_luz, media_w_ar, media_w_pc,
+                      horas_luz, horas_ar, horas_pc, dias_mes, tarifa,
+                      fator_uso_ar=FATOR_USO_AR, fator_uso_pc=FATOR_USO_PC):
+    """
+    Economia mensal (R$) de cada tipo de troca. Retorna (luz, ar, pc).
+    """
+    # Lâmpadas: Assume LED novo = 18W (0.018 kW) ou 50% de redução
+    kwh_old_luz = (media_w_luz / 1000)
+    kwh_new_luz = kwh_old_luz * (1 - REDUCAO_LED)
+    eco_luz = luz_trocadas * ((kwh_old_luz - kwh_new_luz) * horas_luz * dias_mes * tarifa)
+
+    # Ar Condicionado: FATOR DE USO 0.60 APLICADO AQUI TAMBÉM (CRÍTICO)
+    kwh_old_ar = (media_w_ar / 1000) * fator_uso_ar # Duty Cycle Antigo
+    kwh_new_ar = kwh_old_ar * (1 - REDUCAO_INVERTER)
+    eco_ar = ar_trocados * ((kwh_old_ar - kwh_new_ar) * horas_ar * dias_mes * tarifa)
+
+    # PCs: Assume Mini PC novo = 35W médio vs Desktop antigo
+    kwh_old_pc = (media_w_pc / 1000) * fator_uso_pc # Duty Cycle Antigo
+    kwh_new_pc = POTENCIA_MINI_PC_KW * FATOR_USO_MINI_PC
+    eco_pc = pc_trocados * ((kwh_old_pc - kwh_new_pc) * horas_pc * dias_mes * tarifa)
+
+    # Proteção para não dar economia negativa
+    eco_pc = np.maximum(eco_pc, 0)
+
+    return eco_luz, eco_ar, eco_pc
+
+
+def payback_meses(investimento, economia_mensal):
+    """Meses para pagar o investimento (999 quando não há economia)."""
+    economia_mensal = np.asarray(economia_mensal, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        meses = np.where(economia_mensal > 0, investimento / economia_mensal, 999.0)
+    return float(meses) if meses.ndim == 0 else meses
+
+
+# ---------------------------------------------------
+# ALOCAÇÃO ÓTIMA DO ORÇAMENTO (MOCHILA LIMITADA)
+# ---------------------------------------------------
+# Cada grupo (sala × equipamento × potência) do inventário é um candidato
+# com N unidades idênticas, custo unitário e economia unitária próprios.
+# A escolha é uma mochila limitada: o guloso por razão economia/custo,
+# unidade a unidade, é resolvido com somas acumuladas (um passo por nível
+# de custo unitário, não por item). A relaxação linear (fração da unidade
+# que não coube) dá o limite superior e, com ele, o gap de otimalidade.
+
+CATEGORIAS_RETROFIT = ("Iluminação", "Climatização", "Informática")
+
+
+def candidatos_retrofit(df, horas_luz, horas_ar, horas_pc, dias_mes, tarifa,
+                        custo_led, custo_ar, custo_pc):
+    """
+    Candidatos de troca a partir do inventário (colunas Id_sala, Setor,
+    Categoria_Macro, des_nome_generico_equipamento, Potencia_Real_W, Quant).
+    Retorna DataFrame com Unidades, Custo_Unitario_R$ e Economia_Unitaria_R$.
+    """
+    alvo = df[df['Categoria_Macro'].isin(CATEGORIAS_RETROFIT) & (df['Quant'] > 0)]
+    cand = (
+        alvo.groupby(['Id_sala', 'Setor', 'Categoria_Macro', 'des_nome_generico_equipamento', 'Potencia_Real_W'],
+                     observed=True, sort=False, dropna=False)['Quant'].sum()
+        .reset_index().rename(columns={'Quant': 'Unidades'})
+    )
+    w = cand['Potencia_Real_W'].to_numpy(dtype=float)
+    eco_luz, eco_ar, eco_pc = economia_retrofit(1, 1, 1, w, w, w, horas_luz, horas_ar, horas_pc, dias_mes, tarifa)
+
+    cat = cand['Categoria_Macro'].to_numpy()
+    eh_luz, eh_ar = cat == "Iluminação", cat == "Climatização"
+    cand['Custo_Unitario_R$'] = np.select([eh_luz, eh_ar], [custo_led, custo_ar], custo_pc)
+    cand['Economia_Unitaria_R$'] = np.select([eh_luz, eh_ar], [eco_luz, eco_ar], eco_pc)
+    cand['Unidades'] = cand['Unidades'].astype(np.int64)
+    return cand[(cand['Economia_Unitaria_R$'] > 0) & (cand['Custo_Unitario_R$'] > 0)].reset_index(drop=True)
+
+
+def _guloso_limitado(custo, economia, qtd, orcamento):
+    """
+    Unidades escolhidas por item, percorrendo os itens em ordem e levando
+    quantas unidades couberem (igual ao laço unidade a unidade). Cada passo
+    vetorizado termina num item que não coube inteiro; depois dele só
+    sobram itens mais baratos, então há no máximo um passo por custo distinto.
+    """
+    levar = np.zeros(len(custo), dtype=np.int64)
+    ativos = np.arange(len(custo))
+    saldo = float(orcamento)
+    while len(ativos):
+        acum = np.cumsum(custo[ativos] * qtd[ativos])
+        k = int(np.searchsorted(acum, saldo, side='right'))
+        levar[ativos[:k]] = qtd[ativos[:k]]
+        if k == len(ativos):
+            break
+        saldo -= acum[k - 1] if k else 0.0
+        i = ativos[k]
+        levar[i] = int(saldo // custo[i])
+        saldo -= levar[i] * custo[i]
+        resto = ativos[k + 1:]
+        ativos = resto[custo[resto] <= saldo]
+    return levar
+
+
+def otimizar_orcamento(candidatos, orcamento, payback_maximo=None):
+    """
+    Maximiza a economia mensal com gasto ≤ `orcamento`. Com `payback_maximo`
+    (meses), itens cujo payback unitário passe do limite ficam de fora —
+    reduz o payback da carteira à custa de deixar verba sem uso.
+
+    Retorna (DataFrame dos itens escolhidos, dict-resumo com investido,
+    economia, payback, limite_superior e gap_pct).
+    """
+    cand = candidatos
+    if payback_maximo is not None:
+        cand = cand[cand['Custo_Unitario_R$'] <= cand['Economia_Unitaria_R$'] * payback_maximo]
+
+    custo = cand['Custo_Unitario_R$'].to_numpy(dtype=float)
+    economia = cand['Economia_Unitaria_R$'].to_numpy(dtype=float)
+    qtd = cand['Unidades'].to_numpy(dtype=np.int64)
+
+    ordem = np.lexsort((-economia, -(economia / custo)))
+    custo, economia, qtd = custo[ordem], economia[ordem], qtd[ordem]
+    levar = _guloso_limitado(custo, economia, qtd, orcamento)
+
+    # Limite superior: relaxação linear (mochila fracionária)
+    acum = np.cumsum(custo * qtd)
+    k = int(np.searchsorted(acum, orcamento, side='right'))
+    limite = float((economia[:k] * qtd[:k]).sum())
+    if k < len(custo):
+        limite += (orcamento - (acum[k - 1] if k else 0.0)) * economia[k] / custo[k]
+
+    escolhidos = cand.iloc[ordem].assign(Unidades_Trocadas=levar)
+    escolhidos = escolhidos[escolhidos['Unidades_Trocadas'] > 0].copy()
+    escolhidos['Investimento_R$'] = escolhidos['Unidades_Trocadas'] * escolhidos['Custo_Unitario_R$']
+    escolhidos['Economia_Mensal_R$'] = escolhidos['Unidades_Trocadas'] * escolhidos['Economia_Unitaria_R$']
+    escolhidos['Payback_Meses'] = escolhidos['Custo_Unitario_R$'] / escolhidos['Economia_Unitaria_R$']
+
+    investido = float(escolhidos['Investimento_R$'].sum())
+    eco_total = float(escolhidos['Economia_Mensal_R$'].sum())
+    resumo = {
+        'investido': investido,
+        'economia': eco_total,
+        'payback': payback_meses(investido, eco_total),
+        'limite_superior': limite,
+        'gap_pct': 100 * (limite - eco_total) / limite if limite > 0 else 0.0,
+        'unidades': escolhidos.groupby('Categoria_Macro', observed=True)['Unidades_Trocadas'].sum().to_dict(),
+    }
+    return escolhidos.reset_index(drop=True), resumo
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from motor_consumo import CATEGORIAS, IDX_CLIMATIZACAO, mascara_24h
+
+# ---------------------------------------------------
+# SIMULAÇÃO HORÁRIA (8760 h) DA CARGA DO PRÉDIO
+# ---------------------------------------------------
+# Em vez de Potência × horas × dias, monta uma matriz (grupo de carga ×
+# hora do ano): cada categoria tem um vetor de potência média (kW) que é
+# multiplicado, por broadcasting, pela sua agenda horária e pelo perfil de
+# ocupação reconstruído das catracas. Equipamentos 24h formam um grupo
+# próprio, de carga constante. Nenhuma hora passa da potência instalada
+# (de placa) do grupo: o que a modulação e a ponderação de calendário
+# empurrariam acima dela vai para as horas do mesmo mês com folga.
+
+GRUPO_24H = "Equipamentos 24h"
+GRUPOS = CATEGORIAS + [GRUPO_24H]
+
+# Hora de início do uso de cada categoria (o fim é início + horas do sidebar)
+INICIO_USO = {
+    "Climatização": 7.5, "Iluminação": 7.5, "Informática": 7.5,
+    "Eletrodomésticos": 12.0, "Elevadores": 7.5, "Bombas": 7.5, "Outros": 7.5
+}
+
+# Quanto a carga de cada categoria acompanha a ocupação (0 = nada, 1 = totalmente)
+SENSIBILIDADE_OCUPACAO = {
+    "Climatização": 0.5, "Iluminação": 0.3, "Informática": 0.8,
+    "Eletrodomésticos": 0.8, "Elevadores": 1.0, "Bombas": 0.0, "Outros": 0.0
+}
+
+
+def calendario(ano):
+    """Horas do ano, hora do dia (0–23), dia da semana (0 = segunda) e mês (1–12)."""
+    horas = pd.date_range(f"{ano}-01-01", f"{ano + 1}-01-01", freq="h", inclusive="left")
+    return horas, horas.hour.to_numpy(), horas.dayofweek.to_numpy(), horas.month.to_numpy()
+
+
+def agenda_diaria(inicio, duracao):
+    """
+    Fração de cada hora do dia (vetor de 24) em que o uso está ativo, para
+    uma janela [inicio, inicio + duracao), com virada de meia-noite.
+    """
+    k = np.arange(24, dtype=float)
+    fim = inicio + duracao
+    frac = np.clip(np.minimum(k + 1, fim) - np.maximum(k, inicio), 0, 1)
+    frac += np.clip(np.minimum(k + 1, fim - 24) - np.maximum(k, inicio - 24), 0, 1)
+    return np.minimum(frac, 1.0)
+
+
+def perfil_ocupacao_semanal(df_oc):
+    """
+    Ocupação média por (dia da semana, hora) — matriz 7×24 normalizada para
+    média 1 nas horas ocupadas. Sem dados de catraca devolve tudo 1.
+    """
+    if df_oc is None or df_oc.empty:
+        return np.ones((7, 24))
+
+    dh = df_oc['DataHora']
+    por_hora = pd.DataFrame({
+        'dia': dh.dt.normalize(), 'hora': dh.dt.hour, 'ocup': df_oc['Ocupacao_Acumulada'].to_numpy()
+    }).pivot_table(index='dia', columns='hora', values='ocup', aggfunc='max')
+    # Horas sem evento mantêm a ocupação da hora anterior; antes do 1º evento = 0
+    por_hora = por_hora.reindex(columns=range(24)).ffill(axis=1).fillna(0)
+
+    semanal = por_hora.groupby(por_hora.index.dayofweek).mean().reindex(range(7)).fillna(0).to_numpy()
+    media = semanal[semanal > 0].mean() if (semanal > 0).any() else 1.0
+    return semanal / media
+
+
+def limitar_carga(carga, limite, mes, iteracoes=60):
+    """
+    Corta cada hora de `carga` (grupos × horas) no `limite` e devolve a
+    energia cortada, dentro do mesmo mês, às horas ainda abaixo do limite
+    (proporcionalmente à carga delas). O kWh mensal de cada grupo se mantém
+    enquanto couber abaixo do limite; o que não couber é descartado.
+    """
+    meses = (mes[None, :] == np.arange(1, 13)[:, None]).astype(float).T  # horas × 12
+    alvo = carga @ meses
+    x = np.minimum(carga, limite)
+    for _ in range(iteracoes):
+        falta = alvo - x @ meses
+        livre = np.where(x < limite, x, 0.0)
+        base = livre @ meses
+        pendente = (falta > 1e-9 * np.maximum(alvo, 1.0)) & (base > 0)
+        if not pendente.any():
+            break
+        escala = np.where(pendente, falta / np.where(base > 0, base, 1.0), 0.0)
+        x = np.minimum(x + livre * escala[:, mes - 1], limite)
+    return x
+
+
+def simular_ano(kernel, horas_ar, horas_luz, horas_pc, horas_eletro, horas_outros,
+                dias_mes, fator_sazonal_clima=1.0, salas_24h=(), perfil_ocupacao=None, ano=None):
+    """
+    Simula a carga horária de um ano inteiro a partir do kernel de consumo
+    (motor_consumo.preparar_consumo) e dos mesmos parâmetros do sidebar.
+
+    Retorna um dict com a matriz `carga_kw` (grupos × horas), a série total,
+    o pico coincidente, a curva de duração de carga e o kWh mensal por grupo.
+    """
+    ano = ano or pd.Timestamp.today().year
+    horas, hora_dia, dia_semana, mes = calendario(ano)
+    ocupacao = np.ones((7, 24)) if perfil_ocupacao is None else np.asarray(perfil_ocupacao, dtype=float)
+
+    # Potência média (kW) de cada linha, já com fator de uso e sazonalidade
+    eh_24h = mascara_24h(kernel, salas_24h)
+    pot = kernel['potencia_w'] * np.where(eh_24h, kernel['fator_uso_24h'], kernel['fator_uso']) / 1000
+    if fator_sazonal_clima > 1.0:
+        pot = np.where(kernel['cat_idx'] == IDX_CLIMATIZACAO, pot * fator_sazonal_clima, pot)
+
+    # Vetor de potência por grupo: bincount sobre o índice de categoria
+    pot_cat = np.bincount(kernel['cat_idx'][~eh_24h], weights=pot[~eh_24h], minlength=len(CATEGORIAS))
+    pot_24h = pot[eh_24h].sum()
+    # Limite físico: potência de placa do grupo (fator de uso ≤ 1, sem sazonalidade)
+    instalada_cat = np.bincount(kernel['cat_idx'][~eh_24h], weights=kernel['potencia_w'][~eh_24h] / 1000,
+                                minlength=len(CATEGORIAS))
+
+    # Agenda (categoria × 24 h) a partir das horas do sidebar
+    horas_cat = [horas_ar, horas_luz, horas_pc, horas_eletro, horas_outros, horas_outros, horas_outros]
+    agenda = np.vstack([agenda_diaria(INICIO_USO[c], h) for c, h in zip(CATEGORIAS, horas_cat)])
+
+    # Dias de uso: dias úteis, ponderados para somar `dias_mes` em cada mês
+    # (a ponderação acerta o kWh do mês; o limite abaixo impede que ela eleve o kW)
+    util = dia_semana < 5
+    uteis_mes = np.bincount(mes[util], minlength=13)[1:] / 24
+    peso_dia = np.where(util, (dias_mes / np.maximum(uteis_mes, 1))[mes - 1], 0.0)
+
+    # Modulação pela ocupação: (1 - s) + s · ocupação / média da ocupação na
+    # agenda da categoria. A ocupação só redistribui a carga entre as horas;
+    # o kWh mensal continua calibrado pelo modelo do relatório.
+    media_agenda = (agenda[:, None, :] * ocupacao[None, :5, :]).sum(axis=(1, 2)) / np.maximum(agenda.sum(axis=1) * 5, 1e-9)
+    media_agenda = np.where(media_agenda > 0, media_agenda, 1.0)
+    sens = np.array([SENSIBILIDADE_OCUPACAO[c] for c in CATEGORIAS])[:, None]
+    mod = (1 - sens) + sens * ocupacao[dia_semana, hora_dia][None, :] / media_agenda[:, None]
+
+    carga = np.empty((len(GRUPOS), len(horas)))
+    carga[:-1] = limitar_carga(
+        pot_cat[:, None] * agenda[:, hora_dia] * peso_dia[None, :] * mod,
+        instalada_cat[:, None] * agenda[:, hora_dia], mes
+    )
+    carga[-1] = pot_24h
+
+    total = carga.sum(axis=0)
+    i_pico = int(total.argmax())
+    mensal = pd.DataFrame(carga.T, index=horas, columns=GRUPOS).groupby(mes).sum()
+    mensal.index.name = 'Mes'
+
+    return {
+        'horas': horas,
+        'grupos': GRUPOS,
+        'carga_kw': carga,
+        'total_kw': total,
+        'pico_coincidente_kw': float(total[i_pico]),
+        'hora_pico': horas[i_pico],
+        'curva_duracao_kw': np.sort(total)[::-1],
+        'mensal_kwh': mensal,
+        'energia_anual_kwh': float(total.sum()),
+    }
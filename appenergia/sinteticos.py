@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------
+# DADOS SINTÉTICOS (INVENTÁRIO E CATRACAS) PARA BENCHMARKS
+# ---------------------------------------------------
+# Gera inventários com as mesmas colunas da "Planilha Unificada
+# (Equipamentos Consumo).csv" — categorias, potências em W/BTU/CV (com
+# vírgula decimal e lacunas, como no levantamento real), Setor, Id_sala e
+# num_andar — e logs de catraca no formato da aba "Entradas e Saídas".
+# Tudo vetorizado: 10 milhões de linhas saem em segundos.
+
+COLUNAS_INVENTARIO = [
+    'modelo_equipamento', 'num_série_equipamento', 'Quant', 'des_nome_equipamento', 'des_categoria',
+    'num_potencia', 'des_potencia', 'Marca', 'Id_sala', 'Setor', 'num_andar',
+    'des_nome_generico_equipamento', 'idade_equipamento', 'observ', 'responsável pela contagem',
+]
+COLUNAS_CATRACA = [
+    'ÓrgaoReferência', 'Exercício', 'Data', 'Fonte', 'DataHora', 'EntradaSaida',
+    'Logradouro', 'NrLogradouro', 'Complemento',
+]
+
+# (genérico, categoria, nome, unidade, potência mín, potência máx, quant. máx, peso)
+CATALOGO = [
+    ("Computador", "Informática", "MONITOR DELL 23 POLEGADAS", "W", 14.8, 40, 8, 30),
+    ("Computador", "Informática", "CPU DELL OPTIPLEX", "W", 65, 250, 8, 12),
+    ("Impressora", "Informática", "IMPRESSORA HP LASERJET", "W", 300, 800, 2, 2),
+    ("Ramal", "Outros", "TELEFONE INTELBRAS TC 20", "W", 2, 4, 3, 6),
+    ("Lâmpadas", "Iluminação", "LÂMPADA TUBULAR FLUORESCENTE", "W", 16, 40, 30, 17),
+    ("Lâmpada", "Iluminação", "LÂMPADA LED BULBO", "w", 9, 15, 10, 2),
+    ("Ar Condicionado", "Climatização", "AR CONDICIONADO SPLIT", "BTU", 9000, 30000, 2, 8),
+    ("Ar Condicionado", "Climatização", "AR CONDICIONADO JANELA", "W", 900, 2200, 1, 3),
+    ("Ventilador", "Climatização", "VENTILADOR DE PAREDE", "W", 60, 150, 2, 1),
+    ("Cafeteira", "Eletrodoméstico", "CAFETEIRA ELÉTRICA", "W", 600, 1000, 1, 3),
+    ("Chaleira Elétrica", "Eletrodoméstico", "CHALEIRA ELÉTRICA INOX", "W", 1200, 2200, 1, 3),
+    ("Frigobar", "Eletrodoméstico", "FRIGOBAR CONSUL 70 L", "W", 60, 90, 1, 2),
+    ("Geladeira", "Eletrodoméstico", "GELADEIRA FROST FREE", "W", 100, 250, 1, 1),
+    ("Microondas", "Eletrodoméstico", "MICROONDAS 20 L", "W", 1100, 1500, 1, 2),
+    ("Elevador", "Outros", "ELEVADOR SOCIAL", "CV", 10, 20, 1, 0.1),
+    ("Bomba", "Outros", "BOMBA D'ÁGUA", "CV", 1, 5, 1, 0.2),
+    ("Nobreak", "Outros", "NOBREAK SMS 1200VA", "W", 500, 1200, 1, 1),
+]
+
+SETORES = [
+    "SECOM", "SAI", "PROGESP", "PROPLAN", "PROREXT", "PROGRAD", "PROPG", "PROPESQ", "SUINFRA",
+    "GABINETE", "CPD", "ÁREA COMUM", "SEDETEC", "PRAE", "SPGI", "AUDIN", "OUVIDORIA", "PROCURADORIA",
+]
+ANDARES = 9
+
+
+def gerar_inventario(n, semente=0, frac_sem_potencia=0.05, frac_sem_sala=0.02):
+    """
+    Inventário sintético com `n` linhas no layout do CSV original. Parte
+    das potências vem vazia (para exercitar a imputação) e parte com
+    vírgula decimal; as salas se repetem como no levantamento real.
+    """
+    rng = np.random.default_rng(semente)
+    cat = pd.DataFrame(CATALOGO, columns=['generico', 'categoria', 'nome', 'unidade', 'pmin', 'pmax', 'qmax', 'peso'])
+    item = rng.choice(len(cat), n, p=cat['peso'] / cat['peso'].sum())
+    c = cat.iloc[item].reset_index(drop=True)
+
+    potencia = rng.uniform(c['pmin'], c['pmax'])
+    potencia = np.select(
+        [c['unidade'] == 'BTU', c['unidade'] == 'CV'],
+        [np.round(potencia / 1000) * 1000, np.round(potencia)],
+        np.round(potencia, 1),
+    )
+    texto = pd.Series(potencia).map('{:g}'.format).str.replace('.', ',', regex=False)
+    texto[rng.random(n) < frac_sem_potencia] = np.nan
+
+    andar = rng.integers(1, ANDARES + 1, n)
+    n_salas = max(n // 7, 1)
+    sala_idx = rng.integers(0, n_salas, n)
+    sala = pd.Series(np.char.add('Sala ', sala_idx.astype(str)))
+    sala[rng.random(n) < frac_sem_sala] = np.nan
+    setor = np.asarray(SETORES, dtype=object)[sala_idx % len(SETORES)]
+
+    df = pd.DataFrame({
+        'modelo_equipamento': np.nan,
+        'num_série_equipamento': np.nan,
+        'Quant': rng.integers(1, c['qmax'] + 1).astype(float),
+        'des_nome_equipamento': c['nome'].to_numpy(),
+        'des_categoria': c['categoria'].to_numpy(),
+        'num_potencia': texto.to_numpy(),
+        'des_potencia': c['unidade'].to_numpy(),
+        'Marca': "GENÉRICO",
+        'Id_sala': sala.to_numpy(),
+        'Setor': setor,
+        'num_andar': andar.astype(float),
+        'des_nome_generico_equipamento': c['generico'].to_numpy(),
+        'idade_equipamento': np.nan,
+        'observ': np.nan,
+        'responsável pela contagem': "CONTAGEM SINTÉTICA",
+    })
+    return df[COLUNAS_INVENTARIO]
+
+
+def gerar_catracas(n, semente=0, inicio="2025-09-01", pessoas_dia=150):
+    """
+    Log de catracas com ~`n` eventos (pares entrada/saída) em dias úteis,
+    chegada por volta das 8h30 e permanência de cerca de 8 horas.
+    """
+    rng = np.random.default_rng(semente)
+    visitas = max(n // 2, 1)
+    dias_uteis = pd.bdate_range(inicio, periods=max(-(-visitas // pessoas_dia), 1))
+    dia = dias_uteis.to_numpy()[rng.integers(0, len(dias_uteis), visitas)]
+
+    chegada = np.clip(rng.normal(8.5, 1.0, visitas), 6, 14)
+    permanencia = np.clip(rng.normal(8.0, 1.5, visitas), 0.5, 12)
+    entrada = dia + (chegada * 3600).astype('timedelta64[s]')
+    saida = entrada + (permanencia * 3600).astype('timedelta64[s]')
+
+    data_hora = np.concatenate([entrada, saida])
+    sentido = np.repeat(np.array(['E', 'S'], dtype=object), visitas)
+    dia_ev = np.concatenate([dia, dia])
+
+    df = pd.DataFrame({
+        'ÓrgaoReferência': "Gabinete da Reitoria",
+        'Exercício': "Sintético",
+        'Data': dia_ev,
+        'Fonte': "Ponto",
+        'DataHora': data_hora,
+        'EntradaSaida': sentido,
+        'Logradouro': "Av. Paulo Gama",
+        'NrLogradouro': 110,
+        'Complemento': np.asarray([f"{a}º andar" for a in range(1, ANDARES + 1)], dtype=object)[
+            rng.integers(0, ANDARES, 2 * visitas)],
+    })
+    return df[COLUNAS_CATRACA]
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do app são importados pelo nome (import simulacao), como no app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INVENTARIO_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              "Planilha Unificada(Equipamentos Consumo).csv")
+
+
+@pytest.fixture
+def inventario_bruto():
+    """Inventário do repositório, lido como o app lê (sem limpeza)."""
+    if not os.path.exists(INVENTARIO_CSV):
+        pytest.skip("inventário do repositório ausente")
+    import nucleo
+    return nucleo.ler_inventario_csv(INVENTARIO_CSV)
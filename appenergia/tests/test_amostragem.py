@@ -0,0 +1,20 @@
+import numpy as np
+
+from amostragem import pontos_para_largura, reduzir_serie
+
+
+def test_pontos_acompanham_a_largura_e_preservam_picos():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=200_000).cumsum()
+    for largura in (600, 1000, 2400):
+        idx = reduzir_serie(y, largura)
+        assert len(idx) <= pontos_para_largura(largura) + 2
+        assert np.all(np.diff(idx) > 0)
+        assert y[idx].max() == y.max() and y[idx].min() == y.min()
+        assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert len(reduzir_serie(y, 2400)) > 2 * len(reduzir_serie(y, 1000))
+
+
+def test_serie_curta_e_mantida_inteira():
+    y = np.arange(50.0)
+    np.testing.assert_array_equal(reduzir_serie(y, 1000), np.arange(50))
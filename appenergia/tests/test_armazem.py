@@ -0,0 +1,21 @@
+import shutil
+
+import armazem
+import imputacao
+
+
+def test_arquivo_muda_com_a_tabela_de_regras(tmp_path, monkeypatch):
+    regras = tmp_path / "regras_potencia.csv"
+    shutil.copy(imputacao.REGRAS_POTENCIA_PATH, regras)
+    monkeypatch.setattr(imputacao, "REGRAS_POTENCIA_PATH", str(regras))
+    chave = ("/dados/inventario.csv", (1234, 5678))
+
+    antes = armazem.caminho('inventario', chave, str(tmp_path))
+    assert armazem.caminho('inventario', chave, str(tmp_path)) == antes
+
+    with open(regras, 'a', encoding='utf-8') as f:
+        f.write("fallback,PROJETOR,250,1\n")
+    depois = armazem.caminho('inventario', chave, str(tmp_path))
+    assert depois != antes
+    # Mesmo prefixo: a versão antiga ainda é despejada por _limpar_versoes_antigas
+    assert depois.rsplit('-', 1)[0] == antes.rsplit('-', 1)[0]
@@ -0,0 +1,37 @@
+import shutil
+
+import cache_disco
+import imputacao
+
+
+def test_chave_muda_com_a_tabela_de_regras(tmp_path, monkeypatch):
+    regras = tmp_path / "regras_potencia.csv"
+    shutil.copy(imputacao.REGRAS_POTENCIA_PATH, regras)
+    monkeypatch.setattr(imputacao, "REGRAS_POTENCIA_PATH", str(regras))
+
+    antes = cache_disco.chave("etapa", (1, 2.0), {'a': 'x'})
+    assert cache_disco.chave("etapa", (1, 2.0), {'a': 'x'}) == antes
+
+    with open(regras, 'a', encoding='utf-8') as f:
+        f.write("fallback,PROJETOR,250,1\n")
+    assert cache_disco.chave("etapa", (1, 2.0), {'a': 'x'}) != antes
+
+
+def test_persistente_nao_reaproveita_resultado_de_outra_tabela(tmp_path, monkeypatch):
+    regras = tmp_path / "regras_potencia.csv"
+    shutil.copy(imputacao.REGRAS_POTENCIA_PATH, regras)
+    monkeypatch.setattr(imputacao, "REGRAS_POTENCIA_PATH", str(regras))
+    chamadas = []
+
+    def etapa(x):
+        chamadas.append(x)
+        return x * 2
+
+    cacheada = cache_disco.persistente(etapa, dir_base=str(tmp_path / "resultados"))
+    assert cacheada(3) == 6 and cacheada(3) == 6
+    assert chamadas == [3]
+
+    with open(regras, 'a', encoding='utf-8') as f:
+        f.write("fallback,PROJETOR,250,1\n")
+    assert cacheada(3) == 6
+    assert chamadas == [3, 3]
@@ -0,0 +1,51 @@
+import shutil
+
+import pandas as pd
+
+import campus
+import imputacao
+import sinteticos
+
+
+def _predio(tmp_path, nome="Prédio A"):
+    pasta = tmp_path / "origem"
+    pasta.mkdir(exist_ok=True)
+    sinteticos.gerar_inventario(200, semente=5).to_csv(pasta / f"{nome}.csv", index=False)
+    return {'predio': nome, 'inventario': str(pasta / f"{nome}.csv"), 'ocupacao': None}
+
+
+def test_particao_reingerida_quando_as_regras_mudam(tmp_path, monkeypatch):
+    regras = tmp_path / "regras_potencia.csv"
+    shutil.copy(imputacao.REGRAS_POTENCIA_PATH, regras)
+    monkeypatch.setattr(imputacao, "REGRAS_POTENCIA_PATH", str(regras))
+    registro = _predio(tmp_path)
+    dir_campus = str(tmp_path / "campus")
+
+    meta = campus.ingerir_predio(registro, dir_campus)
+    assert meta['regras'] == imputacao.versao_regras()
+    antes = campus.ler_particao(meta)[0]['Potencia_Real_W'].sum()
+    assert campus.ingerir_predio(registro, dir_campus) == meta
+
+    tabela = pd.read_csv(regras)
+    tabela.loc[tabela['tipo'] == 'fallback', 'valor'] *= 2
+    tabela.to_csv(regras, index=False)
+    novo = campus.ingerir_predio(registro, dir_campus)
+    assert novo['regras'] != meta['regras']
+    assert campus.ler_particao(novo)[0]['Potencia_Real_W'].sum() > antes
+
+
+def test_nomes_com_o_mesmo_slug_tem_particoes_separadas(tmp_path):
+    nomes = ["Prédio A", "predio a", "PREDIO_A"]
+    assert len({campus.dir_particao(n, str(tmp_path)) for n in nomes}) == 3
+
+    pasta = tmp_path / "origem"
+    pasta.mkdir()
+    predios = []
+    for i, nome in enumerate(nomes):
+        arq = pasta / f"{i}.csv"
+        sinteticos.gerar_inventario(50 * (i + 1), semente=i).to_csv(arq, index=False)
+        predios.append({'predio': nome, 'inventario': str(arq), 'ocupacao': None})
+    metas = campus.ingerir_campus(predios, processos=0, dir_campus=str(tmp_path / "campus"))
+    assert len({m['particao'] for m in metas}) == 3
+    # Cada prédio lê de volta o próprio inventário
+    assert [len(campus.ler_particao(m)[0]) for m in metas] == [50, 100, 150]
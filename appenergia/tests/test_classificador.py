@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from classificador import casamentos, contem_alguma, primeira_regra
+from nucleo import CATEGORIAS_MACRO, categorizar
+
+
+def _agrupar_por_linha(cat):
+    """Categorização original (um if por linha), referência do classificador."""
+    c = str(cat).upper().strip()
+    if "CLIM" in c or "AR" in c: return "Climatização"
+    if "ILUM" in c or "LÂMP" in c: return "Iluminação"
+    if "COMP" in c or "MONIT" in c or "INFORM" in c: return "Informática"
+    if "ELETRO" in c or "DOMÉSTICO" in c or "COPA" in c or "COZINHA" in c: return "Eletrodomésticos"
+    if "ELEV" in c: return "Elevadores"
+    if "BOMB" in c: return "Bombas"
+    return "Outros"
+
+
+def test_categorizar_igual_ao_agrupar_linha_a_linha_no_inventario(inventario_bruto):
+    textos = inventario_bruto['des_categoria']
+    esperado = textos.map(_agrupar_por_linha).to_numpy()
+    obtido = np.asarray(categorizar(textos), dtype=object)
+    np.testing.assert_array_equal(obtido, esperado)
+    assert len(set(esperado)) > 2
+
+
+def test_buscas_iguais_ao_in_do_python():
+    rng = np.random.default_rng(11)
+    # Alfabeto pequeno força sobreposições (prefixos/sufixos comuns entre as palavras)
+    textos = ["".join(rng.choice(list("ABCÂ "), size=rng.integers(0, 12))) for _ in range(400)]
+    textos += ["", "ABAB", "ÂBÂ", "abc", np.nan]  # ausente vira "NAN", como no CSV
+    palavras = ["A", "AB", "BA", "ABA", "CÂ", "ÂB", "CCC", "ZZ"]
+    alvo = [str(t).upper() for t in textos]
+
+    esperado = np.array([[p in t for p in palavras] for t in alvo])
+    np.testing.assert_array_equal(casamentos(textos, palavras), esperado)
+    np.testing.assert_array_equal(contem_alguma(textos, palavras), esperado.any(axis=1))
+
+    regras = [("CCC", "ZZ"), "ABA", ("BA", "CÂ"), "A"]
+    grupos = [(r,) if isinstance(r, str) else r for r in regras]
+    esperado_idx = [next((i for i, g in enumerate(grupos) if any(p in t for p in g)), -1) for t in alvo]
+    np.testing.assert_array_equal(primeira_regra(textos, regras), esperado_idx)
+
+
+def test_categorias_sempre_no_dominio():
+    cats = categorizar(pd.Series(["Ar Condicionado", " iluminação ", None, "ELEVADOR", "xyz"]))
+    assert list(cats.categories) == list(CATEGORIAS_MACRO)
+    assert list(cats) == ["Climatização", "Iluminação", "Outros", "Elevadores", "Outros"]
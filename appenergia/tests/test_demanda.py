@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from demanda import MULTIPLICADOR_ULTRAPASSAGEM, TOLERANCIA_ULTRAPASSAGEM, custo_demanda, recomendar_demanda_contratada
+
+TARIFA = 40.0  # R$/kW
+
+
+def test_regra_aneel_calculada_a_mao():
+    assert TOLERANCIA_ULTRAPASSAGEM == 0.05 and MULTIPLICADOR_ULTRAPASSAGEM == 2.0
+    contratada = 100.0
+    casos = {
+        80.0: 100 * TARIFA,                   # abaixo do contratado: paga o contratado
+        104.0: 104 * TARIFA,                  # dentro dos 5%: paga o medido, sem multa
+        105.0: 105 * TARIFA,                  # exatamente 5%: ainda sem multa
+        110.0: 110 * TARIFA + 2 * TARIFA * 10,  # acima dos 5%: excedente (10 kW) em dobro
+    }
+    for medida, esperado in casos.items():
+        assert custo_demanda(contratada, [medida], TARIFA)[0] == pytest.approx(esperado)
+    # Ano com os quatro meses: soma das faturas mensais
+    assert custo_demanda(contratada, list(casos), TARIFA)[0] == pytest.approx(sum(casos.values()))
+
+
+def test_vetorizado_por_candidato():
+    maximas = [90.0, 110.0, 130.0]
+    candidatos = [100.0, 120.0, 130.0]
+    linha_a_linha = [custo_demanda(c, maximas, TARIFA)[0] for c in candidatos]
+    np.testing.assert_allclose(custo_demanda(candidatos, maximas, TARIFA), linha_a_linha)
+
+
+def test_recomendacao_e_o_minimo_da_curva():
+    maximas = np.array([70.0, 85.0, 120.0, 95.0, 101.0, 88.0])
+    kw, custo, curva, limitada = recomendar_demanda_contratada(maximas, TARIFA)
+    assert custo == pytest.approx(curva['Custo_Anual_R$'].min())
+    assert not limitada
+    kw_lim, _, _, limitada = recomendar_demanda_contratada(maximas, TARIFA, instalada_kw=kw - 5)
+    assert limitada and kw_lim <= kw - 5
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from imputacao import estimar_potencia_real
+
+
+def _estimar_por_linha(row):
+    """Imputação original (df.apply linha a linha), referência da versão vetorizada."""
+    p = row['num_potencia']
+    u = str(row['des_potencia']).upper()
+    nome = row['des_nome_generico_equipamento']
+    if p <= 0:
+        if 'AR CONDICIONADO' in nome: return 1400.0
+        if 'COMPUTADOR' in nome: return 200.0
+        if 'CHALEIRA' in nome: return 1200.0
+        if 'CAFETEIRA' in nome: return 800.0
+        if 'GELADEIRA' in nome: return 150.0
+        if 'LÂMPADA' in nome: return 32.0
+        return 0.0
+    if 'BTU' in u: return (p * 0.293) / 3.0
+    if 'CV' in u or 'HP' in u: return p * 735.5
+    if 'KW' in u: return p * 1000.0
+    return p
+
+
+def _preparar(df):
+    df = df.copy()
+    df['num_potencia'] = pd.to_numeric(df['num_potencia'], errors='coerce').fillna(0)
+    df['des_nome_generico_equipamento'] = df['des_nome_generico_equipamento'].astype(str).str.strip().str.upper()
+    return df
+
+
+def test_igual_a_imputacao_linha_a_linha_no_inventario(inventario_bruto):
+    df = _preparar(inventario_bruto)
+    esperado = df.apply(_estimar_por_linha, axis=1).to_numpy(dtype=float)
+    np.testing.assert_array_equal(estimar_potencia_real(df), esperado)
+    # O inventário exercita os dois ramos (imputação e conversão de unidade)
+    assert (df['num_potencia'] <= 0).any() and (esperado != df['num_potencia']).any()
+
+
+def test_igual_a_imputacao_linha_a_linha_em_casos_de_borda():
+    df = _preparar(pd.DataFrame({
+        'num_potencia': [0, -1, 0, 0, 9000, 2, 1.5, 60, 10, np.nan, 0],
+        'des_potencia': ['W', 'W', None, 'W', 'btu/h', 'cv', 'hp', 'W', 'kw', 'W', 'KW'],
+        'des_nome_generico_equipamento': ['ar condicionado split', 'COMPUTADOR', 'CHALEIRA ELÉTRICA',
+                                          'LÂMPADA LED', 'AR CONDICIONADO', 'BOMBA', 'MOTOR', 'LÂMPADA',
+                                          'FORNO', 'GELADEIRA', 'MESA'],
+    }))
+    esperado = df.apply(_estimar_por_linha, axis=1).to_numpy(dtype=float)
+    np.testing.assert_array_equal(estimar_potencia_real(df), esperado)
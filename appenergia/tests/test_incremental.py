@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pandas as pd
+
+import imputacao
+import incremental
+import sinteticos
+
+
+def _bruto():
+    return sinteticos.gerar_inventario(300, semente=3)
+
+
+def test_retrato_troca_inteiro_e_relido(tmp_path):
+    bruto = _bruto()
+    df, _ = incremental.atualizar_inventario("inv.csv", (1, 1), bruto, dir_base=str(tmp_path), persistir=False)
+    estado = incremental._estados["inv.csv"]
+    destino = str(tmp_path / "retrato")
+    incremental._gravar_retrato(estado, destino)
+    incremental._gravar_retrato(estado, destino)
+
+    # Um único retrato (o apontado por `atual`), sem temporários
+    assert sorted(os.listdir(destino)) == ['atual', incremental._retrato_atual(destino)]
+    lido = incremental._ler_retrato(destino)
+    assert lido['versao'] == (1, 1) and lido['regras'] == imputacao.versao_regras()
+    pd.testing.assert_frame_equal(lido['df'], df, check_dtype=False, check_categorical=False)
+
+
+def test_retrato_inconsistente_e_descartado(tmp_path):
+    bruto = _bruto()
+    incremental.atualizar_inventario("inv2.csv", (1, 1), bruto, dir_base=str(tmp_path), persistir=False)
+    destino = str(tmp_path / "retrato")
+    incremental._gravar_retrato(incremental._estados["inv2.csv"], destino)
+    pasta = os.path.join(destino, incremental._retrato_atual(destino))
+
+    # bruto.parquet de outra gravação (menos linhas) não passa na conferência do meta
+    bruto.iloc[:10].to_parquet(os.path.join(pasta, "bruto.parquet"), index=False)
+    assert incremental._ler_retrato(destino) is None
+
+    os.remove(os.path.join(pasta, "preparado.parquet"))
+    assert incremental._ler_retrato(destino) is None
+
+
+def test_regras_novas_reprocessam_o_inventario(tmp_path, monkeypatch):
+    regras = tmp_path / "regras_potencia.csv"
+    shutil.copy(imputacao.REGRAS_POTENCIA_PATH, regras)
+    monkeypatch.setattr(imputacao, "REGRAS_POTENCIA_PATH", str(regras))
+    bruto = _bruto()
+    sem_potencia = pd.to_numeric(bruto['num_potencia'], errors='coerce').fillna(0) <= 0
+    df, _ = incremental.atualizar_inventario("inv3.csv", (1, 1), bruto, dir_base=str(tmp_path), persistir=False)
+
+    tabela = pd.read_csv(regras)
+    tabela.loc[tabela['tipo'] == 'fallback', 'valor'] *= 2
+    tabela.to_csv(regras, index=False)
+    novo, _ = incremental.atualizar_inventario("inv3.csv", (1, 1), bruto, dir_base=str(tmp_path), persistir=False)
+
+    antes = df.loc[sem_potencia.to_numpy(), 'Potencia_Real_W']
+    depois = novo.loc[sem_potencia.to_numpy(), 'Potencia_Real_W']
+    assert (antes > 0).any()
+    assert (depois == 2 * antes).all()
@@ -0,0 +1,72 @@
+import numpy as np
+
+from monte_carlo import rebater_fator
+
+
+def test_rebater_fator_fica_em_zero_um():
+    x = np.array([-2.5, -0.1, 0.0, 0.45, 1.0, 1.1, 1.25, 2.3])
+    np.testing.assert_allclose(rebater_fator(x), [0.5, 0.1, 0.0, 0.45, 1.0, 0.9, 0.75, 0.3])
+
+
+def test_fator_base_um_nao_acumula_cenarios_no_teto():
+    rng = np.random.default_rng(0)
+    fator = rebater_fator(1.0 * rng.triangular(0.75, 1.0, 1.25, 100_000))
+    assert fator.min() >= 0.75 and fator.max() <= 1.0
+    # Com o corte em 1,0 metade dos cenários caía exatamente no teto
+    assert (fator == 1.0).mean() < 0.01
+    # Moda no fator base: a densidade cresce em direção a 1,0
+    contagem, _ = np.histogram(fator, bins=5, range=(0.75, 1.0))
+    assert (np.diff(contagem) > 0).all()
+
+
+def test_pool_de_processos_nao_muda_o_resultado(monkeypatch):
+    import monte_carlo
+    import sinteticos
+    from nucleo import derivar_colunas, limpar_inventario
+
+    df, kernel = derivar_colunas(limpar_inventario(sinteticos.gerar_inventario(400, semente=1)))
+    imputada = ((df['num_potencia'] <= 0) & (df['Potencia_Real_W'] > 0)).to_numpy()
+    monkeypatch.setattr(monte_carlo, "ELEMENTOS_POR_BLOCO", 50)  # vários blocos -> usa o pool
+    args = (kernel, imputada, df['Potencia_Real_W'].to_numpy(), 8, 10, 8, 4, 6, 22)
+    local = monte_carlo.simular_incerteza(*args, n_amostras=400, processos=0)
+    pool = monte_carlo.simular_incerteza(*args, n_amostras=400, processos=2)
+    np.testing.assert_array_equal(local['kwh'], pool['kwh'])
+
+
+def _fixture():
+    import sinteticos
+    from nucleo import derivar_colunas, limpar_inventario
+    df, kernel = derivar_colunas(limpar_inventario(sinteticos.gerar_inventario(2000, semente=1)))
+    imputada = ((df['num_potencia'] <= 0) & (df['Potencia_Real_W'] > 0)).to_numpy()
+    return kernel, imputada, df['Potencia_Real_W'].to_numpy()
+
+
+def test_estimativa_deterministica_fica_entre_p10_e_p90():
+    from monte_carlo import simular_incerteza
+    from motor_consumo import calcular_consumo
+
+    kernel, imputada, real = _fixture()
+    uso = dict(horas_ar=8, horas_luz=10, horas_pc=8, horas_eletro=4, horas_outros=6, dias_mes=22)
+    ponto = calcular_consumo(kernel, **uso).sum()
+    so_fator = {'potencia_imputada': ('fixo', 1.0), 'horas': ('fixo', 0.0)}
+    for distribuicoes in (None, so_fator):
+        kwh = simular_incerteza(kernel, imputada, real, **uso, n_amostras=2000,
+                                distribuicoes=distribuicoes)['kwh']
+        p10, p90 = np.percentile(kwh, [10, 90])
+        assert p10 <= ponto <= p90
+
+
+def test_categorias_no_teto_sorteiam_entre_minimo_e_base():
+    from monte_carlo import CATEGORIAS_NO_TETO, simular_incerteza
+    from motor_consumo import CATEGORIAS, calcular_consumo
+
+    kernel, imputada, real = _fixture()
+    # Só Iluminação (fator 1,0) no inventário: o consumo fica em [0,75 × ponto, ponto]
+    luz = kernel['cat_idx'] == CATEGORIAS.index("Iluminação")
+    assert "Iluminação" in CATEGORIAS_NO_TETO
+    kernel = {k: v[luz] if isinstance(v, np.ndarray) and len(v) == len(luz) else v for k, v in kernel.items()}
+    uso = dict(horas_ar=8, horas_luz=10, horas_pc=8, horas_eletro=4, horas_outros=6, dias_mes=22)
+    ponto = calcular_consumo(kernel, **uso).sum()
+    kwh = simular_incerteza(kernel, imputada[luz], real[luz], **uso, n_amostras=2000,
+                            distribuicoes={'potencia_imputada': ('fixo', 1.0), 'horas': ('fixo', 0.0)})['kwh']
+    assert kwh.min() >= 0.75 * ponto - 1e-6 and kwh.max() <= ponto + 1e-6
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from ocupacao import ordem_eventos, reconstruir_ocupacao
+
+
+def _eventos(n=5000, semente=7):
+    # Poucos instantes distintos por dia: muitos eventos simultâneos
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'DataHora': pd.Timestamp('2025-09-01 07:00') + pd.to_timedelta(
+            rng.integers(0, 6, n) * 86400 + rng.integers(0, 40, n) * 900, unit='s'),
+        'EntradaSaida': rng.choice(['Entrada', 'Saída'], n),
+    })
+
+
+def test_empates_seguem_a_linha_original():
+    df = _eventos()
+    esperado = df.assign(_linha=np.arange(len(df))).sort_values(['DataHora', '_linha']).index
+    assert list(df.index[ordem_eventos(df['DataHora'])]) == list(esperado)
+    assert list(reconstruir_ocupacao(df).index) == list(esperado)
+
+
+def test_ocupacao_igual_ao_calculo_por_dia():
+    df = _eventos()
+    novo = reconstruir_ocupacao(df)
+    # Referência: o antigo ajuste dia a dia, sobre a mesma ordem dos eventos
+    for _, dia in novo.groupby('Data_Dia'):
+        ocup = dia['Variacao'].cumsum()
+        ocup -= min(ocup.min(), 0)
+        np.testing.assert_array_equal(dia['Ocupacao_Dia'].to_numpy(), ocup.to_numpy())
@@ -0,0 +1,77 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from roi import _guloso_limitado, otimizar_orcamento
+
+
+def _guloso_unidade_a_unidade(custo, qtd, orcamento):
+    """Laço original: percorre os itens em ordem e leva cada unidade que couber."""
+    levar, saldo = np.zeros(len(custo), dtype=np.int64), float(orcamento)
+    for i in range(len(custo)):
+        for _ in range(qtd[i]):
+            if custo[i] <= saldo:
+                levar[i] += 1
+                saldo -= custo[i]
+    return levar
+
+
+def _candidatos(custo, economia, qtd):
+    n = len(custo)
+    return pd.DataFrame({
+        'Id_sala': [f"S{i}" for i in range(n)], 'Setor': "A",
+        'Categoria_Macro': ["Iluminação", "Climatização", "Informática"] * (n // 3) + ["Iluminação"] * (n % 3),
+        'Unidades': np.asarray(qtd, dtype=np.int64),
+        'Custo_Unitario_R$': np.asarray(custo, dtype=float),
+        'Economia_Unitaria_R$': np.asarray(economia, dtype=float),
+    })
+
+
+def _otimo_forca_bruta(custo, economia, qtd, orcamento):
+    melhor = 0.0
+    for levar in itertools.product(*(range(q + 1) for q in qtd)):
+        levar = np.array(levar)
+        if (levar * custo).sum() <= orcamento:
+            melhor = max(melhor, float((levar * economia).sum()))
+    return melhor
+
+
+def test_guloso_vetorizado_igual_ao_laco():
+    rng = np.random.default_rng(5)
+    for _ in range(200):
+        n = int(rng.integers(1, 12))
+        custo = rng.choice([50.0, 120.0, 350.0, 900.0, 2500.0], size=n)
+        qtd = rng.integers(0, 20, size=n)
+        orcamento = float(rng.uniform(0, (custo * qtd).sum() + 1000))
+        np.testing.assert_array_equal(_guloso_limitado(custo, np.ones(n), qtd, orcamento),
+                                      _guloso_unidade_a_unidade(custo, qtd, orcamento))
+
+
+@pytest.mark.parametrize("semente", range(30))
+def test_otimizar_orcamento_contra_forca_bruta(semente):
+    rng = np.random.default_rng(semente)
+    n = int(rng.integers(2, 6))
+    custo = rng.choice([40.0, 100.0, 250.0, 700.0], size=n)
+    economia = np.round(custo * rng.uniform(0.01, 0.2, size=n), 2)
+    qtd = rng.integers(1, 4, size=n)
+    orcamento = float(rng.uniform(0.2, 0.9) * (custo * qtd).sum())
+
+    escolhidos, resumo = otimizar_orcamento(_candidatos(custo, economia, qtd), orcamento)
+    otimo = _otimo_forca_bruta(custo, economia, qtd, orcamento)
+
+    assert resumo['investido'] <= orcamento + 1e-9
+    assert resumo['gap_pct'] >= 0
+    assert resumo['economia'] <= otimo + 1e-9
+    # O ótimo fica abaixo do limite superior, logo dentro do gap informado
+    assert otimo <= resumo['limite_superior'] + 1e-9
+    assert 100 * (otimo - resumo['economia']) / resumo['limite_superior'] <= resumo['gap_pct'] + 1e-9
+    assert (escolhidos['Unidades_Trocadas'] <= escolhidos['Unidades']).all()
+
+
+def test_payback_maximo_exclui_itens_lentos():
+    cand = _candidatos([100.0, 100.0, 100.0], [20.0, 5.0, 1.0], [2, 2, 2])
+    escolhidos, resumo = otimizar_orcamento(cand, 10_000, payback_maximo=24)
+    assert set(escolhidos['Id_sala']) == {"S0", "S1"}
+    assert resumo['investido'] == 400.0 and resumo['economia'] == 50.0 and resumo['gap_pct'] == 0.0
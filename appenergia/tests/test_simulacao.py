@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from motor_consumo import CATEGORIAS, preparar_consumo
+from simulacao import simular_ano
+
+
+def _kernel():
+    df = pd.DataFrame({
+        'Categoria_Macro': ["Climatização", "Iluminação", "Informática", "Eletrodomésticos", "Outros", "Outros"],
+        'des_nome_generico_equipamento': ["AR", "LAMPADA", "COMPUTADOR", "MICROONDAS", "VENTILADOR", "GELADEIRA"],
+        'Id_sala': ["101", "101", "102", "103", "103", "103"],
+        'Potencia_Total_Item_W': [12000.0, 3000.0, 8000.0, 6000.0, 1500.0, 400.0],
+    })
+    return preparar_consumo(df)
+
+
+def _perfil_com_pico():
+    # Ocupação concentrada no meio do dia (pico bem acima de 2× a média)
+    perfil = np.zeros((7, 24))
+    perfil[:5, 8:19] = 1.0
+    perfil[:5, 11:14] = 6.0
+    return perfil
+
+
+def test_carga_horaria_nao_passa_da_potencia_instalada():
+    kernel = _kernel()
+    sim = simular_ano(kernel, 11.5, 11.5, 11.5, 6.0, 11.5, dias_mes=26,
+                      perfil_ocupacao=_perfil_com_pico(), ano=2024)
+    carga = sim['carga_kw']
+
+    eh_24h = kernel['equip_24h']
+    pot_cat = np.bincount(kernel['cat_idx'][~eh_24h], weights=kernel['potencia_w'][~eh_24h] / 1000,
+                          minlength=len(CATEGORIAS))
+    assert (carga[:-1].max(axis=1) <= pot_cat + 1e-9).all()
+    assert sim['pico_coincidente_kw'] <= kernel['potencia_w'].sum() / 1000 + 1e-9
+
+
+def test_limite_preserva_energia_mensal_quando_cabe():
+    kernel = _kernel()
+    perfil = _perfil_com_pico()
+    sim = simular_ano(kernel, 8.0, 8.0, 8.0, 2.0, 8.0, dias_mes=20, perfil_ocupacao=perfil, ano=2024)
+    sem_ocupacao = simular_ano(kernel, 8.0, 8.0, 8.0, 2.0, 8.0, dias_mes=20, ano=2024)
+
+    # A ocupação (e o limite) só redistribuem a carga entre as horas do mês
+    np.testing.assert_allclose(sim['mensal_kwh'].to_numpy(), sem_ocupacao['mensal_kwh'].to_numpy(), rtol=1e-6)
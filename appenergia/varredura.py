@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from motor_consumo import CATEGORIAS, IDX_CLIMATIZACAO, mascara_24h
+from roi import economia_retrofit
+
+# ---------------------------------------------------
+# VARREDURA DE CENÁRIOS (SENSIBILIDADE)
+# ---------------------------------------------------
+# Com o inventário fixo, o consumo é linear nas horas de cada categoria:
+#   kWh = dias · (H @ a) + b
+# onde H é a matriz (cenários × categorias) de horas, `a` o kWh por hora·dia
+# de cada categoria e `b` o consumo dos equipamentos 24h. A economia de um
+# plano de trocas tem a mesma forma. Assim milhares de combinações de
+# tarifas, horas e dias viram um único produto de matrizes.
+
+PARAMETROS = (
+    'tarifa_ponta', 'tarifa_fora_ponta',
+    'horas_ar', 'horas_luz', 'horas_pc', 'horas_eletro', 'horas_outros', 'dias_mes',
+)
+PARAMETROS_HORAS = ('horas_ar', 'horas_luz', 'horas_pc', 'horas_eletro', 'horas_outros')
+
+ROTULOS = {
+    'tarifa_ponta': "Tarifa Ponta (R$/kWh)", 'tarifa_fora_ponta': "Tarifa Fora Ponta (R$/kWh)",
+    'horas_ar': "Horas Ar Condicionado", 'horas_luz': "Horas Iluminação", 'horas_pc': "Horas Informática",
+    'horas_eletro': "Horas Eletrodomésticos", 'horas_outros': "Horas Outros", 'dias_mes': "Dias no mês",
+}
+
+# Coluna de horas usada por cada categoria (mesma ordem de CATEGORIAS)
+HORAS_DA_CATEGORIA = np.array([0, 1, 2, 3, 4, 4, 4])
+
+
+def coeficientes_consumo(kernel, fator_sazonal_clima=1.0, salas_24h=()):
+    """
+    (a, b): kWh por hora·dia de uso de cada categoria (vetor) e kWh mensal
+    fixo dos equipamentos/salas 24h. Reproduz motor_consumo.calcular_consumo.
+    """
+    eh_24h = mascara_24h(kernel, salas_24h)
+    cat = kernel['cat_idx']
+    saz = np.where((cat == IDX_CLIMATIZACAO) & (fator_sazonal_clima > 1.0), fator_sazonal_clima, 1.0)
+    kw = kernel['potencia_w'] * saz / 1000
+    a = np.bincount(cat[~eh_24h], weights=(kw * kernel['fator_uso'])[~eh_24h], minlength=len(CATEGORIAS))
+    b = float((kw * kernel['fator_uso_24h'] * 24 * 30)[eh_24h].sum())
+    return a, b
+
+
+def coeficientes_economia(plano):
+    """
+    Economia do plano de trocas (roi.otimizar_orcamento) em kWh por
+    hora·dia de cada categoria: com horas, dias e tarifa iguais a 1, a
+    fórmula de economia_retrofit vira o coeficiente.
+    """
+    e = np.zeros(len(CATEGORIAS))
+    if plano is None or plano.empty:
+        return e
+    w = plano['Potencia_Real_W'].to_numpy(dtype=float)
+    n = plano['Unidades_Trocadas'].to_numpy(dtype=float)
+    eco_luz, eco_ar, eco_pc = economia_retrofit(n, n, n, w, w, w, 1.0, 1.0, 1.0, 1.0, 1.0)
+    cat = plano['Categoria_Macro'].to_numpy()
+    for nome, eco in (("Iluminação", eco_luz), ("Climatização", eco_ar), ("Informática", eco_pc)):
+        e[CATEGORIAS.index(nome)] = eco[cat == nome].sum()
+    return e
+
+
+def grade_cenarios(base, grades):
+    """
+    Produto cartesiano das `grades` ({parâmetro: valores}); os parâmetros
+    ausentes ficam no valor `base`. Uma linha por cenário.
+    """
+    nomes = list(grades)
+    malha = np.meshgrid(*[np.asarray(grades[p], dtype=float) for p in nomes], indexing='ij')
+    cen = pd.DataFrame({p: m.ravel() for p, m in zip(nomes, malha)})
+    for p in PARAMETROS:
+        if p not in cen:
+            cen[p] = float(base[p])
+    return cen[list(PARAMETROS)]
+
+
+def avaliar_cenarios(cenarios, a, b, peso_ponta, custo_fixo=0.0, e=None, investido=0.0):
+    """
+    Consumo, conta e (com `e`) economia e payback de todos os cenários de
+    uma vez. `cenarios` tem as colunas de PARAMETROS.
+    """
+    horas = cenarios[list(PARAMETROS_HORAS)].to_numpy(dtype=float)[:, HORAS_DA_CATEGORIA]
+    dias = cenarios['dias_mes'].to_numpy(dtype=float)
+    tarifa = (cenarios['tarifa_ponta'].to_numpy(dtype=float) * peso_ponta
+              + cenarios['tarifa_fora_ponta'].to_numpy(dtype=float) * (1 - peso_ponta))
+
+    res = cenarios.copy()
+    res['Consumo_kWh'] = dias * (horas @ a) + b
+    res['Tarifa_Media'] = tarifa
+    res['Conta_R$'] = res['Consumo_kWh'] * tarifa + custo_fixo
+    if e is not None:
+        economia = dias * tarifa * (horas @ e)
+        res['Economia_R$'] = economia
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res['Payback_Meses'] = np.where(economia > 0, investido / economia, 999.0)
+    return res
+
+
+def tornado(base, faixas, metrica, **kw):
+    """
+    Sensibilidade de `metrica` a cada parâmetro, variando um de cada vez
+    entre (baixo, alto) de `faixas`. Ordenado pela amplitude.
+    """
+    linhas = []
+    for p, (baixo, alto) in faixas.items():
+        for valor in (baixo, alto):
+            linhas.append(dict(base, **{p: valor}))
+    res = avaliar_cenarios(pd.DataFrame(linhas)[list(PARAMETROS)], **kw)[metrica].to_numpy().reshape(-1, 2)
+    ref = float(avaliar_cenarios(pd.DataFrame([base])[list(PARAMETROS)], **kw)[metrica].iloc[0])
+
+    t = pd.DataFrame({
+        'Parametro': [ROTULOS.get(p, p) for p in faixas],
+        'Baixo': res[:, 0], 'Alto': res[:, 1],
+    })
+    t['Amplitude'] = (t['Alto'] - t['Baixo']).abs()
+    t.attrs['base'] = ref
+    return t.sort_values('Amplitude').reset_index(drop=True)
+
+
+def mapa_calor(base, eixo_x, valores_x, eixo_y, valores_y, metrica, **kw):
+    """Matriz (valores_y × valores_x) de `metrica`, demais parâmetros na base."""
+    res = avaliar_cenarios(grade_cenarios(base, {eixo_y: valores_y, eixo_x: valores_x}), **kw)
+    return pd.DataFrame(
+        res[metrica].to_numpy().reshape(len(valores_y), len(valores_x)),
+        index=pd.Index(np.asarray(valores_y, dtype=float), name=eixo_y),
+        columns=pd.Index(np.asarray(valores_x, dtype=float), name=eixo_x),
+    )